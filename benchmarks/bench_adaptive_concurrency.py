@@ -0,0 +1,125 @@
+"""Fixed versus adaptive concurrency against a server whose capacity changes.
+
+A pool of async workers translates for ``--duration`` seconds against a stub
+that serves ``capacity`` requests at full speed, slows down past it and
+answers 503 past ``--overload`` times it. The capacity follows
+``--capacity`` (``seconds:capacity`` steps). Each fixed limit runs that many
+workers; the adaptive run starts ``--workers`` of them behind a
+``ConcurrencyLimiter`` and prints how its limit tracked the capacity.
+
+Run with ``python -m benchmarks.bench_adaptive_concurrency``.
+"""
+
+import argparse
+import asyncio
+import time
+
+from djelia import ConcurrencyLimiter, DjeliaAsync
+from djelia.models import Language, TranslationRequest
+
+from .stub_server import StubConfig, StubServer
+from .utils import API_KEY, print_row, summarize
+
+
+def parse_capacity(value: str) -> list[tuple[float, int]]:
+    steps = []
+    for step in value.split(","):
+        start, capacity = step.split(":")
+        steps.append((float(start), int(capacity)))
+    return sorted(steps)
+
+
+async def run(base_url, workers, duration, limiter=None, trace=None):
+    latencies = []
+    errors = 0
+
+    async with DjeliaAsync(
+        api_key=API_KEY, base_url=base_url, concurrency_limiter=limiter
+    ) as client:
+        await client.translation.get_supported_languages()
+        deadline = time.monotonic() + duration
+
+        async def worker(index: int) -> None:
+            nonlocal errors
+            count = 0
+            while time.monotonic() < deadline:
+                request = TranslationRequest(
+                    text=f"i ni ce {index} {count}",
+                    source=Language.BAMBARA,
+                    target=Language.FRENCH,
+                )
+                count += 1
+                start = time.perf_counter()
+                try:
+                    await client.translation.translate(request)
+                except Exception:
+                    errors += 1
+                else:
+                    latencies.append(time.perf_counter() - start)
+
+        async def sample() -> None:
+            start = time.monotonic()
+            while True:
+                trace.append((time.monotonic() - start, limiter.limit))
+                await asyncio.sleep(1.0)
+
+        sampler = asyncio.ensure_future(sample()) if trace is not None else None
+        await asyncio.gather(*(worker(i) for i in range(workers)))
+        if sampler is not None:
+            sampler.cancel()
+    return latencies, errors
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        "--capacity",
+        default="0:16,6:48,12:8",
+        help="seconds:capacity steps of the server",
+    )
+    parser.add_argument("--duration", type=float, default=18.0)
+    parser.add_argument(
+        "--latency", type=float, default=0.05, help="stub latency at capacity (s)"
+    )
+    parser.add_argument("--overload", type=float, default=2.0)
+    parser.add_argument(
+        "--fixed",
+        default="8,64",
+        help="comma separated fixed concurrency levels to compare",
+    )
+    parser.add_argument(
+        "--workers", type=int, default=128, help="demand of the adaptive run"
+    )
+    args = parser.parse_args()
+
+    config = StubConfig(
+        latency=args.latency,
+        capacity=parse_capacity(args.capacity),
+        overload=args.overload,
+    )
+    scenarios = [(f"fixed {n}", int(n), None) for n in args.fixed.split(",")]
+    scenarios.append(("adaptive", args.workers, ConcurrencyLimiter()))
+    print(f"capacity {args.capacity}, {args.duration:g} s per run")
+    for name, workers, limiter in scenarios:
+        trace = [] if limiter is not None else None
+        with StubServer(config) as server:
+            latencies, errors = asyncio.run(
+                run(server.base_url, workers, args.duration, limiter, trace)
+            )
+            overloaded = server.overloaded
+        stats = summarize(latencies)
+        print_row(
+            name,
+            stats,
+            f"{stats['calls'] / args.duration:7.1f} req/s  "
+            f"{errors} errors  {overloaded} 503s",
+        )
+        if trace:
+            print(
+                "  limit over time: "
+                + ", ".join(f"{t:.0f}s={limit}" for t, limit in trace)
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""Per-call latency of the sync client with and without connection reuse.
+
+Run with ``python -m benchmarks.bench_connection_pool``.
+"""
+
+import argparse
+import os
+import time
+
+import requests
+
+from djelia import Djelia
+from djelia.config import TransportConfig
+from djelia.models import DjeliaRequest, Language, TranslationRequest, Versions
+
+from .stub_server import StubServer
+from .utils import API_KEY, print_row, summarize
+
+
+def bench_unpooled(server: StubServer, calls: int) -> list[float]:
+    # what every call did before the client owned a session
+    url = DjeliaRequest.translate.endpoint.format(Versions.v1.value).replace(
+        DjeliaRequest.base_url, server.base_url
+    )
+    payload = {"text": "Good morning", "source": "eng_Latn", "target": "fra_Latn"}
+    latencies = []
+    for _ in range(calls):
+        start = time.perf_counter()
+        response = requests.request(
+            "POST", url, headers={"x-api-key": API_KEY}, json=payload
+        )
+        response.raise_for_status()
+        latencies.append(time.perf_counter() - start)
+    return latencies
+
+
+def bench_client(
+    server: StubServer, calls: int, transport: TransportConfig
+) -> list[float]:
+    request = TranslationRequest(
+        text="Good morning", source=Language.ENGLISH, target=Language.FRENCH
+    )
+    latencies = []
+    with Djelia(api_key=API_KEY, base_url=server.base_url, transport=transport) as c:
+        for _ in range(calls):
+            start = time.perf_counter()
+            c.translation.translate(request, version=Versions.v1)
+            latencies.append(time.perf_counter() - start)
+    return latencies
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--calls", type=int, default=500)
+    parser.add_argument(
+        "--tls", action="store_true", help="serve HTTPS to include TLS handshakes"
+    )
+    args = parser.parse_args()
+
+    scenarios = [
+        ("requests.request (before)", lambda s: bench_unpooled(s, args.calls)),
+        (
+            "Djelia keep_alive=False",
+            lambda s: bench_client(s, args.calls, TransportConfig(keep_alive=False)),
+        ),
+        (
+            "Djelia pooled (after)",
+            lambda s: bench_client(s, args.calls, TransportConfig()),
+        ),
+    ]
+    for name, run in scenarios:
+        with StubServer(tls=args.tls) as server:
+            if server.cert_file:
+                os.environ["REQUESTS_CA_BUNDLE"] = server.cert_file
+            latencies = run(server)
+            print_row(name, summarize(latencies), f"{server.connections} conns")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,139 @@
+"""Event-loop lag while large files are uploaded and TTS audio is saved.
+
+A ticker coroutine sleeps ``--tick`` seconds in a loop and records how late
+it wakes up; every millisecond of lag is time other coroutines could not
+run. ``legacy`` reproduces the previous blocking ``open()``/``read()``/
+``write()`` calls on the event loop, ``offloaded`` goes through the client.
+
+Run with ``python -m benchmarks.bench_event_loop_lag``.
+"""
+
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+
+import aiohttp
+
+from djelia import DjeliaAsync
+from djelia.config.settings import Settings
+from djelia.models import DjeliaRequest, TTSRequestV2, Versions
+
+from .stub_server import StubConfig, StubServer
+from .utils import API_KEY, percentile
+
+
+async def measure_lag(stop: asyncio.Event, tick: float) -> list[float]:
+    lags = []
+    while not stop.is_set():
+        start = time.perf_counter()
+        await asyncio.sleep(tick)
+        lags.append(max(0.0, time.perf_counter() - start - tick))
+    return lags
+
+
+def tts_request() -> TTSRequestV2:
+    speaker = Settings.model_fields["valid_tts_v2_speakers"].get_default(
+        call_default_factory=True
+    )[0]
+    return TTSRequestV2(text="benchmark", description=f"{speaker} speaks")
+
+
+async def run_legacy(base_url: str, paths: list[str], directory: str) -> None:
+    url = DjeliaRequest.transcribe.endpoint.format(Versions.v2.value).replace(
+        DjeliaRequest.base_url, base_url
+    )
+    tts_url = DjeliaRequest.tts.endpoint.format(Versions.v2.value).replace(
+        DjeliaRequest.base_url, base_url
+    )
+    headers = {"x-api-key": API_KEY}
+
+    async with aiohttp.ClientSession() as session:
+
+        async def upload(path: str) -> None:
+            data = aiohttp.FormData()
+            with open(path, "rb") as f:
+                data.add_field("file", f.read(), filename="audio.wav")
+            async with session.post(url, data=data, headers=headers) as response:
+                await response.read()
+
+        async def synthesize(index: int) -> None:
+            async with session.post(
+                tts_url, json=tts_request().model_dump(), headers=headers
+            ) as response:
+                content = await response.read()
+            with open(os.path.join(directory, f"legacy_{index}.wav"), "wb") as f:
+                f.write(content)
+
+        await asyncio.gather(
+            *(upload(path) for path in paths),
+            *(synthesize(i) for i in range(len(paths))),
+        )
+
+
+async def run_offloaded(base_url: str, paths: list[str], directory: str) -> None:
+    async with DjeliaAsync(api_key=API_KEY, base_url=base_url) as client:
+        await asyncio.gather(
+            *(client.transcription.transcribe(path) for path in paths),
+            *(
+                client.tts.text_to_speech(
+                    tts_request(),
+                    output_file=os.path.join(directory, f"offloaded_{i}.wav"),
+                    version=Versions.v2,
+                )
+                for i in range(len(paths))
+            ),
+        )
+
+
+async def bench(mode, base_url: str, paths: list[str], directory: str, tick: float):
+    stop = asyncio.Event()
+    ticker = asyncio.create_task(measure_lag(stop, tick))
+    start = time.perf_counter()
+    await mode(base_url, paths, directory)
+    elapsed = time.perf_counter() - start
+    stop.set()
+    return elapsed, await ticker
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--files", type=int, default=4)
+    parser.add_argument("--size", type=int, default=128, help="file size in MiB")
+    parser.add_argument(
+        "--audio-seconds", type=float, default=600.0, help="TTS response length"
+    )
+    parser.add_argument("--tick", type=float, default=0.005)
+    args = parser.parse_args()
+
+    directory = tempfile.mkdtemp(prefix="djelia-bench-")
+    paths = []
+    block = os.urandom(1024 * 1024)
+    for i in range(args.files):
+        paths.append(os.path.join(directory, f"audio_{i}.wav"))
+        with open(paths[-1], "wb") as f:
+            for _ in range(args.size):
+                f.write(block)
+
+    config = StubConfig(audio_seconds=args.audio_seconds)
+    try:
+        with StubServer(config) as server:
+            for name, mode in [("legacy", run_legacy), ("offloaded", run_offloaded)]:
+                elapsed, lags = asyncio.run(
+                    bench(mode, server.base_url, paths, directory, args.tick)
+                )
+                print(
+                    f"{name:<10} {elapsed:7.3f} s  ticks {len(lags):>5}  "
+                    f"lag p50 {percentile(lags, 50) * 1000:7.2f} ms  "
+                    f"p99 {percentile(lags, 99) * 1000:7.2f} ms  "
+                    f"max {max(lags, default=0.0) * 1000:7.2f} ms"
+                )
+    finally:
+        for name in os.listdir(directory):
+            os.remove(os.path.join(directory, name))
+        os.rmdir(directory)
+
+
+if __name__ == "__main__":
+    main()
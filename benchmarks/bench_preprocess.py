@@ -0,0 +1,86 @@
+"""Bytes uploaded and end-to-end latency per audio-hour with pre-processing.
+
+A 48 kHz stereo 16-bit WAV recording is transcribed as is and through
+``AudioPreprocessor`` (16 kHz mono WAV, and FLAC when ``soundfile`` is
+installed). The stub throttles uploads to ``--bandwidth`` Mbit/s so the
+saved bytes show up as saved time. Figures are scaled to one hour of audio.
+
+Run with ``python -m benchmarks.bench_preprocess``.
+"""
+
+import argparse
+import os
+import tempfile
+import time
+import wave
+
+import numpy as np
+
+from djelia import Djelia
+from djelia.src.audio import AudioPreprocessor
+from djelia.src.audio.preprocess import soundfile
+
+from .stub_server import StubConfig, StubServer
+from .utils import API_KEY
+
+
+def make_recording(path: str, seconds: float, rate: int = 48000) -> None:
+    # speech-like noise bursts, written in blocks to keep memory flat
+    rng = np.random.default_rng(0)
+    with wave.open(path, "wb") as w:
+        w.setnchannels(2)
+        w.setsampwidth(2)
+        w.setframerate(rate)
+        for _ in range(int(seconds)):
+            envelope = np.abs(np.sin(np.linspace(0, 3 * np.pi, rate)))[:, None]
+            block = rng.normal(0, 0.1, (rate, 2)) * envelope
+            w.writeframes((block * 32767).astype("<i2").tobytes())
+
+
+def bench(server: StubServer, path: str, preprocessor) -> tuple[int, float]:
+    before = server.bytes_received
+    with Djelia(api_key=API_KEY, base_url=server.base_url) as client:
+        start = time.perf_counter()
+        client.transcription.transcribe(path, preprocessor=preprocessor)
+        elapsed = time.perf_counter() - start
+    return server.bytes_received - before, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--minutes", type=float, default=5.0)
+    parser.add_argument(
+        "--bandwidth", type=float, default=50.0, help="uplink in Mbit/s"
+    )
+    args = parser.parse_args()
+
+    seconds = args.minutes * 60
+    scale = 3600 / seconds
+    directory = tempfile.mkdtemp(prefix="djelia-bench-")
+    path = os.path.join(directory, "recording.wav")
+    make_recording(path, seconds)
+
+    modes = [("raw 48k stereo", None)]
+    modes.append(("16k mono wav", AudioPreprocessor(format="wav")))
+    if soundfile is not None:
+        modes.append(("16k mono flac", AudioPreprocessor(format="flac")))
+
+    config = StubConfig(upload_bandwidth=args.bandwidth * 1e6 / 8)
+    try:
+        with StubServer(config) as server:
+            print(f"{'per audio-hour':<16} {'uploaded':>12} {'latency':>10}")
+            for name, preprocessor in modes:
+                sent, elapsed = bench(server, path, preprocessor)
+                print(
+                    f"{name:<16} {sent * scale / 2**20:9.1f} MiB "
+                    f"{elapsed * scale:8.1f} s"
+                )
+                if preprocessor is not None:
+                    preprocessor.close()
+    finally:
+        os.remove(path)
+        os.rmdir(directory)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+"""Requests and time to translate one audio-hour of transcription segments.
+
+Compares one ``translate`` call per segment (through ``translate_many``)
+with ``translate_segments``, which packs consecutive segments into requests
+of up to ``--max-chars`` characters.
+
+Run with ``python -m benchmarks.bench_segment_translation``.
+"""
+
+import argparse
+import time
+
+from djelia import Djelia
+from djelia.models import Language, TranscriptionSegment, TranslationRequest
+
+from .stub_server import StubConfig, StubServer
+from .utils import API_KEY
+
+
+def make_segments(count: int, seconds: float) -> list[TranscriptionSegment]:
+    return [
+        TranscriptionSegment(
+            text=f"i ni ce, nin ye kuma {i} ye min bɛ fɔ sugu la",
+            start=i * seconds,
+            end=(i + 1) * seconds,
+        )
+        for i in range(count)
+    ]
+
+
+def per_segment(client: Djelia, segments: list[TranscriptionSegment], concurrency):
+    requests = (
+        TranslationRequest(
+            text=segment.text, source=Language.BAMBARA, target=Language.FRENCH
+        )
+        for segment in segments
+    )
+    return [
+        response.text
+        for response in client.translation.translate_many(
+            requests, concurrency=concurrency
+        )
+    ]
+
+
+def packed(client: Djelia, segments, concurrency, max_chars):
+    return [
+        segment.text
+        for segment in client.translation.translate_segments(
+            segments,
+            Language.BAMBARA,
+            Language.FRENCH,
+            max_chars=max_chars,
+            concurrency=concurrency,
+        )
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        "--segment-seconds", type=float, default=4.0, help="audio per segment"
+    )
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--max-chars", type=int, default=1000)
+    parser.add_argument(
+        "--latency", type=float, default=0.05, help="stub server latency (s)"
+    )
+    args = parser.parse_args()
+
+    segments = make_segments(int(3600 / args.segment_seconds), args.segment_seconds)
+    with StubServer(StubConfig(latency=args.latency)) as server:
+        with Djelia(api_key=API_KEY, base_url=server.base_url) as client:
+            client.translation.get_supported_languages()
+            scenarios = [
+                ("one request per segment", per_segment, ()),
+                (f"packed <= {args.max_chars} chars", packed, (args.max_chars,)),
+            ]
+            results = []
+            print(f"{len(segments)} segments per audio-hour")
+            for name, run, extra in scenarios:
+                before = server.requests
+                start = time.perf_counter()
+                results.append(run(client, segments, args.concurrency, *extra))
+                elapsed = time.perf_counter() - start
+                print(
+                    f"{name:<28} {server.requests - before:>6} requests  "
+                    f"{elapsed:7.2f} s"
+                )
+    assert results[0] == results[1], "packed translation differs"
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+"""Time to first segment of streamed transcription against a batch call.
+
+The stub emits one segment every ``--interval`` seconds, so an incremental
+reader should see the first segment after roughly one interval while the
+batch call waits for all of them. Exits non-zero when the sync stream only
+delivers its first segment once the body is complete.
+
+Run with ``python -m benchmarks.bench_stream_latency``.
+"""
+
+import argparse
+import asyncio
+import io
+import sys
+import time
+
+from djelia import Djelia, DjeliaAsync
+
+from .stub_server import StubConfig, StubServer, make_wav
+from .utils import API_KEY
+
+
+def bench_sync_stream(base_url: str, audio: bytes) -> tuple[float, float, int]:
+    with Djelia(api_key=API_KEY, base_url=base_url) as client:
+        start = time.perf_counter()
+        first = None
+        count = 0
+        for _ in client.transcription.transcribe(io.BytesIO(audio), stream=True):
+            if first is None:
+                first = time.perf_counter() - start
+            count += 1
+        return first, time.perf_counter() - start, count
+
+
+def bench_sync_batch(base_url: str, audio: bytes) -> tuple[float, float, int]:
+    with Djelia(api_key=API_KEY, base_url=base_url) as client:
+        start = time.perf_counter()
+        segments = client.transcription.transcribe(io.BytesIO(audio))
+        elapsed = time.perf_counter() - start
+        return elapsed, elapsed, len(segments)
+
+
+async def bench_async_stream(base_url: str, audio: bytes) -> tuple[float, float, int]:
+    async with DjeliaAsync(api_key=API_KEY, base_url=base_url) as client:
+        start = time.perf_counter()
+        first = None
+        count = 0
+        stream = await client.transcription.transcribe(io.BytesIO(audio), stream=True)
+        async for _ in stream:
+            if first is None:
+                first = time.perf_counter() - start
+            count += 1
+        return first, time.perf_counter() - start, count
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--segments", type=int, default=10)
+    parser.add_argument(
+        "--interval", type=float, default=0.1, help="seconds between segments"
+    )
+    args = parser.parse_args()
+
+    audio = make_wav(1.0)
+    config = StubConfig(segments=args.segments, segment_interval=args.interval)
+    with StubServer(config) as server:
+        results = {
+            "sync stream": bench_sync_stream(server.base_url, audio),
+            "sync batch": bench_sync_batch(server.base_url, audio),
+            "async stream": asyncio.run(bench_async_stream(server.base_url, audio)),
+        }
+
+    for name, (first, total, count) in results.items():
+        print(
+            f"{name:<16} {count:>4} segments  first {first * 1000:8.1f} ms  "
+            f"total {total * 1000:8.1f} ms"
+        )
+
+    first, total, _ = results["sync stream"]
+    # the first segment must arrive well before the last one is produced
+    incremental = first < total / 2
+    print("sync stream is incremental:", "PASS" if incremental else "FAIL")
+    sys.exit(0 if incremental else 1)
+
+
+if __name__ == "__main__":
+    main()
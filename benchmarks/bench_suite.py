@@ -0,0 +1,384 @@
+"""Throughput, latency, CPU and memory of the sync and async clients on every
+endpoint, against the local stub; no API key or network needed.
+
+Each client/operation pair runs in a fresh interpreter, so its CPU time and
+peak RSS are its own; the stub serves from this process. ``--output`` writes
+the results as JSON, and ``--baseline`` compares them with an earlier file
+and exits non-zero when throughput or p50 latency regress by more than
+``--threshold``.
+
+Run with ``python -m benchmarks.bench_suite``.
+"""
+
+import argparse
+import asyncio
+import io
+import json
+import platform
+import subprocess
+import sys
+import threading
+import time
+from dataclasses import asdict
+
+from .stub_server import StubConfig, StubServer, make_wav
+from .utils import API_KEY, percentile, rss_mb, summarize
+
+CLIENTS = ["sync", "async"]
+OPERATIONS = [
+    "languages",
+    "translate",
+    "transcribe",
+    "transcribe_stream",
+    "tts",
+    "tts_stream",
+]
+STREAMS = {"transcribe_stream", "tts_stream"}
+
+
+# ================================================
+#                     worker
+# ================================================
+
+
+def sync_call(client, operation: str, audio: bytes):
+    """One call; returns the seconds to its first item for streams."""
+    from djelia.models import (Language, TranslationRequest, TTSRequestV2,
+                               Versions)
+
+    start = time.perf_counter()
+    if operation == "languages":
+        client.translation.get_supported_languages(refresh=True)
+    elif operation == "translate":
+        request = TranslationRequest(
+            text="i ni ce", source=Language.BAMBARA, target=Language.FRENCH
+        )
+        client.translation.translate(request, version=Versions.v1)
+    elif operation == "transcribe":
+        client.transcription.transcribe(io.BytesIO(audio))
+    elif operation == "tts":
+        request = TTSRequestV2(text="i ni ce", description="Moussa speaks clearly")
+        client.tts.text_to_speech(request, version=Versions.v2)
+    else:
+        if operation == "transcribe_stream":
+            stream = client.transcription.transcribe(io.BytesIO(audio), stream=True)
+        else:
+            request = TTSRequestV2(text="i ni ce", description="Moussa speaks clearly")
+            stream = client.tts.text_to_speech(
+                request, stream=True, version=Versions.v2
+            )
+        first = None
+        for _ in stream:
+            if first is None:
+                first = time.perf_counter() - start
+        return first
+    return None
+
+
+async def async_call(client, operation: str, audio: bytes):
+    from djelia.models import (Language, TranslationRequest, TTSRequestV2,
+                               Versions)
+
+    start = time.perf_counter()
+    if operation == "languages":
+        await client.translation.get_supported_languages(refresh=True)
+    elif operation == "translate":
+        request = TranslationRequest(
+            text="i ni ce", source=Language.BAMBARA, target=Language.FRENCH
+        )
+        await client.translation.translate(request, version=Versions.v1)
+    elif operation == "transcribe":
+        await client.transcription.transcribe(io.BytesIO(audio))
+    elif operation == "tts":
+        request = TTSRequestV2(text="i ni ce", description="Moussa speaks clearly")
+        await client.tts.text_to_speech(request, version=Versions.v2)
+    else:
+        if operation == "transcribe_stream":
+            stream = await client.transcription.transcribe(
+                io.BytesIO(audio), stream=True
+            )
+        else:
+            request = TTSRequestV2(text="i ni ce", description="Moussa speaks clearly")
+            stream = await client.tts.text_to_speech(
+                request, stream=True, version=Versions.v2
+            )
+        first = None
+        async for _ in stream:
+            if first is None:
+                first = time.perf_counter() - start
+        return first
+    return None
+
+
+class Recorder:
+    """Latencies and failures of the measured calls."""
+
+    def __init__(self):
+        self.latencies = []
+        self.firsts = []
+        self.errors = {}
+        self.lock = threading.Lock()
+
+    def record(self, start: float, first: float | None, error: Exception | None):
+        elapsed = time.perf_counter() - start
+        with self.lock:
+            if error is not None:
+                name = type(error).__name__
+                self.errors[name] = self.errors.get(name, 0) + 1
+                return
+            self.latencies.append(elapsed)
+            if first is not None:
+                self.firsts.append(first)
+
+
+def run_sync(args, base_url: str, audio: bytes, recorder: Recorder):
+    from concurrent.futures import ThreadPoolExecutor
+
+    from djelia import Djelia, RetryPolicy
+
+    policy = RetryPolicy(max_attempts=args.attempts, backoff_factor=args.backoff)
+    with Djelia(api_key=API_KEY, base_url=base_url, retry_policy=policy) as client:
+
+        def call(_):
+            start = time.perf_counter()
+            try:
+                first = sync_call(client, args.operation, audio)
+            except Exception as e:
+                recorder.record(start, None, e)
+            else:
+                recorder.record(start, first, None)
+
+        for _ in range(args.warmup):
+            sync_call(client, args.operation, audio)
+        with ThreadPoolExecutor(max_workers=args.concurrency) as executor:
+            cpu, start = time.process_time(), time.perf_counter()
+            list(executor.map(call, range(args.calls)))
+            return time.perf_counter() - start, time.process_time() - cpu
+
+
+def run_async(args, base_url: str, audio: bytes, recorder: Recorder):
+    from djelia import DjeliaAsync, RetryPolicy
+
+    async def main():
+        policy = RetryPolicy(max_attempts=args.attempts, backoff_factor=args.backoff)
+        async with DjeliaAsync(
+            api_key=API_KEY, base_url=base_url, retry_policy=policy
+        ) as client:
+            for _ in range(args.warmup):
+                await async_call(client, args.operation, audio)
+            remaining = iter(range(args.calls))
+
+            async def worker():
+                for _ in remaining:
+                    start = time.perf_counter()
+                    try:
+                        first = await async_call(client, args.operation, audio)
+                    except Exception as e:
+                        recorder.record(start, None, e)
+                    else:
+                        recorder.record(start, first, None)
+
+            cpu, start = time.process_time(), time.perf_counter()
+            await asyncio.gather(*(worker() for _ in range(args.concurrency)))
+            return time.perf_counter() - start, time.process_time() - cpu
+
+    return asyncio.run(main())
+
+
+def run_worker(args) -> None:
+    import djelia  # noqa: F401 - imported before the baseline is taken
+
+    audio = make_wav(args.upload_seconds)
+    recorder = Recorder()
+    run = run_sync if args.client == "sync" else run_async
+    # before the client and its warm-up calls: interpreter and imports
+    baseline = rss_mb()
+    # wall and CPU time of the measured calls, warm-up excluded
+    wall, cpu = run(args, args.url, audio, recorder)
+
+    stats = summarize(recorder.latencies)
+    errors = sum(recorder.errors.values())
+    result = {
+        "client": args.client,
+        "operation": args.operation,
+        "concurrency": args.concurrency,
+        **stats,
+        "errors": errors,
+        "errors_by_type": recorder.errors,
+        "wall_s": wall,
+        "throughput_rps": stats["calls"] / wall if wall else 0.0,
+        "cpu_s": cpu,
+        "cpu_ms_per_call": cpu * 1000 / max(1, stats["calls"] + errors),
+        "baseline_rss_mb": baseline,
+        "peak_rss_mb": rss_mb(),
+    }
+    if args.operation in STREAMS:
+        result["first_p50_ms"] = percentile(recorder.firsts, 50) * 1000
+        result["first_p99_ms"] = percentile(recorder.firsts, 99) * 1000
+    print(json.dumps(result))
+
+
+# ================================================
+#                     driver
+# ================================================
+
+
+def run_scenario(args, client: str, operation: str, base_url: str) -> dict:
+    command = [
+        sys.executable,
+        "-m",
+        "benchmarks.bench_suite",
+        "--worker",
+        "--client",
+        client,
+        "--operation",
+        operation,
+        "--url",
+        base_url,
+        "--calls",
+        str(args.calls),
+        "--concurrency",
+        str(args.concurrency),
+        "--warmup",
+        str(args.warmup),
+        "--attempts",
+        str(args.attempts),
+        "--backoff",
+        str(args.backoff),
+        "--upload-seconds",
+        str(args.upload_seconds),
+    ]
+    output = subprocess.run(command, capture_output=True, text=True, check=True)
+    return json.loads(output.stdout.strip().splitlines()[-1])
+
+
+def print_result(result: dict) -> None:
+    first = ""
+    if "first_p50_ms" in result:
+        first = f"  first p50 {result['first_p50_ms']:7.2f} ms"
+    print(
+        f"{result['client']:<6} {result['operation']:<18} "
+        f"{result['throughput_rps']:8.1f} req/s  "
+        f"p50 {result['p50_ms']:7.2f} ms  p99 {result['p99_ms']:7.2f} ms  "
+        f"cpu {result['cpu_ms_per_call']:6.2f} ms/call  "
+        f"peak {result['peak_rss_mb']:6.1f} MiB  "
+        f"errors {result['errors']}{first}"
+    )
+
+
+def compare(results: list[dict], baseline: dict, threshold: float) -> list[str]:
+    """Scenarios whose throughput or p50 latency got worse than ``threshold``
+    (a fraction) compared with ``baseline``.
+    """
+    previous = {(r["client"], r["operation"]): r for r in baseline["results"]}
+    regressions = []
+    for result in results:
+        before = previous.get((result["client"], result["operation"]))
+        if before is None:
+            continue
+        name = f"{result['client']} {result['operation']}"
+        if result["throughput_rps"] < before["throughput_rps"] * (1 - threshold):
+            regressions.append(
+                f"{name}: throughput {before['throughput_rps']:.1f} -> "
+                f"{result['throughput_rps']:.1f} req/s"
+            )
+        if result["p50_ms"] > before["p50_ms"] * (1 + threshold):
+            regressions.append(
+                f"{name}: p50 {before['p50_ms']:.2f} -> {result['p50_ms']:.2f} ms"
+            )
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--clients", default=",".join(CLIENTS))
+    parser.add_argument("--operations", default=",".join(OPERATIONS))
+    parser.add_argument("--calls", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--warmup", type=int, default=5)
+    parser.add_argument("--attempts", type=int, default=3, help="retry attempts")
+    parser.add_argument("--backoff", type=float, default=0.05)
+    parser.add_argument("--upload-seconds", type=float, default=5.0)
+    parser.add_argument(
+        "--latency", type=float, default=0.01, help="stub server latency (s)"
+    )
+    parser.add_argument("--jitter", type=float, default=0.005)
+    parser.add_argument(
+        "--segment-interval",
+        type=float,
+        default=0.002,
+        help="seconds between streamed transcription segments",
+    )
+    parser.add_argument(
+        "--chunk-interval",
+        type=float,
+        default=0.001,
+        help="seconds between streamed TTS chunks",
+    )
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="write the results to this JSON file")
+    parser.add_argument("--baseline", help="JSON results to compare with")
+    parser.add_argument("--threshold", type=float, default=0.1)
+    # a single scenario, run by the driver in a fresh interpreter
+    parser.add_argument("--worker", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--client", help=argparse.SUPPRESS)
+    parser.add_argument("--operation", help=argparse.SUPPRESS)
+    parser.add_argument("--url", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        run_worker(args)
+        return
+
+    config = StubConfig(
+        latency=args.latency,
+        jitter=args.jitter,
+        segment_interval=args.segment_interval,
+        chunk_interval=args.chunk_interval,
+        error_rate=args.error_rate,
+        # a POST is only retried when the server did not process it
+        error_status=503,
+        seed=args.seed,
+    )
+    results = []
+    with StubServer(config) as server:
+        for operation in args.operations.split(","):
+            for client in args.clients.split(","):
+                result = run_scenario(args, client, operation, server.base_url)
+                print_result(result)
+                results.append(result)
+        injected = server.injected
+
+    report = {
+        "created": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "stub": asdict(config),
+        "settings": {
+            "calls": args.calls,
+            "concurrency": args.concurrency,
+            "warmup": args.warmup,
+            "attempts": args.attempts,
+            "backoff": args.backoff,
+            "upload_seconds": args.upload_seconds,
+        },
+        "injected_errors": injected,
+        "results": results,
+    }
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"results written to {args.output}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(results, json.load(f), args.threshold)
+        for line in regressions:
+            print(f"REGRESSION {line}")
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
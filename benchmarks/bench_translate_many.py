@@ -0,0 +1,93 @@
+"""Throughput of serial translate() calls against translate_many().
+
+Run with ``python -m benchmarks.bench_translate_many``.
+"""
+
+import argparse
+import asyncio
+import time
+
+from djelia import Djelia, DjeliaAsync
+from djelia.models import Language, TranslationRequest, Versions
+
+from .stub_server import StubConfig, StubServer
+from .utils import API_KEY
+
+
+def make_requests(count: int) -> list[TranslationRequest]:
+    return [
+        TranslationRequest(
+            text=f"sentence number {i}",
+            source=Language.ENGLISH,
+            target=Language.BAMBARA,
+        )
+        for i in range(count)
+    ]
+
+
+def bench_serial(base_url: str, requests: list[TranslationRequest]) -> float:
+    with Djelia(api_key=API_KEY, base_url=base_url) as client:
+        start = time.perf_counter()
+        for request in requests:
+            client.translation.translate(request, version=Versions.v1)
+        return time.perf_counter() - start
+
+
+def bench_sync_many(
+    base_url: str, requests: list[TranslationRequest], concurrency: int
+) -> float:
+    with Djelia(api_key=API_KEY, base_url=base_url) as client:
+        start = time.perf_counter()
+        for result in client.translation.translate_many(
+            requests, concurrency=concurrency, return_exceptions=True
+        ):
+            assert not isinstance(result, Exception), result
+        return time.perf_counter() - start
+
+
+async def bench_async_many(
+    base_url: str, requests: list[TranslationRequest], concurrency: int
+) -> float:
+    async with DjeliaAsync(api_key=API_KEY, base_url=base_url) as client:
+        start = time.perf_counter()
+        async for result in client.translation.translate_many(
+            requests, concurrency=concurrency, return_exceptions=True
+        ):
+            assert not isinstance(result, Exception), result
+        return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--requests", type=int, default=400)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument(
+        "--latency", type=float, default=0.02, help="stub server latency (s)"
+    )
+    args = parser.parse_args()
+
+    requests = make_requests(args.requests)
+    with StubServer(StubConfig(latency=args.latency)) as server:
+        scenarios = [
+            ("serial translate()", lambda: bench_serial(server.base_url, requests)),
+            (
+                f"sync translate_many({args.concurrency})",
+                lambda: bench_sync_many(server.base_url, requests, args.concurrency),
+            ),
+            (
+                f"async translate_many({args.concurrency})",
+                lambda: asyncio.run(
+                    bench_async_many(server.base_url, requests, args.concurrency)
+                ),
+            ),
+        ]
+        for name, run in scenarios:
+            elapsed = run()
+            print(
+                f"{name:<32} {len(requests):>6} requests  {elapsed:7.3f} s  "
+                f"{len(requests) / elapsed:9.1f} req/s"
+            )
+
+
+if __name__ == "__main__":
+    main()
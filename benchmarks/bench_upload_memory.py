@@ -0,0 +1,115 @@
+"""Peak RSS of a process uploading audio files of growing size for transcription.
+
+Every measurement runs in a fresh interpreter so peaks do not leak between
+runs. ``legacy-*`` modes reproduce the previous read-everything uploads.
+
+Run with ``python -m benchmarks.bench_upload_memory``.
+"""
+
+import argparse
+import asyncio
+import os
+import subprocess
+import sys
+import tempfile
+
+from .utils import rss_mb
+
+MODES = ["legacy-sync", "sync", "sync-mmap", "legacy-async", "async", "async-mmap"]
+
+
+def run_worker(mode: str, path: str, base_url: str) -> None:
+    import aiohttp
+    import requests
+
+    from djelia import Djelia, DjeliaAsync
+    from djelia.config import TransportConfig
+    from djelia.models import DjeliaRequest, Versions
+
+    from .utils import API_KEY
+
+    url = DjeliaRequest.transcribe.endpoint.format(Versions.v2.value).replace(
+        DjeliaRequest.base_url, base_url
+    )
+    transport = TransportConfig(upload_mmap=mode.endswith("mmap"))
+
+    if mode == "legacy-sync":
+        with open(path, "rb") as f:
+            requests.post(url, headers={"x-api-key": API_KEY}, files={"file": f})
+    elif mode.startswith("sync"):
+        with Djelia(api_key=API_KEY, base_url=base_url, transport=transport) as c:
+            c.transcription.transcribe(path)
+    elif mode == "legacy-async":
+
+        async def legacy():
+            async with aiohttp.ClientSession() as session:
+                data = aiohttp.FormData()
+                with open(path, "rb") as f:
+                    data.add_field("file", f.read(), filename="audio.wav")
+                async with session.post(
+                    url, data=data, headers={"x-api-key": API_KEY}
+                ) as response:
+                    await response.read()
+
+        asyncio.run(legacy())
+    else:
+
+        async def streamed():
+            async with DjeliaAsync(
+                api_key=API_KEY, base_url=base_url, transport=transport
+            ) as c:
+                await c.transcription.transcribe(path)
+
+        asyncio.run(streamed())
+
+    print(f"{rss_mb():.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--sizes", default="32,128,512", help="file sizes in MiB")
+    parser.add_argument("--worker", nargs=3, metavar=("MODE", "PATH", "URL"))
+    args = parser.parse_args()
+
+    if args.worker:
+        run_worker(*args.worker)
+        return
+
+    from .stub_server import StubServer
+
+    sizes = [int(size) for size in args.sizes.split(",")]
+    directory = tempfile.mkdtemp(prefix="djelia-bench-")
+    print(f"{'peak RSS':<14}" + "".join(f"{f'{size} MiB':>12}" for size in sizes))
+    with StubServer() as server:
+        files = {}
+        for size in sizes:
+            files[size] = os.path.join(directory, f"audio_{size}.wav")
+            block = os.urandom(1024 * 1024)
+            with open(files[size], "wb") as f:
+                for _ in range(size):
+                    f.write(block)
+        for mode in MODES:
+            row = []
+            for size in sizes:
+                output = subprocess.run(
+                    [
+                        sys.executable,
+                        "-m",
+                        "benchmarks.bench_upload_memory",
+                        "--worker",
+                        mode,
+                        files[size],
+                        server.base_url,
+                    ],
+                    capture_output=True,
+                    text=True,
+                    check=True,
+                )
+                row.append(float(output.stdout.strip().splitlines()[-1]))
+            print(f"{mode:<14}" + "".join(f"{f'{mb:.1f} MiB':>12}" for mb in row))
+    for path in files.values():
+        os.remove(path)
+
+
+if __name__ == "__main__":
+    main()
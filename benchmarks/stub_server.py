@@ -0,0 +1,457 @@
+import io
+import json
+import os
+import random
+import ssl
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import wave
+from collections import deque
+from dataclasses import dataclass
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+# ================================================
+#             Local Djelia API Stub
+# ================================================
+
+
+@dataclass
+class StubConfig:
+    latency: float = 0.0
+    # up to this many extra seconds, drawn uniformly, on every request
+    jitter: float = 0.0
+    segments: int = 5
+    audio_seconds: float = 1.0
+    sample_rate: int = 16000
+    # seconds the "model" spends producing each transcription segment
+    segment_interval: float = 0.0
+    # streamed TTS audio: bytes per chunk and seconds between chunks
+    chunk_size: int = 8192
+    chunk_interval: float = 0.0
+    # simulated uplink in bytes per second (0 means unlimited)
+    upload_bandwidth: float = 0.0
+    # requests per second per route before answering 429 (0 means unlimited)
+    max_rate: float = 0.0
+    # Retry-After sent with 429 responses, None omits the header
+    retry_after: float | None = 1.0
+    # concurrent requests served at full speed, as (seconds since start,
+    # capacity) steps; past it latency grows with the load (None: unlimited)
+    capacity: list[tuple[float, int]] | None = None
+    # load, in multiples of the capacity, past which requests fail with 503
+    overload: float = 2.0
+    # fraction of requests failed with ``error_status`` after their latency
+    error_rate: float = 0.0
+    error_status: int = 500
+    # seeds jitter and error injection, for runs that can be compared
+    seed: int | None = None
+    # the first this many requests fail with ``error_status``, for tests
+    # that need a retry to happen
+    fail_first: int = 0
+
+
+LANGUAGES = [
+    {"code": "fra_Latn", "name": "French"},
+    {"code": "eng_Latn", "name": "English"},
+    {"code": "bam_Latn", "name": "Bambara"},
+]
+LANGUAGES_ETAG = '"languages-v1"'
+
+
+def make_wav(seconds: float, sample_rate: int = 16000) -> bytes:
+    buffer = io.BytesIO()
+    with wave.open(buffer, "wb") as w:
+        w.setnchannels(1)
+        w.setsampwidth(2)
+        w.setframerate(sample_rate)
+        w.writeframes(b"\x00\x00" * int(seconds * sample_rate))
+    return buffer.getvalue()
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+
+    def setup(self):
+        super().setup()
+        with self.server.lock:
+            self.server.connections += 1
+
+    def handle_one_request(self):
+        self.admitted = False
+        try:
+            super().handle_one_request()
+        finally:
+            if self.admitted:
+                with self.server.lock:
+                    self.server.active -= 1
+
+    def log_message(self, format, *args):
+        pass
+
+    @property
+    def config(self) -> StubConfig:
+        return self.server.config
+
+    def _read_body(self, keep: bool = True) -> bytes:
+        # uploads are drained in small reads and dropped unless ``keep`` so the
+        # stub's own memory stays flat when large files are posted
+        body = bytearray()
+        self.received = 0
+
+        def consume(size: int) -> None:
+            while size > 0:
+                data = self.rfile.read(min(size, 64 * 1024))
+                if not data:
+                    return
+                size -= len(data)
+                self.received += len(data)
+                if self.config.upload_bandwidth:
+                    time.sleep(len(data) / self.config.upload_bandwidth)
+                if keep:
+                    body.extend(data)
+
+        if self.headers.get("Transfer-Encoding", "").lower() == "chunked":
+            while True:
+                size = int(self.rfile.readline().strip().split(b";")[0], 16)
+                if size == 0:
+                    self.rfile.readline()
+                    break
+                consume(size)
+                self.rfile.readline()
+        else:
+            consume(int(self.headers.get("Content-Length", 0)))
+        with self.server.lock:
+            self.server.requests += 1
+            self.server.bytes_received += self.received
+            self.server.request_sizes.append(self.received)
+        return bytes(body)
+
+    def _send(self, status: int, body: bytes, content_type: str, headers=None):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _send_json(self, status: int, payload, headers=None):
+        self._send(status, json.dumps(payload).encode(), "application/json", headers)
+
+    def _start_chunked(self, content_type: str):
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+
+    def _write_chunk(self, data: bytes):
+        self.wfile.write(b"%x\r\n%s\r\n" % (len(data), data))
+        self.wfile.flush()
+
+    def _route(self):
+        url = urlparse(self.path)
+        route = url.path.split("/models/", 1)[-1]
+        query = {key: values[-1] for key, values in parse_qs(url.query).items()}
+        return route, query
+
+    def _segments(self):
+        return [
+            {"text": f"segment {i}", "start": float(i), "end": float(i + 1)}
+            for i in range(self.config.segments)
+        ]
+
+    def _throttled(self, route: str) -> bool:
+        # sliding one second window per route, like a quota on the API key
+        if not self.config.max_rate:
+            return False
+        now = time.monotonic()
+        with self.server.lock:
+            window = self.server.windows.setdefault(route, deque())
+            while window and window[0] <= now - 1.0:
+                window.popleft()
+            if len(window) >= self.config.max_rate:
+                self.server.throttled += 1
+                return True
+            window.append(now)
+        return False
+
+    def _capacity(self) -> int | None:
+        steps = self.config.capacity
+        if not steps:
+            return None
+        elapsed = time.monotonic() - self.server.started
+        return next(
+            (capacity for start, capacity in reversed(steps) if start <= elapsed),
+            steps[0][1],
+        )
+
+    def _latency(self) -> float | None:
+        # a processor shared by the requests in flight: slower once over
+        # capacity, refusing work far past it
+        capacity = self._capacity()
+        if capacity is None:
+            return self.config.latency
+        with self.server.lock:
+            self.server.active += 1
+            active = self.server.active
+            self.admitted = True
+            if active > capacity * self.config.overload:
+                self.server.overloaded += 1
+                return None
+        return self.config.latency * max(1.0, active / capacity)
+
+    def _work(self) -> bool:
+        latency = self._latency()
+        if latency is None:
+            self._send_json(503, {"detail": "Service Unavailable"})
+            return False
+        config = self.config
+        if config.jitter:
+            latency += self.server.random.uniform(0.0, config.jitter)
+        time.sleep(latency)
+        if config.error_rate and self.server.random.random() < config.error_rate:
+            with self.server.lock:
+                self.server.injected += 1
+            self._send_json(config.error_status, {"detail": "Injected failure"})
+            return False
+        return True
+
+    def _send_throttled(self):
+        headers = {}
+        if self.config.retry_after is not None:
+            headers["Retry-After"] = f"{self.config.retry_after:g}"
+        self._send_json(429, {"detail": "Too Many Requests"}, headers)
+
+    def _fail_first(self) -> bool:
+        # deterministic failures, see ``fail_first``
+        with self.server.lock:
+            failing = self.server.failed < self.config.fail_first
+            if failing:
+                self.server.failed += 1
+        if failing:
+            self._send_json(self.config.error_status, {"detail": "Injected failure"})
+        return failing
+
+    def do_GET(self):
+        route, _ = self._route()
+        self._read_body()
+        if self._fail_first():
+            return
+        if self._throttled(route):
+            return self._send_throttled()
+        if not self._work():
+            return
+        if route == "translate/supported-languages":
+            if self.headers.get("If-None-Match") == LANGUAGES_ETAG:
+                self._send(304, b"", "application/json", {"ETag": LANGUAGES_ETAG})
+            else:
+                self._send_json(200, LANGUAGES, {"ETag": LANGUAGES_ETAG})
+        else:
+            self._send_json(404, {"detail": "Not Found"})
+
+    def do_POST(self):
+        route, query = self._route()
+        body = self._read_body(keep=not route.startswith("transcribe"))
+        if self._fail_first():
+            return
+        if self._throttled(route):
+            return self._send_throttled()
+        if not self._work():
+            return
+        french = query.get("translate_to_french") == "true"
+
+        if route == "translate":
+            request = json.loads(body or b"{}")
+            # "translates" line by line, like the real model keeps line breaks
+            lines = request.get("text", "").split("\n")
+            self._send_json(200, {"text": "\n".join(line[::-1] for line in lines)})
+        elif route == "transcribe":
+            time.sleep(self.config.segment_interval * self.config.segments)
+            if french:
+                self._send_json(200, {"text": "transcription en français"})
+            else:
+                self._send_json(200, self._segments())
+        elif route == "transcribe/stream":
+            self._start_chunked("application/x-ndjson")
+            for segment in self._segments():
+                time.sleep(self.config.segment_interval)
+                if french:
+                    segment = {"text": segment["text"]}
+                self._write_chunk(json.dumps(segment).encode() + b"\n")
+            self._write_chunk(b"")
+        elif route == "tts":
+            audio = make_wav(self.config.audio_seconds, self.config.sample_rate)
+            self._send(200, audio, "audio/wav")
+        elif route == "tts/stream":
+            audio = make_wav(self.config.audio_seconds, self.config.sample_rate)
+            size = self.config.chunk_size
+            self._start_chunked("audio/wav")
+            for offset in range(0, len(audio), size):
+                if offset:
+                    time.sleep(self.config.chunk_interval)
+                self._write_chunk(audio[offset : offset + size])
+            self._write_chunk(b"")
+        else:
+            self._send_json(404, {"detail": "Not Found"})
+
+
+class _StubHTTPServer(ThreadingHTTPServer):
+    daemon_threads = True
+    # the default backlog of 5 drops SYNs under fan-out and adds 1s retransmits
+    request_queue_size = 1024
+
+    def handle_error(self, request, client_address):
+        # clients dropping a stream early are expected, not worth a traceback
+        if not isinstance(sys.exc_info()[1], ConnectionError):
+            super().handle_error(request, client_address)
+
+
+class StubServer:
+    """Runs the stub API on a background thread.
+
+    Usage::
+
+        with StubServer(StubConfig(latency=0.005)) as server:
+            client = Djelia(api_key=..., base_url=server.base_url)
+    """
+
+    def __init__(
+        self, config: StubConfig | None = None, port: int = 0, tls: bool = False
+    ):
+        self.httpd = _StubHTTPServer(("127.0.0.1", port), StubHandler)
+        self.httpd.config = config or StubConfig()
+        self.httpd.lock = threading.Lock()
+        self.httpd.connections = 0
+        self.httpd.failed = 0
+        self.httpd.request_sizes = []
+        self.httpd.bytes_received = 0
+        self.httpd.requests = 0
+        self.httpd.throttled = 0
+        self.httpd.overloaded = 0
+        self.httpd.injected = 0
+        self.httpd.random = random.Random(self.httpd.config.seed)
+        self.httpd.active = 0
+        self.httpd.started = time.monotonic()
+        self.httpd.windows = {}
+        self.tls = tls
+        self.cert_file = None
+        self._thread = None
+        if tls:
+            self._wrap_tls()
+
+    def _wrap_tls(self) -> None:
+        # self-signed certificate; point REQUESTS_CA_BUNDLE / SSL_CERT_FILE at
+        # ``cert_file`` so clients verify it like a real one
+        directory = tempfile.mkdtemp(prefix="djelia-stub-")
+        self.cert_file = os.path.join(directory, "cert.pem")
+        key_file = os.path.join(directory, "key.pem")
+        subprocess.run(
+            [
+                "openssl",
+                "req",
+                "-x509",
+                "-newkey",
+                "rsa:2048",
+                "-nodes",
+                "-days",
+                "1",
+                "-subj",
+                "/CN=127.0.0.1",
+                "-addext",
+                "subjectAltName=IP:127.0.0.1",
+                "-keyout",
+                key_file,
+                "-out",
+                self.cert_file,
+            ],
+            check=True,
+            capture_output=True,
+        )
+        context = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+        context.load_cert_chain(self.cert_file, key_file)
+        self.httpd.socket = context.wrap_socket(self.httpd.socket, server_side=True)
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.httpd.server_address[:2]
+        scheme = "https" if self.tls else "http"
+        return f"{scheme}://{host}:{port}"
+
+    @property
+    def connections(self) -> int:
+        return self.httpd.connections
+
+    @property
+    def bytes_received(self) -> int:
+        return self.httpd.bytes_received
+
+    @property
+    def requests(self) -> int:
+        return self.httpd.requests
+
+    @property
+    def throttled(self) -> int:
+        """Requests answered with 429."""
+        return self.httpd.throttled
+
+    @property
+    def overloaded(self) -> int:
+        """Requests answered with 503, past ``overload`` times the capacity."""
+        return self.httpd.overloaded
+
+    @property
+    def injected(self) -> int:
+        """Requests failed on purpose, see ``error_rate``."""
+        return self.httpd.injected
+
+    @property
+    def request_sizes(self) -> list[int]:
+        """Body bytes received by each request, in arrival order."""
+        return self.httpd.request_sizes
+
+    def start(self) -> "StubServer":
+        self.httpd.started = time.monotonic()
+        self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def __enter__(self) -> "StubServer":
+        return self.start()
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.stop()
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Run the Djelia API stub")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--latency", type=float, default=0.0)
+    parser.add_argument("--jitter", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    args = parser.parse_args()
+
+    config = StubConfig(
+        latency=args.latency, jitter=args.jitter, error_rate=args.error_rate
+    )
+    server = StubServer(config, port=args.port)
+    print(f"Djelia stub listening on {server.base_url}", flush=True)
+    try:
+        server.httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.httpd.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,45 @@
+import resource
+import statistics
+import uuid
+
+# any well-formed key is accepted by the stub server
+API_KEY = str(uuid.UUID(int=0))
+
+
+def percentile(values: list[float], pct: float) -> float:
+    ordered = sorted(values)
+    if not ordered:
+        return 0.0
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+def summarize(latencies: list[float]) -> dict[str, float]:
+    return {
+        "calls": len(latencies),
+        "mean_ms": statistics.fmean(latencies) * 1000 if latencies else 0.0,
+        "p50_ms": percentile(latencies, 50) * 1000,
+        "p99_ms": percentile(latencies, 99) * 1000,
+    }
+
+
+def print_row(name: str, stats: dict[str, float], extra: str = "") -> None:
+    print(
+        f"{name:<32} {stats['calls']:>6} calls  "
+        f"mean {stats['mean_ms']:7.3f} ms  "
+        f"p50 {stats['p50_ms']:7.3f} ms  "
+        f"p99 {stats['p99_ms']:7.3f} ms  {extra}"
+    )
+
+
+def rss_mb() -> float:
+    # VmHWM belongs to this process image, ru_maxrss (KiB on Linux) can carry
+    # the parent's peak over fork/exec
+    try:
+        with open("/proc/self/status") as status:
+            for line in status:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
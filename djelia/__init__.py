@@ -1,3 +1,16 @@
-from djelia.src.client import Djelia, DjeliaAsync
+from djelia.src.client import (ConcurrencyLimiter, Djelia, DjeliaAsync,
+                               Metrics, RateLimiter, RequestEvent, RetryBudget,
+                               RetryPolicy, SharedRateLimiter, Tracing)
 
-__all__ = ["Djelia", "DjeliaAsync"]
+__all__ = [
+    "Djelia",
+    "DjeliaAsync",
+    "RetryPolicy",
+    "RetryBudget",
+    "RateLimiter",
+    "SharedRateLimiter",
+    "ConcurrencyLimiter",
+    "RequestEvent",
+    "Metrics",
+    "Tracing",
+]
@@ -0,0 +1,3 @@
+from .transport import TransportConfig
+
+__all__ = ["TransportConfig"]
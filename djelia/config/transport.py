@@ -0,0 +1,35 @@
+from dataclasses import dataclass
+
+
+@dataclass
+class TransportConfig:
+    """HTTP transport options shared by every service of a client."""
+
+    # number of per-host connection pools kept by the sync client
+    pool_size: int = 10
+    # sync: idle connections kept alive per host, async: concurrent connections
+    # per host (0 means no per-host cap)
+    max_connections_per_host: int = 100
+    # async: concurrent connections across all hosts (0 means unlimited)
+    max_connections: int = 100
+    # wait for a pooled connection instead of opening a throwaway one
+    pool_block: bool = False
+    keep_alive: bool = True
+    # async: seconds an idle connection is kept before being closed
+    keepalive_timeout: float = 15.0
+    # async: seconds resolved addresses are cached (None caches forever)
+    use_dns_cache: bool = True
+    dns_cache_ttl: int | None = 10
+    # timeouts in seconds, None disables them; total_timeout is async only
+    connect_timeout: float | None = None
+    read_timeout: float | None = None
+    total_timeout: float | None = None
+    # uploads are streamed from disk in chunks of this many bytes
+    upload_chunk_size: int = 64 * 1024
+    # read uploads through a memory map (zero-copy slices) when possible
+    upload_mmap: bool = False
+    # streamed responses (TTS audio) are read in chunks of this many bytes
+    stream_chunk_size: int = 8192
+    # async: threads doing blocking file I/O (uploads, output files, caches),
+    # which also bounds how many files are read or written at once
+    io_workers: int = 4
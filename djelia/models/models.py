@@ -33,7 +33,8 @@ class HttpRequestInfo:
 
 
 class DjeliaRequest:
-    endpoint_prefix = "https://djelia.cloud/api/v{}/models/"
+    base_url = "https://djelia.cloud"
+    endpoint_prefix = base_url + "/api/v{}/models/"
 
     get_supported_languages: HttpRequestInfo = HttpRequestInfo(
         endpoint=endpoint_prefix + "translate/supported-languages", method="GET"
@@ -114,3 +115,17 @@ class ErrorsMessage:
     tts_v1_request_error: str = "TTSRequest required for V1"
     tts_v2_request_error: str = "TTSRequestV2 required for V2"
     tts_streaming_compatibility: str = "Streaming is only available for TTS V2"
+    language_unsupported: str = "Unsupported language {}, expected one of {}"
+    audio_decode_error: str = "Could not decode audio file {}"
+    optional_dependency: str = (
+        "{} is required for this feature, install it with: pip install djelia[{}]"
+    )
+    tts_segment_format_error: str = (
+        "Long-text TTS needs WAV audio in one format for every segment: {}"
+    )
+    shared_limiter_unsupported: str = (
+        "SharedRateLimiter needs fcntl, which is only available on POSIX systems"
+    )
+    audio_format_unsupported: str = (
+        "Long-audio transcription needs a PCM WAV file:\n Exception {}"
+    )
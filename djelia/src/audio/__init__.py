@@ -0,0 +1,31 @@
+from .chunking import (AudioWindow, TranscriptionProgress, WavWindows,
+                       stitch_segments)
+from .longform import WavJoiner, split_text
+from .preprocess import AudioPreprocessor, PreprocessedAudio
+from .sinks import (AudioSink, FileSink, RingBufferSink, SocketSink,
+                    StreamSink, as_sink, finalize_wav)
+from .upload import AudioPayload, AudioUpload, MultipartFileStream
+from .vad import SilenceTrimmer, TimeMap
+
+__all__ = [
+    "AudioUpload",
+    "AudioPayload",
+    "MultipartFileStream",
+    "AudioSink",
+    "FileSink",
+    "StreamSink",
+    "SocketSink",
+    "RingBufferSink",
+    "as_sink",
+    "finalize_wav",
+    "AudioWindow",
+    "WavWindows",
+    "TranscriptionProgress",
+    "stitch_segments",
+    "split_text",
+    "WavJoiner",
+    "AudioPreprocessor",
+    "PreprocessedAudio",
+    "SilenceTrimmer",
+    "TimeMap",
+]
@@ -0,0 +1,202 @@
+import io
+import math
+import re
+import wave
+from array import array
+from collections.abc import Iterator
+from dataclasses import dataclass
+from typing import BinaryIO
+
+from djelia.models import ErrorsMessage, TranscriptionSegment
+
+# frame length (seconds) used to look for the quietest place to cut
+_ENERGY_FRAME = 0.02
+
+
+@dataclass
+class AudioWindow:
+    """One overlapping slice of a long recording, as a standalone WAV file."""
+
+    index: int
+    start: float
+    end: float
+    data: bytes
+
+
+@dataclass
+class TranscriptionProgress:
+    """Reported once per finished window of a long-audio transcription."""
+
+    window: int
+    windows: int
+    completed: int
+    start: float
+    end: float
+
+    @property
+    def fraction(self) -> float:
+        return self.completed / self.windows if self.windows else 1.0
+
+
+def _frame_energies(frames: bytes, width: int, channels: int, frame: int) -> list:
+    if width != 2:
+        return []
+    samples = array("h", frames)
+    step = frame * channels
+    return [
+        sum(s * s for s in samples[i : i + step]) / step
+        for i in range(0, len(samples) - step + 1, step)
+    ]
+
+
+class WavWindows:
+    """Splits a PCM WAV file into overlapping windows, read lazily.
+
+    Each cut is moved to the quietest ``search_seconds`` before the nominal
+    window end (16-bit audio only) so words are less likely to be split, and
+    the next window starts ``overlap_seconds`` before it.
+    """
+
+    def __init__(
+        self,
+        audio_file: str | BinaryIO,
+        window_seconds: float = 30.0,
+        overlap_seconds: float = 2.0,
+        search_seconds: float = 2.0,
+    ):
+        if window_seconds <= overlap_seconds + search_seconds:
+            raise ValueError("window_seconds must exceed overlap + search seconds")
+        self.audio_file = audio_file
+        self.window_seconds = window_seconds
+        self.overlap_seconds = overlap_seconds
+        self.search_seconds = search_seconds
+        self._bounds = None
+        # streams are read from where they were positioned, like uploads
+        self._offset = None if isinstance(audio_file, str) else audio_file.tell()
+        try:
+            with self._open() as wav:
+                self.params = wav.getparams()
+        except (wave.Error, EOFError) as e:
+            raise ValueError(ErrorsMessage.audio_format_unsupported.format(str(e)))
+
+    def _open(self) -> wave.Wave_read:
+        if self._offset is not None:
+            self.audio_file.seek(self._offset)
+        return wave.open(self.audio_file, "rb")
+
+    @property
+    def duration(self) -> float:
+        return self.params.nframes / self.params.framerate
+
+    def __len__(self) -> int:
+        return len(self.bounds)
+
+    @property
+    def bounds(self) -> list[tuple[int, int]]:
+        """``(start, end)`` frame of every window; only cut regions are read."""
+        if self._bounds is None:
+            rate = self.params.framerate
+            total = self.params.nframes
+            window = int(self.window_seconds * rate)
+            overlap = int(self.overlap_seconds * rate)
+            bounds = []
+            with self._open() as wav:
+                start = 0
+                while True:
+                    end = min(total, start + window)
+                    if end < total:
+                        end = self._cut(wav, start, end)
+                    bounds.append((start, end))
+                    if end >= total:
+                        break
+                    start = max(start + 1, end - overlap)
+            self._bounds = bounds
+        return self._bounds
+
+    def _cut(self, wav: wave.Wave_read, start: int, end: int) -> int:
+        rate = self.params.framerate
+        search = int(self.search_seconds * rate)
+        frame = max(1, int(_ENERGY_FRAME * rate))
+        wav.setpos(end - search)
+        energies = _frame_energies(
+            wav.readframes(search),
+            self.params.sampwidth,
+            self.params.nchannels,
+            frame,
+        )
+        if not energies:
+            return end
+        quietest = min(range(len(energies)), key=energies.__getitem__)
+        return max(start + 1, end - search + quietest * frame + frame // 2)
+
+    def _encode(self, frames: bytes) -> bytes:
+        buffer = io.BytesIO()
+        with wave.open(buffer, "wb") as out:
+            out.setparams(self.params)
+            out.writeframes(frames)
+        return buffer.getvalue()
+
+    def __iter__(self) -> Iterator[AudioWindow]:
+        rate = self.params.framerate
+        with self._open() as wav:
+            for index, (start, end) in enumerate(self.bounds):
+                wav.setpos(start)
+                yield AudioWindow(
+                    index=index,
+                    start=start / rate,
+                    end=end / rate,
+                    data=self._encode(wav.readframes(end - start)),
+                )
+
+
+def _words(text: str) -> list[str]:
+    return text.split()
+
+
+def _normalize(word: str) -> str:
+    return re.sub(r"\W", "", word.lower())
+
+
+def _drop_repeated_prefix(previous: str, text: str, max_words: int = 12) -> str:
+    """Drop the words at the start of ``text`` that end ``previous``."""
+    before, after = _words(previous), _words(text)
+    for size in range(min(max_words, len(before), len(after)), 0, -1):
+        tail = [_normalize(w) for w in before[-size:]]
+        if tail == [_normalize(w) for w in after[:size]] and any(tail):
+            return " ".join(after[size:])
+    return text
+
+
+def stitch_segments(
+    results: list[tuple[AudioWindow, list[TranscriptionSegment]]],
+) -> list[TranscriptionSegment]:
+    """Merge per-window segments into one timeline of the original file.
+
+    Times are shifted by each window's start. Inside an overlap, segments
+    centred before the middle of the overlap come from the earlier window and
+    the rest from the later one; words repeated across that seam are dropped.
+    """
+    results = sorted(results, key=lambda item: item[0].index)
+    stitched: list[TranscriptionSegment] = []
+    for position, (window, segments) in enumerate(results):
+        lower = -math.inf
+        if position > 0:
+            previous = results[position - 1][0]
+            lower = (window.start + previous.end) / 2
+        upper = math.inf
+        if position + 1 < len(results):
+            following = results[position + 1][0]
+            upper = (following.start + window.end) / 2
+
+        for segment in segments:
+            start = segment.start + window.start
+            end = segment.end + window.start
+            if not lower <= (start + end) / 2 < upper:
+                continue
+            text = segment.text
+            if stitched and start < stitched[-1].end + 1.0:
+                text = _drop_repeated_prefix(stitched[-1].text, text)
+                if not text.strip():
+                    continue
+            stitched.append(TranscriptionSegment(text=text, start=start, end=end))
+    return stitched
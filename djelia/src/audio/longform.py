@@ -0,0 +1,122 @@
+import re
+import struct
+
+from djelia.models import ErrorsMessage
+
+# sentence ends, then clause breaks, then plain spaces, tried in that order
+_SENTENCE = re.compile(r"(?<=[.!?…])\s+|\n\s*")
+_CLAUSE = re.compile(r"(?<=[,;:])\s+")
+_WORD = re.compile(r"\s+")
+
+# RIFF size placeholder for streamed audio whose length is not known yet
+_UNKNOWN_SIZE = 0xFFFFFFFF
+
+
+def _pack(pieces: list[str], max_chars: int) -> list[str]:
+    # greedily join consecutive pieces while they fit
+    segments = []
+    current = ""
+    for piece in pieces:
+        joined = f"{current} {piece}" if current else piece
+        if len(joined) <= max_chars:
+            current = joined
+        else:
+            if current:
+                segments.append(current)
+            current = piece
+    if current:
+        segments.append(current)
+    return segments
+
+
+def _split(text: str, max_chars: int, patterns: tuple) -> list[str]:
+    if len(text) <= max_chars:
+        return [text]
+    if not patterns:
+        # a single "word" longer than the limit, cut it
+        return [text[i : i + max_chars] for i in range(0, len(text), max_chars)]
+    pattern, rest = patterns[0], patterns[1:]
+    pieces = []
+    for piece in pattern.split(text):
+        if piece.strip():
+            pieces.extend(_split(piece.strip(), max_chars, rest))
+    return _pack(pieces, max_chars)
+
+
+def split_text(text: str, max_chars: int = 1000) -> list[str]:
+    """Split ``text`` into segments of at most ``max_chars`` characters.
+
+    Cuts fall on sentence ends where possible, then on clause breaks
+    (``,;:``) and spaces; consecutive sentences are packed together up to
+    the limit so long texts need as few requests as possible.
+    """
+    return _split(text.strip(), max_chars, (_SENTENCE, _CLAUSE, _WORD))
+
+
+def wav_parts(audio: bytes) -> tuple[bytes, bytes]:
+    """The ``fmt `` chunk body and the PCM samples of a WAV file."""
+    if len(audio) < 12 or audio[:4] != b"RIFF" or audio[8:12] != b"WAVE":
+        raise ValueError(ErrorsMessage.tts_segment_format_error.format("not WAV"))
+    fmt = None
+    position = 12
+    while position + 8 <= len(audio):
+        chunk_id, size = struct.unpack_from("<4sI", audio, position)
+        body = position + 8
+        if chunk_id == b"fmt ":
+            fmt = audio[body : body + size]
+        elif chunk_id == b"data":
+            if fmt is None:
+                break
+            # streamed audio may carry a placeholder size, trust the length
+            return fmt, audio[body : body + min(size, len(audio) - body)]
+        position = body + size + (size & 1)
+    raise ValueError(ErrorsMessage.tts_segment_format_error.format("no audio"))
+
+
+def wav_header(fmt: bytes, data_size: int | None = None) -> bytes:
+    """RIFF header for ``data_size`` bytes of samples, ``None`` if unknown."""
+    if data_size is None:
+        riff_size = data_size = _UNKNOWN_SIZE
+    else:
+        riff_size = min(4 + 8 + len(fmt) + 8 + data_size, _UNKNOWN_SIZE)
+    return (
+        struct.pack("<4sI4s", b"RIFF", riff_size, b"WAVE")
+        + struct.pack("<4sI", b"fmt ", len(fmt))
+        + fmt
+        + struct.pack("<4sI", b"data", min(data_size, _UNKNOWN_SIZE))
+    )
+
+
+class WavJoiner:
+    """Concatenates WAV files into one, keeping a single header.
+
+    :meth:`add` returns the bytes to emit for each file in order: the header
+    (with placeholder sizes, the total is not known yet) before the first
+    samples, then samples only. Files must share the same format. Writing
+    the stream to a :class:`FileSink` fixes the sizes on close;
+    :meth:`join` builds a complete file with exact sizes.
+    """
+
+    def __init__(self):
+        self.fmt = None
+        self.data_size = 0
+
+    def add(self, audio: bytes) -> bytes:
+        fmt, samples = wav_parts(audio)
+        self.data_size += len(samples)
+        if self.fmt is None:
+            self.fmt = fmt
+            return wav_header(fmt) + samples
+        if fmt != self.fmt:
+            raise ValueError(
+                ErrorsMessage.tts_segment_format_error.format("formats differ")
+            )
+        return samples
+
+    @classmethod
+    def join(cls, segments: list[bytes]) -> bytes:
+        joiner = cls()
+        body = b"".join(joiner.add(segment) for segment in segments)
+        # swap the placeholder header for one with the real sizes
+        placeholder = len(wav_header(joiner.fmt))
+        return wav_header(joiner.fmt, joiner.data_size) + body[placeholder:]
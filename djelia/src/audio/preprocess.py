@@ -0,0 +1,375 @@
+import asyncio
+import multiprocessing
+import os
+import tempfile
+import wave
+from collections.abc import Iterator
+from concurrent.futures import Executor, ProcessPoolExecutor
+from dataclasses import dataclass
+from typing import BinaryIO
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - optional dependency
+    np = None
+
+try:
+    import soundfile
+except ImportError:  # pragma: no cover - optional dependency
+    soundfile = None
+
+from djelia.models import (ErrorsMessage, FrenchTranscriptionResponse,
+                           TranscriptionSegment)
+
+from .vad import SilenceTrimmer, TimeMap, _TrimStream
+
+# frames decoded per block, keeps memory flat for hour long recordings
+_BLOCK_FRAMES = 1 << 16
+# length of the anti-aliasing low-pass filter used before downsampling
+_FILTER_TAPS = 101
+# workers are not forked: the parent runs aiohttp and thread pools, whose
+# threads and locks a fork would copy mid-flight
+_START_METHOD = (
+    "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+)
+
+
+@dataclass
+class PreprocessedAudio:
+    """Output of :class:`AudioPreprocessor`: an encoded file ready to upload.
+
+    ``path`` is a temporary file owned by the caller, remove it with
+    :meth:`cleanup` once it has been uploaded.
+    """
+
+    path: str
+    sample_rate: int
+    duration: float
+    input_bytes: int
+    output_bytes: int
+    # set when silence was trimmed, maps returned times back to the input
+    time_map: TimeMap | None = None
+
+    def cleanup(self) -> None:
+        try:
+            os.remove(self.path)
+        except FileNotFoundError:
+            pass
+
+    def restore_times(self, result):
+        """Shift segment times from the trimmed audio to the original file."""
+        if self.time_map is None or isinstance(result, FrenchTranscriptionResponse):
+            return result
+        if isinstance(result, TranscriptionSegment):
+            return self.time_map.segment(result)
+        return [self.time_map.segment(segment) for segment in result]
+
+
+def _require(module, name: str):
+    if module is None:
+        raise ImportError(ErrorsMessage.optional_dependency.format(name, "audio"))
+    return module
+
+
+def _read_wav(path: str) -> tuple[int, Iterator]:
+    wav = wave.open(path, "rb")
+    channels, width, rate = wav.getnchannels(), wav.getsampwidth(), wav.getframerate()
+    if wav.getcomptype() != "NONE" or width not in (1, 2, 3, 4):
+        wav.close()
+        raise ValueError(ErrorsMessage.audio_decode_error.format(path))
+
+    def blocks():
+        with wav:
+            while raw := wav.readframes(_BLOCK_FRAMES):
+                if width == 1:
+                    samples = (
+                        np.frombuffer(raw, np.uint8).astype(np.float32) - 128
+                    ) / 128
+                elif width == 3:
+                    # sign-extend little endian 24 bit samples into int32
+                    packed = np.frombuffer(raw, np.uint8).reshape(-1, 3)
+                    wide = np.zeros((len(packed), 4), np.uint8)
+                    wide[:, 1:] = packed
+                    samples = wide.view("<i4").ravel().astype(np.float32) / 2**31
+                else:
+                    dtype = "<i2" if width == 2 else "<i4"
+                    scale = float(2 ** (8 * width - 1))
+                    samples = np.frombuffer(raw, dtype).astype(np.float32) / scale
+                yield samples.reshape(-1, channels)
+
+    return rate, blocks()
+
+
+def _read_any(path: str) -> tuple[int, Iterator]:
+    try:
+        return _read_wav(path)
+    except (wave.Error, EOFError, ValueError):
+        # not a WAV, or one ``wave`` cannot decode (compressed, float)
+        pass
+    # FLAC, OGG, MP3 ... through libsndfile
+    sf = _require(soundfile, "soundfile")
+    info = sf.info(path)
+    blocks = sf.blocks(path, blocksize=_BLOCK_FRAMES, dtype="float32", always_2d=True)
+    return info.samplerate, blocks
+
+
+def _lowpass(cutoff: float) -> "np.ndarray":
+    # windowed-sinc FIR, ``cutoff`` relative to the input sample rate
+    n = np.arange(_FILTER_TAPS) - (_FILTER_TAPS - 1) / 2
+    taps = 2 * cutoff * np.sinc(2 * cutoff * n) * np.blackman(_FILTER_TAPS)
+    return (taps / taps.sum()).astype(np.float32)
+
+
+class _Resampler:
+    """Block-wise anti-aliased linear resampler with carried state."""
+
+    def __init__(self, source_rate: int, target_rate: int):
+        self.step = source_rate / target_rate
+        self.taps = _lowpass(0.5 / self.step * 0.9) if self.step > 1 else None
+        self.history = np.zeros(_FILTER_TAPS - 1, np.float32)
+        self.spectra = {}
+        # the linear-phase filter delays its output by half its length
+        self.delay = (_FILTER_TAPS - 1) // 2 if self.taps is not None else 0
+        self.skip = self.delay
+        self.position = 0.0  # input index of the next output sample
+        self.offset = 0  # input index of ``self.tail``
+        self.tail = np.zeros(0, np.float32)
+
+    def _filter(self, x: "np.ndarray") -> "np.ndarray":
+        if self.taps is None:
+            return x
+        padded = np.concatenate([self.history, x])
+        self.history = padded[len(padded) - (_FILTER_TAPS - 1) :]
+        size = 1 << int(len(padded) + _FILTER_TAPS - 1).bit_length()
+        if size not in self.spectra:
+            self.spectra[size] = np.fft.rfft(self.taps, size)
+        spectrum = np.fft.rfft(padded, size) * self.spectra[size]
+        full = np.fft.irfft(spectrum, size)[: len(padded) + _FILTER_TAPS - 1]
+        y = full[_FILTER_TAPS - 1 : len(padded)].astype(np.float32)
+        if self.skip:
+            dropped = min(self.skip, len(y))
+            self.skip -= dropped
+            y = y[dropped:]
+        return y
+
+    def _interpolate(self, x: "np.ndarray") -> "np.ndarray":
+        if self.step == 1:
+            return x
+        buffer = np.concatenate([self.tail, x])
+        last = self.offset + len(buffer) - 1
+        count = int(np.floor((last - self.position) / self.step)) + 1
+        if count <= 0:
+            self.tail = buffer
+            return np.zeros(0, np.float32)
+        times = self.position + self.step * np.arange(count)
+        out = np.interp(times - self.offset, np.arange(len(buffer)), buffer)
+        self.position += self.step * count
+        # keep what the next output sample still needs
+        keep = min(len(buffer), max(0, int(np.floor(self.position)) - self.offset))
+        self.tail = buffer[keep:]
+        self.offset += keep
+        return out.astype(np.float32)
+
+    def process(self, x: "np.ndarray") -> "np.ndarray":
+        return self._interpolate(self._filter(x))
+
+    def flush(self) -> "np.ndarray":
+        if self.taps is None:
+            return np.zeros(0, np.float32)
+        return self._interpolate(self._filter(np.zeros(self.delay, np.float32)))
+
+
+def _open_writer(path: str, fmt: str, rate: int, channels: int):
+    if fmt == "flac":
+        sf = _require(soundfile, "soundfile")
+        out = sf.SoundFile(
+            path, "w", samplerate=rate, channels=channels, subtype="PCM_16"
+        )
+        return out, lambda block: out.write(block)
+    out = wave.open(path, "wb")
+    out.setnchannels(channels)
+    out.setsampwidth(2)
+    out.setframerate(rate)
+
+    def write(block):
+        pcm = np.clip(np.round(block * 32767), -32768, 32767).astype("<i2")
+        out.writeframes(pcm.tobytes())
+
+    return out, write
+
+
+def preprocess_file(
+    source: str,
+    target: str,
+    sample_rate: int,
+    mono: bool,
+    fmt: str,
+    trimmer: SilenceTrimmer | None = None,
+) -> tuple[int, float, TimeMap | None]:
+    """Decode ``source``, downmix/resample/trim it and encode it to ``target``.
+
+    Runs in the caller's thread or in a worker process; returns the output sample rate, duration and
+    the time map of trimmed silences (None without a ``trimmer``).
+    """
+    _require(np, "numpy")
+    source_rate, blocks = _read_any(source)
+    rate = sample_rate or source_rate
+    resamplers = None
+    trim = None
+    writer = None
+    frames = 0
+    try:
+        for block in blocks:
+            channels = block if not mono else block.mean(axis=1, keepdims=True)
+            if resamplers is None:
+                resamplers = [
+                    _Resampler(source_rate, rate) for _ in range(channels.shape[1])
+                ]
+                writer, write = _open_writer(target, fmt, rate, channels.shape[1])
+                if trimmer is not None:
+                    trim = _TrimStream(trimmer, rate, channels.shape[1])
+            out = np.stack(
+                [r.process(channels[:, i]) for i, r in enumerate(resamplers)], axis=1
+            )
+            if trim is not None:
+                out = trim.process(out)
+            write(out)
+            frames += len(out)
+        if resamplers is None:
+            raise ValueError(ErrorsMessage.audio_decode_error.format(source))
+        tail = np.stack([r.flush() for r in resamplers], axis=1)
+        if trim is not None:
+            tail = np.concatenate([trim.process(tail), trim.flush()])
+        write(tail)
+        frames += len(tail)
+    finally:
+        if writer is not None:
+            writer.close()
+    return rate, frames / rate, trim.time_map if trim is not None else None
+
+
+class AudioPreprocessor:
+    """Shrinks audio before it is uploaded for transcription.
+
+    Files are decoded (WAV natively, other formats through ``soundfile``),
+    downmixed to mono, resampled to ``sample_rate``, optionally stripped of
+    long silences with ``trim_silence`` and re-encoded as 16-bit PCM
+    ``"wav"`` or ``"flac"``. By default the work runs in the calling thread
+    (``aprocess``: on the client's I/O executor); NumPy releases the GIL for
+    most of it. ``max_workers=None`` or a positive count opts into a process
+    pool instead. Its workers are started with forkserver or spawn and
+    re-import ``__main__``, so scripts using it must guard their entry point
+    with ``if __name__ == "__main__":``.
+    Requires the ``audio`` extra (``pip install djelia[audio]``).
+    """
+
+    def __init__(
+        self,
+        sample_rate: int = 16000,
+        mono: bool = True,
+        format: str = "wav",
+        max_workers: int | None = 0,
+        trim_silence: SilenceTrimmer | None = None,
+    ):
+        if format not in ("wav", "flac"):
+            raise ValueError(f"format must be 'wav' or 'flac', got {format!r}")
+        _require(np, "numpy")
+        self.sample_rate = sample_rate
+        self.mono = mono
+        self.format = format
+        self.max_workers = max_workers
+        self.trim_silence = trim_silence
+        self._executor = None
+
+    @property
+    def fingerprint(self) -> str:
+        """Settings that change the uploaded audio, for cache keys."""
+        return repr((self.sample_rate, self.mono, self.format, self.trim_silence))
+
+    @property
+    def executor(self) -> Executor | None:
+        if self._executor is None and self.max_workers != 0:
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.max_workers,
+                mp_context=multiprocessing.get_context(_START_METHOD),
+            )
+        return self._executor
+
+    def close(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def _prepare(self, audio_file: str | BinaryIO, fmt: str | None):
+        # streams are spooled to disk so the worker process can read them
+        spooled = None
+        if not isinstance(audio_file, str):
+            with tempfile.NamedTemporaryFile(
+                prefix="djelia-in-", delete=False
+            ) as spooled:
+                while chunk := audio_file.read(1 << 20):
+                    spooled.write(chunk)
+            source = spooled.name
+        else:
+            source = audio_file
+        fmt = fmt or self.format
+        fd, target = tempfile.mkstemp(prefix="djelia-", suffix=f".{fmt}")
+        os.close(fd)
+        args = (source, target, self.sample_rate, self.mono, fmt, self.trim_silence)
+        return args, spooled.name if spooled else None
+
+    def _result(self, args, output: tuple) -> PreprocessedAudio:
+        rate, duration, time_map = output
+        return PreprocessedAudio(
+            path=args[1],
+            sample_rate=rate,
+            duration=duration,
+            input_bytes=os.path.getsize(args[0]),
+            output_bytes=os.path.getsize(args[1]),
+            time_map=time_map,
+        )
+
+    def process(
+        self, audio_file: str | BinaryIO, format: str | None = None
+    ) -> PreprocessedAudio:
+        args, spooled = self._prepare(audio_file, format)
+        try:
+            executor = self.executor
+            if executor is None:
+                output = preprocess_file(*args)
+            else:
+                output = executor.submit(preprocess_file, *args).result()
+            return self._result(args, output)
+        except BaseException:
+            os.remove(args[1])
+            raise
+        finally:
+            if spooled:
+                os.remove(spooled)
+
+    async def aprocess(
+        self,
+        audio_file: str | BinaryIO,
+        format: str | None = None,
+        io_executor: Executor | None = None,
+    ) -> PreprocessedAudio:
+        loop = asyncio.get_running_loop()
+        args, spooled = await loop.run_in_executor(
+            io_executor, self._prepare, audio_file, format
+        )
+        try:
+            executor = self.executor or io_executor
+            output = await loop.run_in_executor(executor, preprocess_file, *args)
+            return await loop.run_in_executor(io_executor, self._result, args, output)
+        except BaseException:
+            os.remove(args[1])
+            raise
+        finally:
+            if spooled:
+                os.remove(spooled)
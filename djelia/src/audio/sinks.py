@@ -0,0 +1,206 @@
+import os
+import socket
+import struct
+import threading
+from abc import ABC, abstractmethod
+from typing import BinaryIO
+
+
+def finalize_wav(f: BinaryIO) -> None:
+    """Fix the RIFF and ``data`` sizes of a WAV file that do not fit its length.
+
+    Streamed WAV audio is sent before its length is known, so the header
+    usually carries placeholder sizes; a stream cut short also leaves them
+    past the end of the file. Sizes that fit are kept, so a complete file
+    with chunks after ``data`` (``LIST``, ...) is not touched. Files that are
+    not RIFF/WAVE are left untouched too.
+    """
+    end = f.seek(0, os.SEEK_END)
+    f.seek(0)
+    header = f.read(12)
+    if len(header) < 12 or header[:4] != b"RIFF" or header[8:12] != b"WAVE":
+        f.seek(end)
+        return
+
+    position = 12
+    while position + 8 <= end:
+        f.seek(position)
+        chunk_id, chunk_size = struct.unpack("<4sI", f.read(8))
+        if chunk_id == b"data":
+            available = end - position - 8
+            # 0 and 0xFFFFFFFF are the usual placeholders, a size past the
+            # end means the stream stopped early
+            if chunk_size > available or (chunk_size == 0 and available):
+                f.seek(position + 4)
+                f.write(struct.pack("<I", min(available, 0xFFFFFFFF)))
+            break
+        # chunks are word aligned
+        position += 8 + chunk_size + (chunk_size & 1)
+
+    riff_size = min(end - 8, 0xFFFFFFFF)
+    if struct.unpack("<I", header[4:8])[0] != riff_size:
+        f.seek(4)
+        f.write(struct.pack("<I", riff_size))
+    f.seek(end)
+
+
+class AudioSink(ABC):
+    """Destination for streamed audio, written chunk by chunk as it arrives.
+
+    ``close`` is called once the stream completed, ``abort`` when it stopped
+    early (the consumer broke out of the loop, the task was cancelled or the
+    connection failed). Both are called at most once.
+    """
+
+    @abstractmethod
+    def write(self, chunk: bytes) -> None:
+        """Write the next chunk of audio."""
+
+    def close(self) -> None:
+        pass
+
+    def abort(self) -> None:
+        self.close()
+
+
+class FileSink(AudioSink):
+    """Writes audio to ``path``, fixing WAV headers when the file is closed.
+
+    On ``abort`` the audio received so far is kept and finalized as a
+    playable file, or removed when ``keep_partial`` is False.
+    """
+
+    def __init__(self, path: str, keep_partial: bool = True):
+        self.path = path
+        self.keep_partial = keep_partial
+        self._file = None
+
+    def write(self, chunk: bytes) -> None:
+        if self._file is None:
+            self._file = open(self.path, "w+b")
+        self._file.write(chunk)
+
+    def _finalize(self) -> None:
+        if self._file is None:
+            # nothing arrived, still leave an (empty) file behind
+            open(self.path, "wb").close()
+            return
+        try:
+            self._file.truncate()
+            finalize_wav(self._file)
+        finally:
+            self._file.close()
+            self._file = None
+
+    def close(self) -> None:
+        self._finalize()
+
+    def abort(self) -> None:
+        self._finalize()
+        if not self.keep_partial:
+            try:
+                os.remove(self.path)
+            except FileNotFoundError:
+                pass
+
+
+class StreamSink(AudioSink):
+    """Writes audio to a binary file object such as a pipe or ``sys.stdout``.
+
+    The stream is flushed after every chunk and only closed when
+    ``close_stream`` is True.
+    """
+
+    def __init__(self, stream: BinaryIO, close_stream: bool = False):
+        self.stream = stream
+        self.close_stream = close_stream
+
+    def write(self, chunk: bytes) -> None:
+        self.stream.write(chunk)
+        self.stream.flush()
+
+    def close(self) -> None:
+        if self.close_stream:
+            self.stream.close()
+
+
+class SocketSink(AudioSink):
+    """Sends audio over a connected socket, shutting down writes on close."""
+
+    def __init__(self, sock: socket.socket, shutdown: bool = True):
+        self.sock = sock
+        self.shutdown = shutdown
+
+    def write(self, chunk: bytes) -> None:
+        self.sock.sendall(chunk)
+
+    def close(self) -> None:
+        if self.shutdown:
+            try:
+                self.sock.shutdown(socket.SHUT_WR)
+            except OSError:
+                pass
+
+
+class RingBufferSink(AudioSink):
+    """Keeps the most recent ``capacity`` bytes of audio in memory.
+
+    Older audio is overwritten once the buffer is full; ``read`` drains what
+    is buffered so another thread can consume the stream as it arrives.
+    """
+
+    def __init__(self, capacity: int):
+        if capacity <= 0:
+            raise ValueError("capacity must be positive")
+        self.capacity = capacity
+        self.dropped = 0
+        self.closed = False
+        self._buffer = bytearray(capacity)
+        self._start = 0
+        self._size = 0
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return self._size
+
+    def write(self, chunk: bytes) -> None:
+        with self._lock:
+            if len(chunk) >= self.capacity:
+                self.dropped += self._size + len(chunk) - self.capacity
+                self._buffer[:] = chunk[-self.capacity :]
+                self._start, self._size = 0, self.capacity
+                return
+            overflow = max(0, self._size + len(chunk) - self.capacity)
+            if overflow:
+                self.dropped += overflow
+                self._start = (self._start + overflow) % self.capacity
+                self._size -= overflow
+            end = (self._start + self._size) % self.capacity
+            head = min(len(chunk), self.capacity - end)
+            self._buffer[end : end + head] = chunk[:head]
+            self._buffer[: len(chunk) - head] = chunk[head:]
+            self._size += len(chunk)
+
+    def read(self, size: int = -1) -> bytes:
+        with self._lock:
+            size = self._size if size < 0 else min(size, self._size)
+            end = self._start + size
+            if end <= self.capacity:
+                data = bytes(self._buffer[self._start : end])
+            else:
+                data = bytes(
+                    self._buffer[self._start :] + self._buffer[: end - self.capacity]
+                )
+            self._start = end % self.capacity
+            self._size -= size
+            return data
+
+    def close(self) -> None:
+        self.closed = True
+
+
+def as_sink(target: "str | AudioSink | None") -> AudioSink | None:
+    """``output_file`` as a sink: paths become a :class:`FileSink`."""
+    if target is None or isinstance(target, AudioSink):
+        return target
+    return FileSink(target)
@@ -0,0 +1,202 @@
+import asyncio
+import mmap
+import os
+import shutil
+import tempfile
+import uuid
+from collections.abc import Iterator
+from concurrent.futures import Executor
+from contextlib import ExitStack, contextmanager
+from typing import BinaryIO
+
+from aiohttp import payload
+
+from djelia.models import Params
+
+DEFAULT_CHUNK_SIZE = 64 * 1024
+
+
+class _MmapReader:
+    """``read()`` over a memory-mapped file returning zero-copy slices."""
+
+    def __init__(self, f: BinaryIO, offset: int):
+        self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self._view = memoryview(self._map)
+        self._position = offset
+        self._released = 0
+        if hasattr(self._map, "madvise"):
+            self._map.madvise(mmap.MADV_SEQUENTIAL)
+
+    def read(self, size: int = -1) -> memoryview:
+        # pages before the previous chunk have been sent, drop them so resident
+        # memory does not grow with the file (they fault back in if needed)
+        self._release(self._position - (size if size > 0 else 0))
+        end = len(self._view) if size < 0 else self._position + size
+        chunk = self._view[self._position : end]
+        self._position += len(chunk)
+        return chunk
+
+    def _release(self, upto: int) -> None:
+        upto -= upto % mmap.PAGESIZE
+        if upto <= self._released or not hasattr(mmap, "MADV_DONTNEED"):
+            return
+        self._map.madvise(mmap.MADV_DONTNEED, self._released, upto - self._released)
+        self._released = upto
+
+    def close(self) -> None:
+        try:
+            self._view.release()
+            self._map.close()
+        except BufferError:
+            # a consumer still holds a slice, the map is closed once it is freed
+            pass
+
+
+class AudioUpload:
+    """Audio file or binary stream that can be read in chunks, once per attempt.
+
+    Paths are reopened for every read; streams are rewound to the offset they
+    had when the upload was created, so retries resend the same bytes.
+    Streams that cannot seek (pipes, sockets) are spooled to a temporary file
+    first, they could not be read a second time otherwise.
+    """
+
+    def __init__(
+        self,
+        audio_file: str | BinaryIO,
+        chunk_size: int = DEFAULT_CHUNK_SIZE,
+        use_mmap: bool = False,
+    ):
+        self.audio_file = audio_file
+        self.chunk_size = chunk_size
+        self.use_mmap = use_mmap
+        if isinstance(audio_file, str):
+            self.filename = os.path.basename(audio_file)
+            self.offset = 0
+            self.size = os.path.getsize(audio_file)
+        else:
+            self.filename = Params.filename
+            if not audio_file.seekable():
+                audio_file = self.audio_file = self._spool(audio_file, chunk_size)
+            self.offset = audio_file.tell()
+            self.size = self._stream_size(audio_file, self.offset)
+
+    @staticmethod
+    def _spool(stream: BinaryIO, chunk_size: int) -> BinaryIO:
+        # deleted once the upload, its only owner, is garbage collected
+        spooled = tempfile.TemporaryFile()
+        try:
+            shutil.copyfileobj(stream, spooled, chunk_size)
+            spooled.seek(0)
+        except BaseException:
+            spooled.close()
+            raise
+        return spooled
+
+    @staticmethod
+    def _stream_size(stream: BinaryIO, offset: int) -> int:
+        try:
+            return os.fstat(stream.fileno()).st_size - offset
+        except (AttributeError, OSError, ValueError):
+            end = stream.seek(0, os.SEEK_END)
+            stream.seek(offset)
+            return end - offset
+
+    @contextmanager
+    def reader(self) -> Iterator:
+        if isinstance(self.audio_file, str):
+            with open(self.audio_file, "rb") as f:
+                yield from self._wrap(f, 0)
+        else:
+            self.audio_file.seek(self.offset)
+            yield from self._wrap(self.audio_file, self.offset)
+
+    def _wrap(self, f: BinaryIO, offset: int) -> Iterator:
+        if self.use_mmap and self.size:
+            try:
+                reader = _MmapReader(f, offset)
+            except (AttributeError, OSError, ValueError):
+                # no real file descriptor behind the stream
+                yield f
+                return
+            try:
+                yield reader
+            finally:
+                reader.close()
+        else:
+            yield f
+
+    def iter_chunks(self) -> Iterator[bytes | memoryview]:
+        with self.reader() as reader:
+            while chunk := reader.read(self.chunk_size):
+                yield chunk
+
+
+class MultipartFileStream:
+    """Lazily encoded ``multipart/form-data`` body for ``requests``.
+
+    The file part is streamed chunk by chunk instead of being read into memory
+    the way ``files=`` does.
+    """
+
+    def __init__(self, upload: AudioUpload, field: str = Params.file):
+        self.upload = upload
+        boundary = uuid.uuid4().hex
+        self.content_type = f"multipart/form-data; boundary={boundary}"
+        self._head = (
+            f"--{boundary}\r\n"
+            f'Content-Disposition: form-data; name="{field}"; '
+            f'filename="{upload.filename}"\r\n'
+            "Content-Type: application/octet-stream\r\n\r\n"
+        ).encode("utf-8")
+        self._tail = f"\r\n--{boundary}--\r\n".encode("utf-8")
+
+    def __len__(self) -> int:
+        return len(self._head) + self.upload.size + len(self._tail)
+
+    def __iter__(self) -> Iterator[bytes | memoryview]:
+        yield self._head
+        yield from self.upload.iter_chunks()
+        yield self._tail
+
+
+class AudioPayload(payload.Payload):
+    """aiohttp payload streaming an :class:`AudioUpload` in fixed-size chunks.
+
+    Only one chunk is held at a time; opening, reading and closing the file
+    run on ``executor`` (the default one when None) so the event loop keeps
+    serving other requests.
+    """
+
+    def __init__(self, upload: AudioUpload, executor: Executor | None = None, **kwargs):
+        super().__init__(upload, filename=upload.filename, **kwargs)
+        self._size = upload.size
+        self._executor = executor
+
+    async def write(self, writer) -> None:
+        await self.write_with_length(writer, None)
+
+    async def write_with_length(self, writer, content_length: int | None) -> None:
+        upload: AudioUpload = self._value
+        loop = asyncio.get_running_loop()
+        remaining = content_length
+        stack = ExitStack()
+        try:
+            reader = await loop.run_in_executor(
+                self._executor, stack.enter_context, upload.reader()
+            )
+            while remaining is None or remaining > 0:
+                size = upload.chunk_size
+                if remaining is not None:
+                    size = min(size, remaining)
+                chunk = await loop.run_in_executor(self._executor, reader.read, size)
+                if not chunk:
+                    break
+                await writer.write(chunk)
+                if remaining is not None:
+                    remaining -= len(chunk)
+        finally:
+            await loop.run_in_executor(self._executor, stack.close)
+
+    def decode(self, encoding: str = "utf-8", errors: str = "strict") -> str:
+        raise TypeError("Streamed audio payloads cannot be decoded to text")
@@ -0,0 +1,153 @@
+from bisect import bisect_right
+from dataclasses import dataclass, field
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - optional dependency
+    np = None
+
+from djelia.models import TranscriptionSegment
+
+
+@dataclass
+class SilenceTrimmer:
+    """Energy based voice activity detection used to drop long silences.
+
+    Frames of ``frame_ms`` whose RMS level is below ``threshold_db`` (dBFS)
+    are silent. Silent runs longer than ``min_silence`` seconds are cut down
+    to ``keep_silence`` seconds, half kept on each side so words are not
+    clipped; shorter pauses are left alone.
+    """
+
+    threshold_db: float = -45.0
+    frame_ms: float = 30.0
+    min_silence: float = 0.6
+    keep_silence: float = 0.2
+
+    def voiced(self, samples: "np.ndarray", rate: int) -> "np.ndarray":
+        """Boolean voice mask, one entry per whole frame of ``samples``."""
+        size = max(1, int(rate * self.frame_ms / 1000))
+        count = len(samples) // size
+        frames = samples[: count * size].reshape(count, size, -1)
+        power = np.mean(np.square(frames, dtype=np.float64), axis=(1, 2))
+        return 10 * np.log10(power + 1e-12) > self.threshold_db
+
+
+@dataclass
+class TimeMap:
+    """Maps times in trimmed audio back to the original recording.
+
+    Each kept span starts at ``trimmed[i]`` in the trimmed audio and at
+    ``original[i]`` in the original one.
+    """
+
+    trimmed: list[float] = field(default_factory=lambda: [0.0])
+    original: list[float] = field(default_factory=lambda: [0.0])
+
+    def add_cut(self, trimmed: float, original: float) -> None:
+        self.trimmed.append(trimmed)
+        self.original.append(original)
+
+    def to_original(self, t: float, end: bool = False) -> float:
+        # an end landing exactly on a cut belongs to the span before it
+        index = bisect_right(self.trimmed, t) - 1
+        if end and index > 0 and t == self.trimmed[index]:
+            index -= 1
+        index = max(index, 0)
+        return self.original[index] + (t - self.trimmed[index])
+
+    def segment(self, segment: TranscriptionSegment) -> TranscriptionSegment:
+        return TranscriptionSegment(
+            text=segment.text,
+            start=self.to_original(segment.start),
+            end=self.to_original(segment.end, end=True),
+        )
+
+    @property
+    def removed(self) -> float:
+        """Seconds of silence removed."""
+        return self.original[-1] - self.trimmed[-1]
+
+
+class _TrimStream:
+    """Applies a :class:`SilenceTrimmer` block by block, building a TimeMap.
+
+    Silent runs are held back until the next voiced frame shows how long they
+    were; once a run is long enough to be cut only its edges are kept.
+    """
+
+    def __init__(self, trimmer: SilenceTrimmer, rate: int, channels: int):
+        self.trimmer = trimmer
+        self.rate = rate
+        self.frame = max(1, int(rate * trimmer.frame_ms / 1000))
+        self.edge = int(rate * trimmer.keep_silence / 2)
+        self.min_silence = max(int(rate * trimmer.min_silence), 2 * self.edge + 1)
+        self.time_map = TimeMap()
+        self.empty = np.zeros((0, channels), np.float32)
+        self.carry = self.empty
+        self.pending = []  # the whole silent run while it is short
+        self.head = self.tail = self.empty  # its edges once it is long
+        self.silent = 0  # samples in the pending silent run
+        self.read = 0  # input samples consumed
+        self.written = 0  # output samples emitted
+
+    def _hold(self, run: "np.ndarray") -> None:
+        self.silent += len(run)
+        self.read += len(run)
+        if self.pending is not None:
+            self.pending.append(run)
+            if self.silent < self.min_silence:
+                return
+            run = np.concatenate(self.pending)
+            self.pending = None
+            self.head = run[: self.edge]
+        held = np.concatenate([self.tail, run])
+        self.tail = held[max(0, len(held) - self.edge) :]
+
+    def _release(self, final: bool = False) -> list:
+        if self.pending is not None:
+            out = self.pending
+            self.written += self.silent
+        else:
+            tail = self.empty if final else self.tail
+            out = [self.head, tail]
+            self.written += len(self.head)
+            self.time_map.add_cut(
+                self.written / self.rate, (self.read - len(tail)) / self.rate
+            )
+            self.written += len(tail)
+        self.pending, self.head, self.tail, self.silent = [], self.empty, self.empty, 0
+        return out
+
+    def process(self, block: "np.ndarray") -> "np.ndarray":
+        block = np.concatenate([self.carry, block])
+        usable = len(block) - len(block) % self.frame
+        self.carry = block[usable:]
+        block = block[:usable]
+        if not usable:
+            return block
+
+        voiced = self.trimmer.voiced(block, self.rate)
+        # split the block into runs of equal voicing
+        edges = np.flatnonzero(np.diff(voiced.astype(np.int8))) + 1
+        starts = np.concatenate([[0], edges])
+        ends = np.concatenate([edges, [len(voiced)]])
+
+        out = []
+        for start, end in zip(starts, ends):
+            run = block[start * self.frame : end * self.frame]
+            if voiced[start]:
+                out.extend(self._release())
+                self.read += len(run)
+                self.written += len(run)
+                out.append(run)
+            else:
+                self._hold(run)
+        return np.concatenate(out) if out else self.empty
+
+    def flush(self) -> "np.ndarray":
+        out = self._release(final=True)
+        # a partial frame is too short to judge, keep it
+        self.read += len(self.carry)
+        self.written += len(self.carry)
+        return np.concatenate([*out, self.carry])
@@ -0,0 +1,20 @@
+from .backends import DiskCache, DiskEntry, MemoryCache, SQLiteCache
+from .catalog import LanguageCatalog, SpeakerCatalog, language_catalog
+from .transcription import TranscriptionCache, hash_audio
+from .translation import CacheStats, TranslationCache
+from .tts import TTSCache
+
+__all__ = [
+    "MemoryCache",
+    "SQLiteCache",
+    "DiskCache",
+    "DiskEntry",
+    "CacheStats",
+    "TranslationCache",
+    "TranscriptionCache",
+    "hash_audio",
+    "TTSCache",
+    "LanguageCatalog",
+    "SpeakerCatalog",
+    "language_catalog",
+]
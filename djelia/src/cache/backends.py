@@ -0,0 +1,318 @@
+import os
+import shutil
+import sqlite3
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from typing import BinaryIO
+
+
+class MemoryCache:
+    """Thread-safe LRU mapping with an optional time-to-live per entry."""
+
+    def __init__(self, max_entries: int = 1024, ttl: float | None = None):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.evictions = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: str):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            value, expires_at = entry
+            if expires_at is not None and expires_at <= time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key: str, value) -> None:
+        expires_at = None if self.ttl is None else time.monotonic() + self.ttl
+        with self._lock:
+            self._entries[key] = (value, expires_at)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+
+class SQLiteCache:
+    """Persistent string cache in a single SQLite file.
+
+    Entries expire after ``ttl`` seconds; the least recently used entries
+    beyond ``max_entries`` are trimmed every ``trim_interval`` writes.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        ttl: float | None = None,
+        max_entries: int | None = None,
+        trim_interval: int = 256,
+    ):
+        self.path = path
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.trim_interval = trim_interval
+        self._writes = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        with self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS entries ("
+                "key TEXT PRIMARY KEY, value TEXT NOT NULL, "
+                "expires_at REAL, accessed_at REAL NOT NULL)"
+            )
+            self._conn.execute(
+                "CREATE INDEX IF NOT EXISTS entries_accessed ON entries(accessed_at)"
+            )
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+
+    def get(self, key: str) -> str | None:
+        now = time.time()
+        with self._lock, self._conn:
+            row = self._conn.execute(
+                "SELECT value, expires_at FROM entries WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            value, expires_at = row
+            if expires_at is not None and expires_at <= now:
+                self._conn.execute("DELETE FROM entries WHERE key = ?", (key,))
+                return None
+            self._conn.execute(
+                "UPDATE entries SET accessed_at = ? WHERE key = ?", (now, key)
+            )
+            return value
+
+    def set(self, key: str, value: str) -> None:
+        now = time.time()
+        expires_at = None if self.ttl is None else now + self.ttl
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?)",
+                (key, value, expires_at, now),
+            )
+            self._writes += 1
+            if self._writes % self.trim_interval == 0:
+                self._trim(now)
+
+    def _trim(self, now: float) -> None:
+        self._conn.execute(
+            "DELETE FROM entries WHERE expires_at IS NOT NULL AND expires_at <= ?",
+            (now,),
+        )
+        if self.max_entries is not None:
+            self._conn.execute(
+                "DELETE FROM entries WHERE key IN (SELECT key FROM entries "
+                "ORDER BY accessed_at DESC LIMIT -1 OFFSET ?)",
+                (self.max_entries,),
+            )
+
+    def delete(self, key: str) -> None:
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM entries WHERE key = ?", (key,))
+
+    def clear(self) -> None:
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM entries")
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+class DiskEntry:
+    """A value being written to a :class:`DiskCache` chunk by chunk.
+
+    Nothing is visible in the cache until :meth:`commit`; :meth:`discard`
+    drops a partial value (e.g. a stream that stopped early).
+    """
+
+    def __init__(self, cache: "DiskCache", key: str):
+        self.cache = cache
+        self.key = key
+        self.size = 0
+        fd, self.path = tempfile.mkstemp(dir=cache.directory, suffix=".part")
+        self._file = os.fdopen(fd, "wb")
+
+    def write(self, data: bytes) -> None:
+        self._file.write(data)
+        self.size += len(data)
+
+    def commit(self) -> None:
+        if self._file.closed:
+            return
+        self._file.close()
+        self.cache._commit(self.key, self.path, self.size)
+
+    def discard(self) -> None:
+        if self._file.closed:
+            return
+        self._file.close()
+        try:
+            os.remove(self.path)
+        except FileNotFoundError:
+            pass
+
+
+class DiskCache:
+    """Binary values stored as files under ``directory``.
+
+    An SQLite index tracks sizes and access times; once the stored bytes
+    exceed ``max_bytes`` the least recently used files are removed. Values
+    larger than the whole budget are not stored. Entries expire after
+    ``ttl`` seconds.
+    """
+
+    def __init__(self, directory: str, max_bytes: int, ttl: float | None = None):
+        self.directory = directory = os.path.expanduser(directory)
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.evictions = 0
+        os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(
+            os.path.join(directory, "index.sqlite"), check_same_thread=False
+        )
+        with self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS files ("
+                "key TEXT PRIMARY KEY, size INTEGER NOT NULL, "
+                "expires_at REAL, accessed_at REAL NOT NULL)"
+            )
+            self._conn.execute(
+                "CREATE INDEX IF NOT EXISTS files_accessed ON files(accessed_at)"
+            )
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM files").fetchone()[0]
+
+    @property
+    def total_bytes(self) -> int:
+        with self._lock:
+            row = self._conn.execute("SELECT SUM(size) FROM files").fetchone()
+            return row[0] or 0
+
+    def _path(self, key: str) -> str:
+        # two level fan-out keeps directories small
+        return os.path.join(self.directory, key[:2], key)
+
+    def _touch(self, key: str) -> bool:
+        now = time.time()
+        with self._lock, self._conn:
+            row = self._conn.execute(
+                "SELECT expires_at FROM files WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return False
+            if row[0] is not None and row[0] <= now:
+                self._remove(key)
+                return False
+            self._conn.execute(
+                "UPDATE files SET accessed_at = ? WHERE key = ?", (now, key)
+            )
+            return True
+
+    def open(self, key: str) -> BinaryIO | None:
+        """Open a stored value for reading, ``None`` on a miss."""
+        if not self._touch(key):
+            return None
+        try:
+            return open(self._path(key), "rb")
+        except FileNotFoundError:
+            # removed behind our back (another process evicted it)
+            self.delete(key)
+            return None
+
+    def get(self, key: str) -> bytes | None:
+        f = self.open(key)
+        if f is None:
+            return None
+        with f:
+            return f.read()
+
+    def begin(self, key: str) -> DiskEntry:
+        return DiskEntry(self, key)
+
+    def set(self, key: str, value: bytes) -> None:
+        entry = self.begin(key)
+        try:
+            entry.write(value)
+        except BaseException:
+            entry.discard()
+            raise
+        entry.commit()
+
+    def _commit(self, key: str, temp_path: str, size: int) -> None:
+        if size > self.max_bytes:
+            os.remove(temp_path)
+            return
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        os.replace(temp_path, path)
+        now = time.time()
+        expires_at = None if self.ttl is None else now + self.ttl
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO files VALUES (?, ?, ?, ?)",
+                (key, size, expires_at, now),
+            )
+            self._evict()
+
+    def _evict(self) -> None:
+        total = self._conn.execute("SELECT SUM(size) FROM files").fetchone()[0] or 0
+        if total <= self.max_bytes:
+            return
+        for key, size in self._conn.execute(
+            "SELECT key, size FROM files ORDER BY accessed_at"
+        ).fetchall():
+            self._remove(key)
+            self.evictions += 1
+            total -= size
+            if total <= self.max_bytes:
+                break
+
+    def _remove(self, key: str) -> None:
+        self._conn.execute("DELETE FROM files WHERE key = ?", (key,))
+        try:
+            os.remove(self._path(key))
+        except FileNotFoundError:
+            pass
+
+    def delete(self, key: str) -> None:
+        with self._lock, self._conn:
+            self._remove(key)
+
+    def clear(self) -> None:
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM files")
+            for name in os.listdir(self.directory):
+                path = os.path.join(self.directory, name)
+                if os.path.isdir(path):
+                    shutil.rmtree(path, ignore_errors=True)
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
@@ -0,0 +1,120 @@
+import threading
+import time
+from dataclasses import dataclass, field
+
+from djelia.config.settings import Settings
+from djelia.models import (ErrorsMessage, SupportedLanguageSchema,
+                           TranslationRequest)
+from djelia.utils.exceptions import LanguageError
+
+
+class LanguageCatalog:
+    """Memo of the supported-languages endpoint with TTL and ETag revalidation.
+
+    Once stale, the next fetch sends ``If-None-Match`` so an unchanged
+    catalogue costs a bodiless ``304``. While data is known, translation
+    requests are validated locally.
+    """
+
+    def __init__(self, ttl: float = 3600.0):
+        self.ttl = ttl
+        self._languages: list[SupportedLanguageSchema] | None = None
+        self._codes: frozenset[str] = frozenset()
+        self._etag: str | None = None
+        self._fetched_at = 0.0
+        self._lock = threading.Lock()
+
+    @property
+    def fresh(self) -> bool:
+        return (
+            self._languages is not None
+            and time.monotonic() - self._fetched_at < self.ttl
+        )
+
+    def get(self) -> list[SupportedLanguageSchema] | None:
+        """Cached languages while fresh, ``None`` when a fetch is due."""
+        with self._lock:
+            return list(self._languages) if self.fresh else None
+
+    def request_headers(self) -> dict[str, str]:
+        with self._lock:
+            if self._etag and self._languages is not None:
+                return {"If-None-Match": self._etag}
+            return {}
+
+    def update(
+        self, status: int, data: list[dict] | None, etag: str | None
+    ) -> list[SupportedLanguageSchema]:
+        with self._lock:
+            if status != 304 or self._languages is None:
+                self._languages = [SupportedLanguageSchema(**lang) for lang in data]
+                self._codes = frozenset(lang.code for lang in self._languages)
+                self._etag = etag
+            self._fetched_at = time.monotonic()
+            return list(self._languages)
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self._fetched_at = 0.0
+
+    def validate(self, request: TranslationRequest) -> None:
+        # never fetch just to validate, that would cost the round-trip we save
+        codes = self._codes
+        if not codes:
+            return
+        for language in (request.source, request.target):
+            if language.value not in codes:
+                raise LanguageError(
+                    ErrorsMessage.language_unsupported.format(
+                        language.value, sorted(codes)
+                    )
+                )
+
+
+_catalogs: dict[str, LanguageCatalog] = {}
+_catalogs_lock = threading.Lock()
+
+
+def language_catalog(base_url: str) -> LanguageCatalog:
+    """Catalogue shared by every sync and async client of ``base_url``."""
+    with _catalogs_lock:
+        catalog = _catalogs.get(base_url)
+        if catalog is None:
+            catalog = _catalogs[base_url] = LanguageCatalog()
+        return catalog
+
+
+@dataclass(frozen=True)
+class SpeakerCatalog:
+    """TTS speakers resolved once per client instead of on every call."""
+
+    speaker_ids: tuple[int, ...]
+    v2_speakers: tuple[str, ...]
+    _lowered: tuple[str, ...] = field(init=False, repr=False, compare=False)
+
+    @classmethod
+    def from_settings(cls, settings: Settings | None) -> "SpeakerCatalog":
+        if settings is None:
+            # clients built with explicit api_key and base_url skip Settings
+            fields = Settings.model_fields
+            return cls(
+                tuple(fields["valid_speaker_ids"].default_factory()),
+                tuple(fields["valid_tts_v2_speakers"].default_factory()),
+            )
+        return cls(
+            tuple(settings.valid_speaker_ids), tuple(settings.valid_tts_v2_speakers)
+        )
+
+    def __post_init__(self):
+        lowered = tuple(speaker.lower() for speaker in self.v2_speakers)
+        object.__setattr__(self, "_lowered", lowered)  # frozen dataclass
+
+    def has_speaker_id(self, speaker: int | None) -> bool:
+        return speaker in self.speaker_ids
+
+    def find_v2_speaker(self, description: str) -> str | None:
+        description = description.lower()
+        for speaker, lowered in zip(self.v2_speakers, self._lowered):
+            if lowered in description:
+                return speaker
+        return None
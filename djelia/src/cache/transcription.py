@@ -0,0 +1,117 @@
+import hashlib
+import json
+import threading
+from typing import BinaryIO
+
+from djelia.models import (FrenchTranscriptionResponse, TranscriptionSegment,
+                           Versions)
+
+from .backends import DiskCache
+from .translation import CacheStats
+
+TranscriptionResult = (
+    list[TranscriptionSegment]
+    | list[FrenchTranscriptionResponse]
+    | FrenchTranscriptionResponse
+)
+
+
+def hash_audio(audio_file: str | BinaryIO, chunk_size: int = 1 << 20) -> str | None:
+    """SHA-256 of the audio bytes, read ``chunk_size`` bytes at a time.
+
+    Streams are hashed from their current position and rewound to it
+    afterwards; ``None`` is returned for streams that cannot be rewound.
+    """
+    digest = hashlib.sha256()
+    if isinstance(audio_file, str):
+        with open(audio_file, "rb") as f:
+            while chunk := f.read(chunk_size):
+                digest.update(chunk)
+        return digest.hexdigest()
+
+    if not audio_file.seekable():
+        return None
+    offset = audio_file.tell()
+    try:
+        while chunk := audio_file.read(chunk_size):
+            digest.update(chunk)
+    finally:
+        audio_file.seek(offset)
+    return digest.hexdigest()
+
+
+class TranscriptionCache:
+    """Opt-in content-addressed cache in front of ``Transcription``.
+
+    Results are keyed by a hash of the audio bytes (not the file name) plus
+    ``translate_to_french``, the API version and the pre-processing applied,
+    and stored as small JSON files in ``directory`` bounded by ``max_bytes``.
+    The same file uploaded twice, under any name, is transcribed once.
+    """
+
+    def __init__(
+        self,
+        directory: str,
+        max_bytes: int = 256 * 1024 * 1024,
+        ttl: float | None = None,
+        chunk_size: int = 1 << 20,
+    ):
+        self.store = DiskCache(directory, max_bytes=max_bytes, ttl=ttl)
+        self.chunk_size = chunk_size
+        self.stats = CacheStats()
+        self._lock = threading.Lock()
+
+    def key(
+        self,
+        audio_file: str | BinaryIO,
+        translate_to_french: bool,
+        version: Versions,
+        stream: bool = False,
+        variant: str = "",
+    ) -> str | None:
+        """Cache key for a request, ``None`` when the audio cannot be hashed."""
+        audio = hash_audio(audio_file, self.chunk_size)
+        if audio is None:
+            return None
+        # french transcripts come back whole in batch mode, line by line when
+        # streamed, so the two shapes are cached separately
+        mode = "stream" if stream and translate_to_french else "batch"
+        raw = json.dumps(
+            [audio, bool(translate_to_french), int(version), mode, variant]
+        )
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> TranscriptionResult | None:
+        stored = self.store.get(key)
+        with self._lock:
+            if stored is None:
+                self.stats.misses += 1
+            else:
+                self.stats.hits += 1
+        if stored is None:
+            return None
+        data = json.loads(stored)
+        if data["type"] == "french":
+            return FrenchTranscriptionResponse(**data["items"][0])
+        model = (
+            FrenchTranscriptionResponse
+            if data["type"] == "french_lines"
+            else TranscriptionSegment
+        )
+        return [model(**item) for item in data["items"]]
+
+    def set(self, key: str, result: TranscriptionResult) -> None:
+        if isinstance(result, FrenchTranscriptionResponse):
+            kind, items = "french", [result]
+        elif result and isinstance(result[0], FrenchTranscriptionResponse):
+            kind, items = "french_lines", result
+        else:
+            kind, items = "segments", result
+        data = {"type": kind, "items": [item.model_dump() for item in items]}
+        self.store.set(key, json.dumps(data, ensure_ascii=False).encode("utf-8"))
+
+    def clear(self) -> None:
+        self.store.clear()
+
+    def close(self) -> None:
+        self.store.close()
@@ -0,0 +1,172 @@
+import asyncio
+import hashlib
+import json
+import threading
+from collections.abc import Awaitable, Callable
+from concurrent.futures import Executor, Future
+from dataclasses import dataclass
+
+from djelia.models import TranslationRequest, TranslationResponse, Versions
+
+from .backends import MemoryCache, SQLiteCache
+
+
+@dataclass
+class CacheStats:
+    hits: int = 0
+    misses: int = 0
+    # identical requests served by an upstream call that was already in flight
+    coalesced: int = 0
+
+    @property
+    def hit_rate(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+
+class TranslationCache:
+    """Opt-in cache in front of ``Translation``/``AsyncTranslation``.
+
+    Results are kept in a bounded in-memory LRU with TTL and, when ``path`` is
+    given, in an SQLite file that survives restarts. Concurrent identical
+    requests are coalesced into a single upstream call. One instance can be
+    shared by a ``Djelia`` and a ``DjeliaAsync`` client.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = 4096,
+        ttl: float | None = 24 * 3600,
+        path: str | None = None,
+        max_persistent_entries: int | None = None,
+    ):
+        self.memory = MemoryCache(max_entries=max_entries, ttl=ttl)
+        self.persistent = (
+            SQLiteCache(path, ttl=ttl, max_entries=max_persistent_entries)
+            if path
+            else None
+        )
+        self.stats = CacheStats()
+        self._lock = threading.Lock()
+        self._inflight: dict[str, Future] = {}
+        self._async_inflight: dict[str, asyncio.Future] = {}
+
+    @staticmethod
+    def key(request: TranslationRequest, version: Versions) -> str:
+        raw = json.dumps(
+            [request.text, request.source.value, request.target.value, int(version)],
+            ensure_ascii=False,
+        )
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> TranslationResponse | None:
+        response = self.memory.get(key)
+        if response is None and self.persistent is not None:
+            stored = self.persistent.get(key)
+            if stored is not None:
+                response = TranslationResponse.model_validate_json(stored)
+                self.memory.set(key, response)
+        with self._lock:
+            if response is None:
+                self.stats.misses += 1
+            else:
+                self.stats.hits += 1
+        return response
+
+    def set(self, key: str, response: TranslationResponse) -> None:
+        self.memory.set(key, response)
+        if self.persistent is not None:
+            self.persistent.set(key, response.model_dump_json())
+
+    def clear(self) -> None:
+        self.memory.clear()
+        if self.persistent is not None:
+            self.persistent.clear()
+
+    def close(self) -> None:
+        if self.persistent is not None:
+            self.persistent.close()
+
+    def get_or_fetch(
+        self,
+        request: TranslationRequest,
+        version: Versions,
+        fetch: Callable[[], TranslationResponse],
+    ) -> TranslationResponse:
+        key = self.key(request, version)
+        response = self.get(key)
+        if response is not None:
+            return response
+
+        with self._lock:
+            future = self._inflight.get(key)
+            leader = future is None
+            if leader:
+                future = self._inflight[key] = Future()
+            else:
+                self.stats.coalesced += 1
+        if not leader:
+            return future.result()
+
+        try:
+            response = fetch()
+            self.set(key, response)
+            future.set_result(response)
+            return response
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                del self._inflight[key]
+
+    async def aget_or_fetch(
+        self,
+        request: TranslationRequest,
+        version: Versions,
+        fetch: Callable[[], Awaitable[TranslationResponse]],
+        executor: Executor | None = None,
+    ) -> TranslationResponse:
+        loop = asyncio.get_running_loop()
+
+        async def run(func, *args):
+            # only the SQLite store touches disk, memory lookups stay inline
+            if self.persistent is None:
+                return func(*args)
+            return await loop.run_in_executor(executor, func, *args)
+
+        key = self.key(request, version)
+        response = await run(self.get, key)
+        if response is not None:
+            return response
+
+        future = self._async_inflight.get(key)
+        # futures cannot be awaited from another loop, fetch independently there
+        if future is not None and future.get_loop() is loop:
+            with self._lock:
+                self.stats.coalesced += 1
+            try:
+                return await asyncio.shield(future)
+            except asyncio.CancelledError:
+                if not future.cancelled():
+                    raise
+                # the leading call was cancelled, fetch on our own
+
+        future = loop.create_future()
+        self._async_inflight[key] = future
+        try:
+            response = await fetch()
+            await run(self.set, key, response)
+            future.set_result(response)
+            return response
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except BaseException as e:
+            future.set_exception(e)
+            # waiters re-raise it, don't warn about an unretrieved exception
+            future.exception()
+            raise
+        finally:
+            if self._async_inflight.get(key) is future:
+                del self._async_inflight[key]
@@ -0,0 +1,82 @@
+import hashlib
+import json
+import threading
+import unicodedata
+from typing import BinaryIO
+
+from djelia.models import TTSRequest, TTSRequestV2, Versions
+
+from .backends import DiskCache, DiskEntry
+from .translation import CacheStats
+
+
+def _normalize(text: str) -> str:
+    # the same prompt typed twice often differs only in spacing or in how
+    # accented letters are composed
+    return " ".join(unicodedata.normalize("NFC", text).split())
+
+
+class TTSCache:
+    """Opt-in disk cache of synthesized audio in front of ``TTS``.
+
+    Audio is keyed on the normalized request fields (text, speaker or
+    description, chunk size) and the API version, and stored as files in
+    ``directory``; the least recently used files are evicted once they take
+    more than ``max_bytes``. Streamed and non-streamed audio are cached
+    separately since the endpoints may encode the container differently.
+    """
+
+    def __init__(
+        self,
+        directory: str,
+        max_bytes: int = 512 * 1024 * 1024,
+        ttl: float | None = None,
+    ):
+        self.store = DiskCache(directory, max_bytes=max_bytes, ttl=ttl)
+        self.stats = CacheStats()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(
+        request: TTSRequest | TTSRequestV2, version: Versions, stream: bool = False
+    ) -> str:
+        if isinstance(request, TTSRequestV2):
+            voice = [_normalize(request.description), float(request.chunk_size or 0)]
+        else:
+            voice = [request.speaker]
+        raw = json.dumps(
+            [_normalize(request.text), *voice, int(version), bool(stream)],
+            ensure_ascii=False,
+        )
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def _count(self, hit: bool) -> None:
+        with self._lock:
+            if hit:
+                self.stats.hits += 1
+            else:
+                self.stats.misses += 1
+
+    def open(self, key: str) -> BinaryIO | None:
+        """Open cached audio for reading, ``None`` on a miss."""
+        f = self.store.open(key)
+        self._count(f is not None)
+        return f
+
+    def get(self, key: str) -> bytes | None:
+        data = self.store.get(key)
+        self._count(data is not None)
+        return data
+
+    def set(self, key: str, audio: bytes) -> None:
+        self.store.set(key, audio)
+
+    def begin(self, key: str) -> DiskEntry:
+        """Start writing streamed audio; commit it once the stream completes."""
+        return self.store.begin(key)
+
+    def clear(self) -> None:
+        self.store.clear()
+
+    def close(self) -> None:
+        self.store.close()
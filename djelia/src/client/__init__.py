@@ -1,3 +1,25 @@
 from .client import Djelia, DjeliaAsync
+from .concurrency import ConcurrencyLimiter, ConcurrencySlot
+from .instrumentation import RequestEvent, RequestTimings
+from .metrics import Metrics
+from .ratelimit import RateLimiter, TokenBucket
+from .retry import RetryBudget, RetryPolicy
+from .shared import SharedRateLimiter, SharedUsage
+from .tracing import Tracing
 
-__all__ = ["Djelia", "DjeliaAsync"]
+__all__ = [
+    "Djelia",
+    "DjeliaAsync",
+    "RetryPolicy",
+    "RetryBudget",
+    "RateLimiter",
+    "TokenBucket",
+    "SharedRateLimiter",
+    "SharedUsage",
+    "ConcurrencyLimiter",
+    "ConcurrencySlot",
+    "RequestEvent",
+    "RequestTimings",
+    "Metrics",
+    "Tracing",
+]
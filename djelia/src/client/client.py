@@ -1,27 +1,85 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import nullcontext
 from typing import Union
 
 import aiohttp
 import requests
-from tenacity import (retry, retry_if_exception_type, stop_after_attempt,
-                      wait_random_exponential)
 
 from djelia.config.settings import Settings
+from djelia.config.transport import TransportConfig
+from djelia.models import DjeliaRequest
 from djelia.src.auth import Auth
-from djelia.src.services import (TTS, AsyncTranscription, AsyncTranslation,
-                                 AsyncTTS, Transcription, Translation)
+from djelia.src.cache import (SpeakerCatalog, TranscriptionCache,
+                              TranslationCache, TTSCache, language_catalog)
+from djelia.src.services import (TTS, AsyncPipeline, AsyncTranscription,
+                                 AsyncTranslation, AsyncTTS, Transcription,
+                                 Translation)
 from djelia.utils.errors import api_exception, general_exception
 
+from .concurrency import ConcurrencyLimiter
+from .instrumentation import (AttemptMarks, RequestEvent, RequestHook,
+                              TimedHTTPAdapter, emit, emit_stream_opened,
+                              received_bytes, reporter, send_traced,
+                              trace_config)
+from .ratelimit import RateLimiter
+from .retry import RetryBudget, RetryPolicy
+from .shared import SharedRateLimiter
+from .tracing import Tracing
+
+
+def _release_on_close(response, *releases):
+    # hand the stream and concurrency slots back when the caller closes the
+    # response (aiohttp's ``async with`` calls ``release`` instead)
+    releases = [release for release in releases if release is not None]
+    if not releases:
+        return response
+
+    def wrap(method):
+        def release_after():
+            try:
+                return method()
+            finally:
+                for release in releases:
+                    release()
+
+        return release_after
+
+    for name in ("close", "release"):
+        method = getattr(response, name, None)
+        if method is not None:
+            setattr(response, name, wrap(method))
+    return response
+
+
+def _stream_span(tracing: Union[Tracing, None], endpoint: str):
+    # spans the caller reading the stream, ended when it is closed
+    return None if tracing is None else tracing.start_stream(endpoint)
+
 
 class Djelia:
     def __init__(
-        self, api_key: Union[str, None] = None, base_url: Union[str, None] = None
+        self,
+        api_key: Union[str, None] = None,
+        base_url: Union[str, None] = None,
+        transport: Union[TransportConfig, None] = None,
+        retry_policy: Union[RetryPolicy, None] = None,
+        retry_budget: Union[RetryBudget, None] = None,
+        translation_cache: Union[TranslationCache, None] = None,
+        transcription_cache: Union[TranscriptionCache, None] = None,
+        tts_cache: Union[TTSCache, None] = None,
+        rate_limiter: Union[RateLimiter, SharedRateLimiter, None] = None,
+        hooks: Union[list[RequestHook], None] = None,
+        tracing: Union[Tracing, None] = None,
     ):
         self.settings = None
         if base_url is None:
             self.settings = Settings()
             self.base_url = self.settings.base_url
         else:
-            self.base_url = self.base_url
+            self.base_url = base_url
 
         if api_key is None:
             self.settings = Settings()
@@ -29,17 +87,128 @@ class Djelia:
         else:
             self.auth = Auth(api_key=api_key)
 
+        self.transport = transport or TransportConfig()
+        self.retry_policy = retry_policy or RetryPolicy()
+        self.retry_budget = retry_budget or RetryBudget()
+        self.rate_limiter = rate_limiter
+        self.translation_cache = translation_cache
+        self.transcription_cache = transcription_cache
+        self.tts_cache = tts_cache
+        # called with a RequestEvent after every request, see add_hook
+        self.hooks = list(hooks or [])
+        # a Tracing without OpenTelemetry installed traces nothing
+        self.tracing = tracing if tracing is not None and tracing.enabled else None
+        self.language_catalog = language_catalog(self.base_url)
+        self.speaker_catalog = SpeakerCatalog.from_settings(self.settings)
+        self._session = None
+        self._session_lock = threading.Lock()
+
         self.translation = Translation(self)
         self.transcription = Transcription(self)
         self.tts = TTS(self)
 
-    @retry(
-        retry=retry_if_exception_type(Exception),
-        wait=wait_random_exponential(multiplier=1, max=40),
-        stop=stop_after_attempt(3),
-    )
-    def _make_request(self, method: str, endpoint: str, **kwargs):
-        headers = self.auth.get_headers()
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    def close(self):
+        with self._session_lock:
+            if self._session is not None:
+                self._session.close()
+                self._session = None
+
+    def add_hook(self, hook: RequestHook) -> None:
+        """Call ``hook`` with a :class:`RequestEvent` after every request.
+
+        Hooks run synchronously on the thread (or event loop) that made the
+        request, keep them cheap. Without hooks nothing is measured.
+        """
+        self.hooks.append(hook)
+
+    def remove_hook(self, hook: RequestHook) -> None:
+        self.hooks.remove(hook)
+
+    @property
+    def session(self) -> requests.Session:
+        if self._session is None:
+            with self._session_lock:
+                if self._session is None:
+                    self._session = self._build_session()
+        return self._session
+
+    def _build_session(self) -> requests.Session:
+        session = requests.Session()
+        adapter = TimedHTTPAdapter(
+            pool_connections=self.transport.pool_size,
+            pool_maxsize=self.transport.max_connections_per_host,
+            pool_block=self.transport.pool_block,
+        )
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+        if not self.transport.keep_alive:
+            session.headers["Connection"] = "close"
+        return session
+
+    def _build_url(self, endpoint: str) -> str:
+        if self.base_url and endpoint.startswith(DjeliaRequest.base_url):
+            return self.base_url.rstrip("/") + endpoint[len(DjeliaRequest.base_url) :]
+        return endpoint
+
+    def _make_request(
+        self,
+        method: str,
+        endpoint: str,
+        retry_policy: Union[RetryPolicy, None] = None,
+        parse=None,
+        **kwargs,
+    ):
+        # ``parse`` builds the result from the JSON body, timed as the parse
+        # stage; without it the response is returned
+        if not self.hooks:
+            response = self._send(method, endpoint, retry_policy, **kwargs)
+            if parse is not None:
+                return parse(response.json())
+            if kwargs.get("stream"):
+                return _release_on_close(response, _stream_span(self.tracing, endpoint))
+            return response
+
+        event = RequestEvent(
+            method=method, endpoint=endpoint, stream=bool(kwargs.get("stream"))
+        )
+        try:
+            response = self._send(method, endpoint, retry_policy, event, **kwargs)
+            if event.stream:
+                # reported once the caller closes the stream
+                emit_stream_opened(self.hooks, event)
+                return _release_on_close(
+                    response,
+                    reporter(self.hooks, event, received_bytes(response)),
+                    _stream_span(self.tracing, endpoint),
+                )
+            result = response
+            if parse is not None:
+                start = time.perf_counter()
+                result = parse(response.json())
+                event.timings.parse += time.perf_counter() - start
+        except BaseException as e:
+            event.error = e
+            emit(self.hooks, event)
+            raise
+        emit(self.hooks, event)
+        return result
+
+    def _send(
+        self,
+        method: str,
+        endpoint: str,
+        retry_policy: Union[RetryPolicy, None] = None,
+        event: Union[RequestEvent, None] = None,
+        **kwargs,
+    ) -> requests.Response:
+        headers = {**self.auth.get_headers(), **kwargs.pop("headers", {})}
+        policy = retry_policy or self.retry_policy
 
         if "params" in kwargs:
             params = kwargs["params"]
@@ -47,26 +216,96 @@ class Djelia:
                 if isinstance(value, bool):
                     params[key] = str(value).lower()
 
+        kwargs.setdefault(
+            "timeout", (self.transport.connect_timeout, self.transport.read_timeout)
+        )
+        limiter = self.rate_limiter
+        tracing = self.tracing
+        # streaming endpoints may be capped, the slot is held until the
+        # response is closed
+        release = limiter.open_stream(endpoint) if limiter is not None else None
+        self.retry_budget.record_request()
+        attempt = 1
         try:
-            response = requests.request(method, endpoint, headers=headers, **kwargs)
-            response.raise_for_status()
-            return response
-        except requests.exceptions.HTTPError as e:
-            raise api_exception(code=e.response.status_code, error=e)
-        except requests.exceptions.RequestException as e:
-            raise general_exception(error=e)
+            while True:
+                if limiter is not None:
+                    limiter.acquire(endpoint)
+                if event is not None:
+                    event.retries, event.status = attempt - 1, None
+                try:
+                    url = self._build_url(endpoint)
+                    span = None
+                    if tracing is not None:
+                        span = tracing.attempt(method, endpoint, url, attempt)
+                    with span or nullcontext():
+                        sent = headers if span is None else span.inject(headers)
+                        if event is None:
+                            response = self.session.request(
+                                method, url, headers=sent, **kwargs
+                            )
+                        else:
+                            response = send_traced(
+                                self.session, method, url, sent, kwargs, event
+                            )
+                            event.status = response.status_code
+                        if span is not None:
+                            span.status = response.status_code
+                    response.raise_for_status()
+                    if limiter is not None:
+                        limiter.on_response(endpoint, response.status_code)
+                    return _release_on_close(response, release)
+                except requests.exceptions.HTTPError as e:
+                    status = e.response.status_code
+                    if event is not None:
+                        event.status = status
+                    if limiter is not None:
+                        limiter.on_response(
+                            endpoint, status, e.response.headers.get("Retry-After")
+                        )
+                    delay = policy.get_delay(
+                        method,
+                        attempt,
+                        status=status,
+                        retry_after=e.response.headers.get("Retry-After"),
+                    )
+                    e.response.close()
+                    if delay is None or not self.retry_budget.acquire():
+                        raise api_exception(code=status, error=e)
+                except requests.exceptions.RequestException as e:
+                    delay = policy.get_delay(method, attempt, error=e)
+                    if delay is None or not self.retry_budget.acquire():
+                        raise general_exception(error=e)
+
+                time.sleep(delay)
+                attempt += 1
+        except BaseException:
+            if release is not None:
+                release()
+            raise
 
 
 class DjeliaAsync:
     def __init__(
-        self, api_key: Union[str, None] = None, base_url: Union[str, None] = None
+        self,
+        api_key: Union[str, None] = None,
+        base_url: Union[str, None] = None,
+        transport: Union[TransportConfig, None] = None,
+        retry_policy: Union[RetryPolicy, None] = None,
+        retry_budget: Union[RetryBudget, None] = None,
+        translation_cache: Union[TranslationCache, None] = None,
+        transcription_cache: Union[TranscriptionCache, None] = None,
+        tts_cache: Union[TTSCache, None] = None,
+        rate_limiter: Union[RateLimiter, SharedRateLimiter, None] = None,
+        concurrency_limiter: Union[ConcurrencyLimiter, None] = None,
+        hooks: Union[list[RequestHook], None] = None,
+        tracing: Union[Tracing, None] = None,
     ):
         self.settings = None
         if base_url is None:
             self.settings = Settings()
             self.base_url = self.settings.base_url
         else:
-            self.base_url = self.base_url
+            self.base_url = base_url
 
         if api_key is None:
             self.settings = Settings()
@@ -74,10 +313,34 @@ class DjeliaAsync:
         else:
             self.auth = Auth(api_key=api_key)
 
+        self.transport = transport or TransportConfig()
+        self.retry_policy = retry_policy or RetryPolicy()
+        self.retry_budget = retry_budget or RetryBudget()
+        self.rate_limiter = rate_limiter
+        self.concurrency_limiter = concurrency_limiter
+        self.translation_cache = translation_cache
+        self.transcription_cache = transcription_cache
+        self.tts_cache = tts_cache
+        # called with a RequestEvent after every request, see add_hook
+        self.hooks = list(hooks or [])
+        # a Tracing without OpenTelemetry installed traces nothing
+        self.tracing = tracing if tracing is not None and tracing.enabled else None
+        self.language_catalog = language_catalog(self.base_url)
+        self.speaker_catalog = SpeakerCatalog.from_settings(self.settings)
+        # aiohttp sessions are bound to the loop that created them, so keep one
+        # per event loop
+        self._sessions = {}
+        self._sessions_lock = threading.Lock()
+        # sessions built without hooks carry no trace config, they are
+        # replaced once a hook is added
+        self._untraced = set()
+        self._retired = []
+        self._io_executor = None
+
         self.translation = AsyncTranslation(self)
         self.transcription = AsyncTranscription(self)
         self.tts = AsyncTTS(self)
-        self._session = None
+        self.pipeline = AsyncPipeline(self)
 
     async def __aenter__(self):
         return self
@@ -86,23 +349,119 @@ class DjeliaAsync:
         await self.close()
 
     async def close(self):
-        if self._session and not self._session.closed:
-            await self._session.close()
-            self._session = None
+        current = asyncio.get_running_loop()
+        with self._sessions_lock:
+            sessions = list(self._sessions.items()) + self._retired
+            self._sessions.clear()
+            self._untraced.clear()
+            self._retired = []
+
+        for loop, session in sessions:
+            if session.closed:
+                continue
+            if loop is current:
+                await session.close()
+            elif loop.is_running():
+                await asyncio.wrap_future(
+                    asyncio.run_coroutine_threadsafe(session.close(), loop)
+                )
+            # sessions of a closed loop cannot be closed anymore, drop them
+
+        with self._sessions_lock:
+            executor, self._io_executor = self._io_executor, None
+        if executor is not None:
+            executor.shutdown(wait=False)
+
+    def add_hook(self, hook: RequestHook) -> None:
+        """Call ``hook`` with a :class:`RequestEvent` after every request.
+
+        Hooks run synchronously on the thread (or event loop) that made the
+        request, keep them cheap. Without hooks nothing is measured.
+        """
+        self.hooks.append(hook)
+
+    def remove_hook(self, hook: RequestHook) -> None:
+        self.hooks.remove(hook)
 
     @property
-    def session(self):
-        if self._session is None or self._session.closed:
-            self._session = aiohttp.ClientSession()
-        return self._session
+    def session(self) -> aiohttp.ClientSession:
+        loop = asyncio.get_running_loop()
+        with self._sessions_lock:
+            session = self._sessions.get(loop)
+            if session in self._untraced and self.hooks:
+                # requests in flight finish on the old session, it is closed
+                # with the client
+                self._untraced.discard(session)
+                self._retired.append((loop, session))
+                session = None
+            if session is None or session.closed:
+                # forget sessions whose loop is gone, they are unusable
+                for stale in [key for key in self._sessions if key.is_closed()]:
+                    self._untraced.discard(self._sessions.pop(stale))
+                self._untraced.discard(session)
+                session = self._build_session()
+                self._sessions[loop] = session
+        return session
+
+    @property
+    def io_executor(self) -> ThreadPoolExecutor:
+        # blocking file I/O runs here instead of on the event loop; the pool
+        # size bounds how many files are read or written at once
+        if self._io_executor is None:
+            with self._sessions_lock:
+                if self._io_executor is None:
+                    self._io_executor = ThreadPoolExecutor(
+                        max_workers=self.transport.io_workers,
+                        thread_name_prefix="djelia-io",
+                    )
+        return self._io_executor
+
+    async def _run_io(self, func, *args):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.io_executor, func, *args)
+
+    def _build_session(self) -> aiohttp.ClientSession:
+        transport = self.transport
+        connector = aiohttp.TCPConnector(
+            limit=transport.max_connections,
+            limit_per_host=transport.max_connections_per_host,
+            force_close=not transport.keep_alive,
+            keepalive_timeout=(
+                transport.keepalive_timeout if transport.keep_alive else None
+            ),
+            use_dns_cache=transport.use_dns_cache,
+            ttl_dns_cache=transport.dns_cache_ttl,
+        )
+        timeout = aiohttp.ClientTimeout(
+            total=transport.total_timeout,
+            sock_connect=transport.connect_timeout,
+            sock_read=transport.read_timeout,
+        )
+        if not self.hooks:
+            # aiohttp calls every trace callback of every request, skip them
+            # when nothing reads the timings
+            session = aiohttp.ClientSession(connector=connector, timeout=timeout)
+            self._untraced.add(session)
+            return session
+        return aiohttp.ClientSession(
+            connector=connector, timeout=timeout, trace_configs=[trace_config()]
+        )
+
+    def _build_url(self, endpoint: str) -> str:
+        if self.base_url and endpoint.startswith(DjeliaRequest.base_url):
+            return self.base_url.rstrip("/") + endpoint[len(DjeliaRequest.base_url) :]
+        return endpoint
 
-    @retry(
-        retry=retry_if_exception_type(Exception),
-        wait=wait_random_exponential(multiplier=1, max=40),
-        stop=stop_after_attempt(3),
-    )
-    async def _make_request(self, method: str, endpoint: str, **kwargs):
-        headers = self.auth.get_headers()
+    async def _send(
+        self,
+        method: str,
+        endpoint: str,
+        retry_policy: Union[RetryPolicy, None] = None,
+        event: Union[RequestEvent, None] = None,
+        **kwargs,
+    ) -> aiohttp.ClientResponse:
+        headers = {**self.auth.get_headers(), **kwargs.pop("headers", {})}
+        policy = retry_policy or self.retry_policy
 
         if "params" in kwargs:
             params = kwargs["params"]
@@ -110,41 +469,159 @@ class DjeliaAsync:
                 if isinstance(value, bool):
                     params[key] = str(value).lower()
 
-        async with self.session.request(
-            method, endpoint, headers=headers, **kwargs
-        ) as response:
-            try:
-                response.raise_for_status()
-                content_type = response.headers.get("content-type", "").lower()
+        # a FormData can only be sent once, so uploads pass a zero argument
+        # callable that rebuilds the body for every attempt
+        data = kwargs.pop("data", None)
+        rebuild = callable(data) and not isinstance(data, aiohttp.FormData)
 
-                if "application/json" in content_type:
-                    return await response.json()
+        limiter = self.rate_limiter
+        concurrency = self.concurrency_limiter
+        tracing = self.tracing
+        release = slot = None
+        if limiter is not None:
+            release = await limiter.aopen_stream(endpoint)
+        self.retry_budget.record_request()
+        attempt = 1
+        try:
+            while True:
+                if limiter is not None:
+                    await limiter.aacquire(endpoint)
+                if concurrency is not None:
+                    # held until the response is closed, latency is sampled
+                    # when the headers arrive
+                    slot = await concurrency.acquire()
+                marks = None
+                if event is not None:
+                    event.retries, event.status = attempt - 1, None
+                    marks = AttemptMarks()
+                url = self._build_url(endpoint)
+                span = None
+                if tracing is not None:
+                    span = tracing.attempt(method, endpoint, url, attempt)
+                try:
+                    with span or nullcontext():
+                        response = await self.session.request(
+                            method,
+                            url,
+                            headers=headers if span is None else span.inject(headers),
+                            data=data() if rebuild else data,
+                            trace_request_ctx=marks,
+                            **kwargs,
+                        )
+                        if span is not None:
+                            span.status = response.status
+                except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                    if marks is not None:
+                        marks.record(event)
+                    if slot is not None:
+                        concurrency.on_response(endpoint, slot.started, None)
+                        slot()
+                    delay = policy.get_delay(method, attempt, error=e)
+                    if delay is None or not self.retry_budget.acquire():
+                        raise general_exception(error=e)
                 else:
-                    return await response.read()
+                    if marks is not None:
+                        marks.record(event)
+                        event.status = response.status
+                    if limiter is not None:
+                        limiter.on_response(
+                            endpoint,
+                            response.status,
+                            response.headers.get("Retry-After"),
+                        )
+                    if slot is not None:
+                        concurrency.on_response(endpoint, slot.started, response.status)
+                    try:
+                        response.raise_for_status()
+                        return _release_on_close(response, release, slot)
+                    except aiohttp.ClientResponseError as e:
+                        response.release()
+                        if slot is not None:
+                            slot()
+                        delay = policy.get_delay(
+                            method,
+                            attempt,
+                            status=e.status,
+                            retry_after=response.headers.get("Retry-After"),
+                        )
+                        if delay is None or not self.retry_budget.acquire():
+                            raise api_exception(code=e.status, error=e)
 
-            except aiohttp.ClientResponseError as e:
-                raise api_exception(code=e.status, error=e)
-            except aiohttp.ClientError as e:
-                raise general_exception(error=e)
+                await asyncio.sleep(delay)
+                attempt += 1
+        except BaseException:
+            if release is not None:
+                release()
+            if slot is not None:
+                slot()
+            raise
 
-    async def _make_streaming_request(self, method: str, endpoint: str, **kwargs):
-        headers = self.auth.get_headers()
+    async def _make_request(
+        self,
+        method: str,
+        endpoint: str,
+        retry_policy: Union[RetryPolicy, None] = None,
+        parse=None,
+        with_response: bool = False,
+        **kwargs,
+    ):
+        # ``parse`` builds the result from the decoded body, timed as the
+        # parse stage; ``with_response`` returns ``(result, response)`` for
+        # callers that need the status or headers (the body is read by then)
+        event = RequestEvent(method=method, endpoint=endpoint) if self.hooks else None
+        try:
+            response = await self._send(method, endpoint, retry_policy, event, **kwargs)
+            async with response:
+                try:
+                    if event is not None:
+                        start = time.perf_counter()
+                        event.bytes_received = len(await response.read())
+                        event.timings.download += time.perf_counter() - start
+                        start = time.perf_counter()
 
-        if "params" in kwargs:
-            params = kwargs["params"]
-            for key, value in params.items():
-                if isinstance(value, bool):
-                    params[key] = str(value).lower()
+                    content_type = response.headers.get("content-type", "").lower()
 
-        response = await self.session.request(
-            method, endpoint, headers=headers, **kwargs
-        )
+                    if "application/json" in content_type:
+                        data = await response.json()
+                    else:
+                        data = await response.read()
+
+                except aiohttp.ClientError as e:
+                    raise general_exception(error=e)
+            result = data if parse is None else parse(data)
+            if event is not None:
+                event.timings.parse += time.perf_counter() - start
+        except BaseException as e:
+            if event is not None:
+                event.error = e
+                emit(self.hooks, event)
+            raise
+        if event is not None:
+            emit(self.hooks, event)
+        return (result, response) if with_response else result
+
+    async def _make_streaming_request(
+        self,
+        method: str,
+        endpoint: str,
+        retry_policy: Union[RetryPolicy, None] = None,
+        **kwargs,
+    ):
+        if not self.hooks:
+            response = await self._send(method, endpoint, retry_policy, **kwargs)
+            return _release_on_close(response, _stream_span(self.tracing, endpoint))
+
+        event = RequestEvent(method=method, endpoint=endpoint, stream=True)
         try:
-            response.raise_for_status()
-            return response
-        except (aiohttp.ClientResponseError, aiohttp.ClientError) as e:
-            await response.close()
-            if isinstance(e, aiohttp.ClientResponseError):
-                raise api_exception(code=e.status, error=e)
-            else:
-                raise general_exception(error=e)
+            response = await self._send(method, endpoint, retry_policy, event, **kwargs)
+        except BaseException as e:
+            event.error = e
+            emit(self.hooks, event)
+            raise
+        # reported once the caller closes or releases the response
+        emit_stream_opened(self.hooks, event)
+        return _release_on_close(
+            response,
+            reporter(self.hooks, event, lambda: response.content.total_bytes),
+            _stream_span(self.tracing, endpoint),
+        )
@@ -0,0 +1,182 @@
+import asyncio
+import math
+import threading
+import time
+from collections import deque
+
+from .ratelimit import endpoint_name
+
+
+def _wake(future: asyncio.Future) -> None:
+    if not future.done():
+        future.set_result(None)
+
+
+class _Latency:
+    """Fastest latency of an endpoint in the previous and current window."""
+
+    __slots__ = ("baseline", "window_min", "window_end")
+
+    def __init__(self, window_end: float):
+        self.baseline = math.inf
+        self.window_min = math.inf
+        self.window_end = window_end
+
+    def fastest(self) -> float:
+        return min(self.baseline, self.window_min)
+
+
+class ConcurrencySlot:
+    """One request's place under a :class:`ConcurrencyLimiter`.
+
+    Calling the slot frees it; further calls do nothing, so every exit path
+    can release without bookkeeping.
+    """
+
+    __slots__ = ("limiter", "started", "_released")
+
+    def __init__(self, limiter: "ConcurrencyLimiter"):
+        self.limiter = limiter
+        self.started = time.monotonic()
+        self._released = False
+
+    def __call__(self) -> None:
+        if not self._released:
+            self._released = True
+            self.limiter._release()
+
+
+class ConcurrencyLimiter:
+    """Adaptive cap on the requests a ``DjeliaAsync`` client has in flight.
+
+    The limit follows AIMD, like TCP congestion control. Every response that
+    arrives while the limit is in use adds ``1 / limit``, about one more
+    request per round trip. A 429, a 5xx or a transport error multiplies it
+    by ``decrease``. A response slower than ``tolerance`` times the fastest
+    one of the same endpoint in the last ``window`` seconds multiplies it by
+    ``latency_decrease``. The server is queueing before it fails. Requests
+    sent before a cut do not cut it again. Requests over the limit wait for
+    a free slot, in order. ``limit`` is the current value, worth exporting
+    as a metric.
+    Thread-safe, one instance can be shared by several clients and loops.
+    """
+
+    def __init__(
+        self,
+        initial_limit: int = 8,
+        min_limit: int = 1,
+        max_limit: int = 256,
+        decrease: float = 0.5,
+        latency_decrease: float = 0.9,
+        tolerance: float = 1.5,
+        window: float = 30.0,
+    ):
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.decrease = decrease
+        self.latency_decrease = latency_decrease
+        self.tolerance = tolerance
+        self.window = window
+        # counters, e.g. for metrics
+        self.decreases = 0
+        self.dropped = 0
+        self._limit = float(min(max(initial_limit, min_limit), max_limit))
+        self._in_flight = 0
+        self._waiters = deque()
+        self._last_decrease = 0.0
+        # per endpoint: a transcription is not slow next to a translation
+        self._latencies = {}
+        self._lock = threading.Lock()
+
+    @property
+    def limit(self) -> int:
+        return int(self._limit)
+
+    @property
+    def in_flight(self) -> int:
+        return self._in_flight
+
+    @property
+    def waiting(self) -> int:
+        return len(self._waiters)
+
+    def baseline(self, endpoint: str) -> float | None:
+        """Fastest recent latency of ``endpoint`` in seconds, the reference
+        for queueing.
+        """
+        latency = self._latencies.get(endpoint_name(endpoint))
+        if latency is None or latency.fastest() == math.inf:
+            return None
+        return latency.fastest()
+
+    async def acquire(self) -> ConcurrencySlot:
+        """Wait for a free slot; call the returned slot to free it."""
+        with self._lock:
+            if not self._waiters and self._in_flight < self.limit:
+                self._in_flight += 1
+                return ConcurrencySlot(self)
+            future = asyncio.get_running_loop().create_future()
+            self._waiters.append(future)
+        try:
+            await future
+        except asyncio.CancelledError:
+            with self._lock:
+                try:
+                    self._waiters.remove(future)
+                except ValueError:
+                    # granted as we were cancelled, hand it on
+                    self._in_flight -= 1
+                    self._grant()
+            raise
+        return ConcurrencySlot(self)
+
+    def _release(self) -> None:
+        with self._lock:
+            self._in_flight -= 1
+            self._grant()
+
+    def _grant(self) -> None:
+        # lock held
+        while self._waiters and self._in_flight < self.limit:
+            future = self._waiters.popleft()
+            self._in_flight += 1
+            future.get_loop().call_soon_threadsafe(_wake, future)
+
+    def on_response(self, endpoint: str, started: float, status: int | None) -> None:
+        """Adapt the limit to a response (``status`` None: transport error)
+        to a request to ``endpoint`` sent at ``started``.
+        """
+        now = time.monotonic()
+        latency = now - started
+        with self._lock:
+            if status is None or status == 429 or status >= 500:
+                self.dropped += 1
+                self._cut(started, now, self.decrease)
+                return
+            if status >= 400:
+                # a rejected request says nothing about the server's load
+                return
+            name = endpoint_name(endpoint)
+            recent = self._latencies.get(name)
+            if recent is None:
+                recent = self._latencies[name] = _Latency(now + self.window)
+            if now >= recent.window_end:
+                recent.baseline = recent.window_min
+                recent.window_min = math.inf
+                recent.window_end = now + self.window
+            recent.window_min = min(recent.window_min, latency)
+            if latency > recent.fastest() * self.tolerance:
+                self._cut(started, now, self.latency_decrease)
+            elif self._waiters or self._in_flight >= self.limit:
+                # only grow a limit that is actually reached
+                self._limit = min(self.max_limit, self._limit + 1 / self._limit)
+                self._grant()
+
+    def _cut(self, started: float, now: float, factor: float) -> None:
+        # lock held; responses to requests sent before the last cut reflect
+        # the old limit, they are one signal
+        if started < self._last_decrease:
+            return
+        self._last_decrease = now
+        self._limit = max(self.min_limit, self._limit * factor)
+        self.decreases += 1
@@ -0,0 +1,315 @@
+import threading
+import time
+from collections.abc import Callable
+from dataclasses import dataclass, field
+from types import SimpleNamespace
+
+import aiohttp
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+
+from djelia.utils.logger import logger
+
+
+@dataclass
+class RequestTimings:
+    """Seconds one request spent in each stage, summed over its attempts."""
+
+    # building the HTTP request: JSON encoding, multipart framing
+    serialize: float = 0.0
+    # waiting for a pooled connection, or opening one (TCP + TLS)
+    connect: float = 0.0
+    # from the first byte sent to the response headers
+    first_byte: float = 0.0
+    # reading the body; for streams, until the caller closes them
+    download: float = 0.0
+    # JSON decoding and Pydantic model construction
+    parse: float = 0.0
+
+    @property
+    def total(self) -> float:
+        return (
+            self.serialize + self.connect + self.first_byte + self.download + self.parse
+        )
+
+
+@dataclass
+class RequestEvent:
+    """What a request hook receives once a request is over."""
+
+    method: str
+    endpoint: str
+    stream: bool = False
+    status: int | None = None
+    bytes_sent: int = 0
+    bytes_received: int = 0
+    retries: int = 0
+    # the exception the request failed with, if any
+    error: BaseException | None = None
+    timings: RequestTimings = field(default_factory=RequestTimings)
+    # wall clock seconds from the call to the event, backoff included
+    elapsed: float = 0.0
+    started: float = field(default_factory=time.perf_counter, repr=False)
+
+
+RequestHook = Callable[[RequestEvent], None]
+
+
+def emit(hooks: list[RequestHook], event: RequestEvent) -> None:
+    event.elapsed = time.perf_counter() - event.started
+    # a broken hook must not break the request it observes
+    for hook in list(hooks):
+        try:
+            hook(event)
+        except Exception:
+            logger.exception("request hook %r failed", hook)
+
+
+def emit_stream_opened(hooks: list[RequestHook], event: RequestEvent) -> None:
+    # hooks with a ``stream_opened`` method also hear when a stream is handed
+    # to the caller, its event follows once it is closed
+    for hook in list(hooks):
+        opened = getattr(hook, "stream_opened", None)
+        if opened is None:
+            continue
+        try:
+            opened(event)
+        except Exception:
+            logger.exception("request hook %r failed", hook)
+
+
+def reporter(
+    hooks: list[RequestHook], event: RequestEvent, received: Callable[[], int]
+) -> Callable[[], None]:
+    """Emits a streaming ``event`` once, when the caller is done with it;
+    the body download is timed from now.
+    """
+    start = time.perf_counter()
+    reported = False
+
+    def report() -> None:
+        nonlocal reported
+        if not reported:
+            reported = True
+            event.timings.download += time.perf_counter() - start
+            event.bytes_received = received()
+            emit(hooks, event)
+
+    return report
+
+
+# ================================================
+#         requests: connection acquisition
+# ================================================
+
+# connection time of the request running on this thread, None when it is
+# not instrumented
+_stage = threading.local()
+
+
+def _add_connect(seconds: float) -> None:
+    if getattr(_stage, "connect", None) is not None:
+        _stage.connect += seconds
+
+
+class _TimedHTTPConnection(HTTPConnection):
+    def connect(self):
+        start = time.perf_counter()
+        try:
+            super().connect()
+        finally:
+            _add_connect(time.perf_counter() - start)
+
+
+class _TimedHTTPSConnection(HTTPSConnection):
+    def connect(self):
+        start = time.perf_counter()
+        try:
+            super().connect()
+        finally:
+            _add_connect(time.perf_counter() - start)
+
+
+class _TimedHTTPConnectionPool(HTTPConnectionPool):
+    ConnectionCls = _TimedHTTPConnection
+
+    def _get_conn(self, timeout=None):
+        start = time.perf_counter()
+        try:
+            return super()._get_conn(timeout)
+        finally:
+            _add_connect(time.perf_counter() - start)
+
+
+class _TimedHTTPSConnectionPool(HTTPSConnectionPool):
+    ConnectionCls = _TimedHTTPSConnection
+
+    def _get_conn(self, timeout=None):
+        start = time.perf_counter()
+        try:
+            return super()._get_conn(timeout)
+        finally:
+            _add_connect(time.perf_counter() - start)
+
+
+class TimedHTTPAdapter(HTTPAdapter):
+    """``HTTPAdapter`` whose pools report the time spent getting a connection."""
+
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {
+            "http": _TimedHTTPConnectionPool,
+            "https": _TimedHTTPSConnectionPool,
+        }
+
+
+def _counted(body, event: RequestEvent):
+    for chunk in body:
+        event.bytes_sent += len(chunk)
+        yield chunk
+
+
+def received_bytes(response: requests.Response) -> Callable[[], int]:
+    """Bytes of a streamed body read so far. urllib3 only counts bodies with
+    a length, chunked ones are counted as ``iter_content`` pulls them.
+    """
+    raw = response.raw
+    stream = raw.stream
+    counted = 0
+
+    def counting(*args, **kwargs):
+        nonlocal counted
+        for chunk in stream(*args, **kwargs):
+            counted += len(chunk)
+            yield chunk
+
+    raw.stream = counting
+    return lambda: max(raw.tell(), counted)
+
+
+def send_traced(
+    session: requests.Session,
+    method: str,
+    url: str,
+    headers: dict,
+    kwargs: dict,
+    event: RequestEvent,
+) -> requests.Response:
+    """``session.request`` split into stages, timed into ``event``."""
+    kwargs = dict(kwargs)
+    stream = kwargs.pop("stream", False)
+    send_kwargs = {
+        "timeout": kwargs.pop("timeout", None),
+        "allow_redirects": kwargs.pop("allow_redirects", True),
+    }
+    proxies = kwargs.pop("proxies", None) or {}
+    verify = kwargs.pop("verify", None)
+    cert = kwargs.pop("cert", None)
+    timings = event.timings
+
+    start = time.perf_counter()
+    prepared = session.prepare_request(
+        requests.Request(method.upper(), url, headers=headers, **kwargs)
+    )
+    send_kwargs.update(
+        session.merge_environment_settings(prepared.url, proxies, True, verify, cert)
+    )
+    body = prepared.body
+    length = prepared.headers.get("Content-Length")
+    if length is not None:
+        event.bytes_sent += int(length)
+    elif body is not None and not isinstance(body, (bytes, str)):
+        # chunked upload, count it as it goes out
+        prepared.body = _counted(body, event)
+    sent = time.perf_counter()
+    timings.serialize += sent - start
+
+    _stage.connect = 0.0
+    try:
+        # headers only, the body is read below or by the caller
+        response = session.send(prepared, **send_kwargs)
+    finally:
+        connect, _stage.connect = _stage.connect, None
+        timings.connect += connect
+        timings.first_byte += time.perf_counter() - sent - connect
+    if not stream:
+        start = time.perf_counter()
+        event.bytes_received = len(response.content)
+        timings.download += time.perf_counter() - start
+    return response
+
+
+# ================================================
+#              aiohttp: trace events
+# ================================================
+
+
+class AttemptMarks:
+    """Timestamps of one aiohttp attempt, filled by :func:`trace_config`."""
+
+    __slots__ = ("start", "connecting", "connected", "headers", "sent")
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.connecting = None
+        self.connected = None
+        self.headers = None
+        self.sent = 0
+
+    def record(self, event: RequestEvent) -> None:
+        end = time.perf_counter()
+        headers = self.headers or end
+        connected = self.connected or headers
+        connecting = self.connecting or connected
+        timings = event.timings
+        timings.serialize += max(0.0, connecting - self.start)
+        timings.connect += max(0.0, connected - connecting)
+        timings.first_byte += max(0.0, headers - connected)
+        event.bytes_sent += self.sent
+
+
+def _marks(context: SimpleNamespace) -> AttemptMarks | None:
+    return context.trace_request_ctx
+
+
+async def _on_connecting(session, context, params) -> None:
+    marks = _marks(context)
+    if marks is not None and marks.connecting is None:
+        marks.connecting = time.perf_counter()
+
+
+async def _on_connected(session, context, params) -> None:
+    marks = _marks(context)
+    if marks is not None:
+        if marks.connecting is None:
+            marks.connecting = time.perf_counter()
+        marks.connected = time.perf_counter()
+
+
+async def _on_chunk_sent(session, context, params) -> None:
+    marks = _marks(context)
+    if marks is not None:
+        marks.sent += len(params.chunk)
+
+
+async def _on_headers(session, context, params) -> None:
+    marks = _marks(context)
+    if marks is not None:
+        marks.headers = time.perf_counter()
+
+
+def trace_config() -> aiohttp.TraceConfig:
+    """Trace events that fill the ``AttemptMarks`` passed as
+    ``trace_request_ctx``; requests without one are not traced.
+    """
+    config = aiohttp.TraceConfig()
+    config.on_connection_queued_start.append(_on_connecting)
+    config.on_connection_create_start.append(_on_connecting)
+    config.on_connection_queued_end.append(_on_connected)
+    config.on_connection_create_end.append(_on_connected)
+    config.on_connection_reuseconn.append(_on_connected)
+    config.on_request_chunk_sent.append(_on_chunk_sent)
+    config.on_request_end.append(_on_headers)
+    return config
@@ -0,0 +1,265 @@
+import bisect
+import math
+import threading
+from collections import defaultdict
+from collections.abc import Callable
+
+from djelia.utils.logger import logger
+
+from .instrumentation import RequestEvent
+from .ratelimit import endpoint_name
+
+# seconds, from a cached translation to a long transcription
+DEFAULT_BUCKETS = (
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+    30.0,
+    60.0,
+    120.0,
+)
+
+_COUNTERS = {
+    "djelia_requests_total": "Requests completed, by endpoint, method and status.",
+    "djelia_errors_total": "Requests that failed, by endpoint and exception class.",
+    "djelia_retries_total": "Retried attempts, by endpoint.",
+    "djelia_sent_bytes_total": "Request body bytes sent, by endpoint.",
+    "djelia_received_bytes_total": "Response body bytes received, by endpoint.",
+}
+_HISTOGRAMS = {
+    "djelia_request_duration_seconds": (
+        "Wall time of requests, retries included, by endpoint."
+    ),
+    "djelia_request_first_byte_seconds": (
+        "Time from sending to the response headers, by endpoint."
+    ),
+}
+_STREAMS = "djelia_streams_in_flight"
+
+
+class _Histogram:
+    __slots__ = ("counts", "sum")
+
+    def __init__(self, size: int):
+        # one count per bucket, the last one is +Inf
+        self.counts = [0] * size
+        self.sum = 0.0
+
+
+class _Shard:
+    """Counters written by a single thread, summed when rendering."""
+
+    def __init__(self, thread: threading.Thread):
+        self.thread = thread
+        self.counters = defaultdict(float)
+        self.histograms = {}
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(labels: tuple) -> str:
+    if not labels:
+        return ""
+    inner = ",".join(f'{key}="{_escape(str(value))}"' for key, value in labels)
+    return "{" + inner + "}"
+
+
+def _number(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    return repr(int(value)) if float(value).is_integer() else repr(value)
+
+
+class Metrics:
+    """Request metrics in Prometheus form, fed as a request hook.
+
+    Pass the instance in ``hooks`` of a ``Djelia`` or ``DjeliaAsync`` client
+    (one instance can observe several). It counts requests, errors by
+    exception class, retries and bytes per endpoint, keeps fixed-bucket
+    latency histograms and tracks the streams in flight. Every thread
+    writes to its own shard, so recording takes no lock; :meth:`render`
+    sums the shards into the Prometheus text format.
+    """
+
+    def __init__(self, buckets: tuple[float, ...] = DEFAULT_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        self._local = threading.local()
+        self._shards = []
+        # counts of shards whose thread exited
+        self._retired = _Shard(None)
+        self._gauges = {}
+        self._lock = threading.Lock()
+        self._pusher = None
+
+    def _shard(self) -> _Shard:
+        shard = getattr(self._local, "shard", None)
+        if shard is None:
+            shard = _Shard(threading.current_thread())
+            self._local.shard = shard
+            with self._lock:
+                self._shards.append(shard)
+        return shard
+
+    def _observe(self, shard: _Shard, name: str, labels: tuple, value: float):
+        histogram = shard.histograms.get((name, labels))
+        if histogram is None:
+            histogram = shard.histograms[name, labels] = _Histogram(
+                len(self.buckets) + 1
+            )
+        histogram.counts[bisect.bisect_left(self.buckets, value)] += 1
+        histogram.sum += value
+
+    def __call__(self, event: RequestEvent) -> None:
+        shard = self._shard()
+        counters = shard.counters
+        endpoint = (("endpoint", endpoint_name(event.endpoint)),)
+        status = "none" if event.status is None else str(event.status)
+        counters[
+            "djelia_requests_total",
+            endpoint + (("method", event.method), ("status", status)),
+        ] += 1
+        if event.error is not None:
+            error = (("error", type(event.error).__name__),)
+            counters["djelia_errors_total", endpoint + error] += 1
+        if event.retries:
+            counters["djelia_retries_total", endpoint] += event.retries
+        counters["djelia_sent_bytes_total", endpoint] += event.bytes_sent
+        counters["djelia_received_bytes_total", endpoint] += event.bytes_received
+        self._observe(shard, "djelia_request_duration_seconds", endpoint, event.elapsed)
+        self._observe(
+            shard,
+            "djelia_request_first_byte_seconds",
+            endpoint,
+            event.timings.first_byte,
+        )
+        if event.stream and event.error is None:
+            # a failed stream was never handed out, so never counted open
+            counters[_STREAMS, endpoint] -= 1
+
+    def stream_opened(self, event: RequestEvent) -> None:
+        endpoint = (("endpoint", endpoint_name(event.endpoint)),)
+        self._shard().counters[_STREAMS, endpoint] += 1
+
+    def add_gauge(self, name: str, help: str, callback: Callable[[], float]) -> None:
+        """Export ``callback()`` as a gauge, read at every render, e.g.
+        ``metrics.add_gauge("djelia_concurrency_limit", "...", lambda:
+        limiter.limit)``.
+        """
+        with self._lock:
+            self._gauges[name] = (help, callback)
+
+    def _merged(self) -> tuple[dict, dict]:
+        with self._lock:
+            # fold the shards of threads that exited so they do not pile up
+            for shard in [s for s in self._shards if not s.thread.is_alive()]:
+                self._merge(self._retired, shard)
+                self._shards.remove(shard)
+            shards = [self._retired, *self._shards]
+            total = _Shard(None)
+            for shard in shards:
+                self._merge(total, shard)
+        return total.counters, total.histograms
+
+    def _merge(self, into: _Shard, shard: _Shard) -> None:
+        # list() copies in one step under the GIL while the owner keeps writing
+        for key, value in list(shard.counters.items()):
+            into.counters[key] += value
+        for key, histogram in list(shard.histograms.items()):
+            target = into.histograms.get(key)
+            if target is None:
+                target = into.histograms[key] = _Histogram(len(self.buckets) + 1)
+            for index, count in enumerate(list(histogram.counts)):
+                target.counts[index] += count
+            target.sum += histogram.sum
+
+    def snapshot(self) -> dict[str, dict[tuple, float]]:
+        """Current samples as ``{metric: {labels: value}}``, histograms
+        flattened into their ``_bucket``/``_sum``/``_count`` series.
+        """
+        counters, histograms = self._merged()
+        samples = defaultdict(dict)
+        for (name, labels), value in counters.items():
+            samples[name][labels] = value
+        bounds = (*self.buckets, math.inf)
+        for (name, labels), histogram in histograms.items():
+            cumulative = 0
+            for bound, count in zip(bounds, histogram.counts):
+                cumulative += count
+                samples[f"{name}_bucket"][
+                    labels + (("le", _number(bound)),)
+                ] = cumulative
+            samples[f"{name}_sum"][labels] = histogram.sum
+            samples[f"{name}_count"][labels] = cumulative
+        with self._lock:
+            gauges = list(self._gauges.items())
+        for name, (_, callback) in gauges:
+            samples[name][()] = callback()
+        return dict(samples)
+
+    def render(self) -> str:
+        """All metrics in the Prometheus text exposition format."""
+        samples = self.snapshot()
+        with self._lock:
+            gauges = {name: help for name, (help, _) in self._gauges.items()}
+        families = [
+            *((name, help, "counter", (name,)) for name, help in _COUNTERS.items()),
+            (_STREAMS, "Streaming responses open, by endpoint.", "gauge", (_STREAMS,)),
+            *(
+                (
+                    name,
+                    help,
+                    "histogram",
+                    (f"{name}_bucket", f"{name}_sum", f"{name}_count"),
+                )
+                for name, help in _HISTOGRAMS.items()
+            ),
+            *((name, help, "gauge", (name,)) for name, help in gauges.items()),
+        ]
+        lines = []
+        for name, help, kind, series in families:
+            lines.append(f"# HELP {name} {help}")
+            lines.append(f"# TYPE {name} {kind}")
+            for serie in series:
+                # stable sort: buckets keep their ascending ``le`` order
+                items = sorted(
+                    samples.get(serie, {}).items(),
+                    key=lambda item: [label for label in item[0] if label[0] != "le"],
+                )
+                for labels, value in items:
+                    lines.append(f"{serie}{_labels(labels)} {_number(value)}")
+        return "\n".join(lines) + "\n"
+
+    def start_push(
+        self, callback: Callable[[str], None], interval: float = 15.0
+    ) -> None:
+        """Call ``callback`` with :meth:`render` every ``interval`` seconds
+        from a daemon thread, e.g. to post to a Pushgateway.
+        """
+        self.stop_push()
+        stop = threading.Event()
+
+        def push():
+            while not stop.wait(interval):
+                try:
+                    callback(self.render())
+                except Exception:
+                    logger.exception("metrics push to %r failed", callback)
+
+        thread = threading.Thread(target=push, name="djelia-metrics", daemon=True)
+        self._pusher = stop
+        thread.start()
+
+    def stop_push(self) -> None:
+        stop, self._pusher = self._pusher, None
+        if stop is not None:
+            stop.set()
@@ -0,0 +1,148 @@
+import asyncio
+import threading
+import time
+from collections.abc import Callable
+
+from .retry import parse_retry_after
+
+
+def endpoint_name(endpoint: str) -> str:
+    """Bucket name of an endpoint URL, e.g. ``"translate"`` or ``"tts/stream"``."""
+    return endpoint.split("/models/", 1)[-1].split("?", 1)[0]
+
+
+class TokenBucket:
+    """Token bucket that hands out time slots instead of failing when empty.
+
+    Each call reserves the next slot and returns how long to wait for it, so
+    concurrent callers are spaced ``1 / rate`` seconds apart once the
+    ``burst`` allowance is used up (a GCRA, in practice).
+    """
+
+    def __init__(self, rate: float, burst: float = 1.0):
+        self.rate = rate
+        self.burst = burst
+        # no further 429 backoff before this time, see RateLimiter
+        self.cooldown_until = 0.0
+        # theoretical arrival time of the next request
+        self._next = time.monotonic()
+        self._lock = threading.Lock()
+
+    def reserve(self) -> float:
+        """Take one token, returning the seconds to wait before using it."""
+        with self._lock:
+            now = time.monotonic()
+            interval = 1.0 / self.rate
+            slot = max(self._next, now)
+            self._next = slot + interval
+            return max(0.0, slot - (self.burst - 1) * interval - now)
+
+    def pause(self, seconds: float) -> None:
+        """Hand out no token for the next ``seconds``."""
+        with self._lock:
+            interval = 1.0 / self.rate
+            resume = time.monotonic() + seconds + (self.burst - 1) * interval
+            self._next = max(self._next, resume)
+
+    def set_rate(self, rate: float) -> None:
+        with self._lock:
+            self.rate = rate
+
+
+class RateLimiter:
+    """Client-side pacing of requests with one token bucket per endpoint.
+
+    ``rates`` maps endpoint names (``"translate"``, ``"transcribe"``,
+    ``"transcribe/stream"``, ``"tts"``, ``"tts/stream"``,
+    ``"translate/supported-languages"``) to requests per second; other
+    endpoints use ``default_rate``, or are not paced when it is None.
+    Requests over the rate wait for their slot rather than fail. A 429
+    multiplies the endpoint's rate by ``decrease`` (at most once per
+    ``cooldown`` seconds) and pauses it for the ``Retry-After`` period;
+    successes then win back ``increase`` of the configured rate per second.
+    Thread-safe, one instance can be shared by several clients, sync and
+    async.
+    """
+
+    def __init__(
+        self,
+        rates: dict[str, float] | None = None,
+        default_rate: float | None = None,
+        burst: float = 1.0,
+        decrease: float = 0.5,
+        increase: float = 0.1,
+        min_rate: float = 0.1,
+        cooldown: float = 1.0,
+    ):
+        self.rates = dict(rates or {})
+        self.default_rate = default_rate
+        self.burst = burst
+        self.decrease = decrease
+        self.increase = increase
+        self.min_rate = min_rate
+        self.cooldown = cooldown
+        self._buckets: dict[str, TokenBucket | None] = {}
+        self._lock = threading.Lock()
+
+    def bucket(self, endpoint: str) -> TokenBucket | None:
+        name = endpoint_name(endpoint)
+        bucket = self._buckets.get(name, False)
+        if bucket is False:
+            with self._lock:
+                if name not in self._buckets:
+                    rate = self.rates.get(name, self.default_rate)
+                    self._buckets[name] = (
+                        TokenBucket(rate, self.burst) if rate else None
+                    )
+                bucket = self._buckets[name]
+        return bucket
+
+    def rate(self, endpoint: str) -> float | None:
+        """Current requests per second allowed on ``endpoint``."""
+        bucket = self.bucket(endpoint)
+        return bucket.rate if bucket is not None else None
+
+    def delay(self, endpoint: str) -> float:
+        bucket = self.bucket(endpoint)
+        return bucket.reserve() if bucket is not None else 0.0
+
+    def acquire(self, endpoint: str) -> None:
+        delay = self.delay(endpoint)
+        if delay:
+            time.sleep(delay)
+
+    async def aacquire(self, endpoint: str) -> None:
+        delay = self.delay(endpoint)
+        if delay:
+            await asyncio.sleep(delay)
+
+    def on_response(
+        self, endpoint: str, status: int, retry_after: str | None = None
+    ) -> None:
+        """Adjust the endpoint's rate from the status of a response."""
+        bucket = self.bucket(endpoint)
+        if bucket is None:
+            return
+        configured = self.rates.get(endpoint_name(endpoint), self.default_rate)
+        if status == 429:
+            delay = parse_retry_after(retry_after)
+            if delay:
+                bucket.pause(delay)
+            # the requests already in flight get 429s as well, a burst of them
+            # is one signal: cut the rate once per cooldown
+            now = time.monotonic()
+            if now >= bucket.cooldown_until:
+                bucket.cooldown_until = now + max(delay or 0.0, self.cooldown)
+                bucket.set_rate(max(self.min_rate, bucket.rate * self.decrease))
+        elif status < 400 and bucket.rate < configured:
+            # about ``rate`` successes arrive per second, so this adds
+            # ``increase * configured`` per second whatever the rate
+            step = self.increase * configured / bucket.rate
+            bucket.set_rate(min(configured, bucket.rate + step))
+
+    def open_stream(self, endpoint: str) -> Callable[[], None] | None:
+        """Stream slots are not capped here, see ``SharedRateLimiter``."""
+        return None
+
+    async def aopen_stream(self, endpoint: str) -> Callable[[], None] | None:
+        return None
@@ -0,0 +1,174 @@
+import random
+import threading
+import time
+from collections import deque
+from email.utils import parsedate_to_datetime
+
+import aiohttp
+import requests
+from urllib3.exceptions import ConnectTimeoutError
+
+# statuses worth another attempt: throttling and server side failures
+RETRYABLE_STATUSES = frozenset({408, 429, 500, 502, 503, 504})
+# idempotent methods, safe to send again whatever happened to the first try
+RETRYABLE_METHODS = frozenset({"GET", "HEAD", "OPTIONS", "PUT", "DELETE"})
+# statuses telling that the server did not process the request, so even a
+# POST (a billed model call) can be sent again
+UNPROCESSED_STATUSES = frozenset({408, 429, 503})
+
+# aiohttp < 3.10 has no dedicated connect timeout error
+_AIOHTTP_CONNECT_ERRORS = tuple(
+    error
+    for error in (
+        aiohttp.ClientConnectorError,
+        getattr(aiohttp, "ConnectionTimeoutError", None),
+    )
+    if error is not None
+)
+
+
+def is_connect_error(error: Exception | None) -> bool:
+    """Whether ``error`` happened while connecting, before any byte was sent."""
+    if isinstance(error, requests.exceptions.ConnectTimeout):
+        return True
+    if isinstance(error, requests.exceptions.ConnectionError):
+        # requests wraps the urllib3 error in a MaxRetryError
+        reason = getattr(error.args[0] if error.args else None, "reason", None)
+        return isinstance(reason, ConnectTimeoutError)
+    return isinstance(error, _AIOHTTP_CONNECT_ERRORS)
+
+
+def parse_retry_after(value: str | None) -> float | None:
+    """Seconds to wait from a ``Retry-After`` header (delta or HTTP date)."""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        moment = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return max(0.0, moment.timestamp() - time.time())
+
+
+class RetryPolicy:
+    """Decides whether a failed attempt is retried and how long to wait.
+
+    Only transport errors (connection failures, timeouts) and the statuses in
+    ``retry_statuses`` are retried; authentication, validation and local
+    errors fail immediately. Subclass and override :meth:`is_retryable` or
+    :meth:`backoff` to plug in a different strategy.
+
+    Every model call is a POST, and a POST that reached the model may have
+    been billed. By default it is only retried when it surely was not
+    processed: on 408/429/503 or when the connection could not be opened.
+    ``retry_post=True`` retries it like the idempotent methods.
+    """
+
+    def __init__(
+        self,
+        max_attempts: int = 3,
+        backoff_factor: float = 0.5,
+        max_backoff: float = 20.0,
+        retry_statuses: frozenset[int] = RETRYABLE_STATUSES,
+        retry_methods: frozenset[str] = RETRYABLE_METHODS,
+        respect_retry_after: bool = True,
+        max_retry_after: float = 60.0,
+        retry_post: bool = False,
+    ):
+        self.max_attempts = max_attempts
+        self.backoff_factor = backoff_factor
+        self.max_backoff = max_backoff
+        self.retry_statuses = frozenset(retry_statuses)
+        self.retry_methods = frozenset(m.upper() for m in retry_methods)
+        if retry_post:
+            self.retry_methods |= {"POST"}
+        self.respect_retry_after = respect_retry_after
+        self.max_retry_after = max_retry_after
+
+    @classmethod
+    def disabled(cls) -> "RetryPolicy":
+        return cls(max_attempts=1)
+
+    def is_retryable(
+        self, method: str, status: int | None = None, error: Exception | None = None
+    ) -> bool:
+        if status is None and error is None:
+            return False
+        if method.upper() not in self.retry_methods:
+            if method.upper() != "POST":
+                return False
+            if status is not None:
+                return status in self.retry_statuses & UNPROCESSED_STATUSES
+            return is_connect_error(error)
+        if status is not None:
+            return status in self.retry_statuses
+        return True
+
+    def backoff(self, attempt: int) -> float:
+        # "full jitter" exponential backoff
+        ceiling = min(self.max_backoff, self.backoff_factor * (2 ** (attempt - 1)))
+        return random.uniform(0, ceiling)
+
+    def get_delay(
+        self,
+        method: str,
+        attempt: int,
+        status: int | None = None,
+        error: Exception | None = None,
+        retry_after: str | None = None,
+    ) -> float | None:
+        """Seconds to sleep before the next attempt, ``None`` to give up."""
+        if attempt >= self.max_attempts:
+            return None
+        if not self.is_retryable(method, status=status, error=error):
+            return None
+
+        if self.respect_retry_after:
+            delay = parse_retry_after(retry_after)
+            if delay is not None:
+                # the server asks for a longer pause than we are willing to block
+                return delay if delay <= self.max_retry_after else None
+        return self.backoff(attempt)
+
+
+class RetryBudget:
+    """Client-wide cap on retries as a fraction of recent requests.
+
+    Over a sliding ``window`` (seconds) retries may not exceed
+    ``min_retries + ratio * requests``, so a degraded backend sees at most
+    ~``ratio`` extra load instead of ``max_attempts`` times the traffic.
+    """
+
+    def __init__(self, ratio: float = 0.1, min_retries: int = 10, window: float = 10.0):
+        self.ratio = ratio
+        self.min_retries = min_retries
+        self.window = window
+        self._requests = deque()
+        self._retries = deque()
+        self._lock = threading.Lock()
+
+    def _trim(self, now: float) -> None:
+        horizon = now - self.window
+        for events in (self._requests, self._retries):
+            while events and events[0] < horizon:
+                events.popleft()
+
+    def record_request(self) -> None:
+        now = time.monotonic()
+        with self._lock:
+            self._trim(now)
+            self._requests.append(now)
+
+    def acquire(self) -> bool:
+        """Reserve one retry, ``False`` when the budget is exhausted."""
+        now = time.monotonic()
+        with self._lock:
+            self._trim(now)
+            allowed = self.min_retries + self.ratio * len(self._requests)
+            if len(self._retries) >= allowed:
+                return False
+            self._retries.append(now)
+            return True
@@ -0,0 +1,276 @@
+import asyncio
+import mmap
+import os
+import struct
+import tempfile
+import threading
+import time
+from collections.abc import Callable
+from contextlib import contextmanager
+from dataclasses import dataclass
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - not available on Windows
+    fcntl = None
+
+from djelia.models import ErrorsMessage
+
+from .ratelimit import endpoint_name
+from .retry import parse_retry_after
+
+_MAGIC = b"DJELIA1\0"
+# magic, next slot, current rate, cooldown end, requests, throttled,
+# streams opened, seconds waited
+_HEADER = struct.Struct("<8sdddQQQd")
+# pid, open streams
+_PROCESS = struct.Struct("<ii")
+_MAX_PROCESSES = 256
+_SIZE = _HEADER.size + _PROCESS.size * _MAX_PROCESSES
+# a next slot this far ahead was written before a reboot, ignore it
+_STALE = 3600.0
+
+
+@dataclass
+class SharedUsage:
+    """Host-wide counters of a :class:`SharedRateLimiter`."""
+
+    rate: float | None
+    requests: int
+    throttled: int
+    active_streams: int
+    streams_opened: int
+    # total seconds requests were held back by pacing
+    waited: float
+
+
+class SharedRateLimiter:
+    """Rate limit and stream cap shared by every process on the host.
+
+    The state lives in a small memory-mapped file at ``path`` and is updated
+    under an ``flock``, a few microseconds per request. Every ``Djelia`` and
+    ``DjeliaAsync`` client, in any process, given a limiter on the same path
+    shares one budget of ``rate`` requests per second (None only counts
+    them) and at most ``max_streams`` concurrent streaming responses. A 429
+    lowers the shared rate for everyone, like :class:`RateLimiter`. Streams
+    held by processes that died are reclaimed. POSIX only.
+    """
+
+    def __init__(
+        self,
+        path: str | None = None,
+        rate: float | None = None,
+        max_streams: int | None = None,
+        burst: float = 1.0,
+        decrease: float = 0.5,
+        increase: float = 0.1,
+        min_rate: float = 0.1,
+        cooldown: float = 1.0,
+        poll_interval: float = 0.01,
+    ):
+        if fcntl is None:
+            raise OSError(ErrorsMessage.shared_limiter_unsupported)
+        self.path = path or os.path.join(tempfile.gettempdir(), "djelia-limiter")
+        self.configured_rate = rate
+        self.max_streams = max_streams
+        self.burst = burst
+        self.decrease = decrease
+        self.increase = increase
+        self.min_rate = min_rate
+        self.cooldown = cooldown
+        self.poll_interval = poll_interval
+        # flock does not exclude threads sharing a descriptor
+        self._lock = threading.Lock()
+        self._pid = None
+        self._open()
+
+    def _open(self) -> None:
+        self._pid = os.getpid()
+        self._fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o600)
+        fcntl.flock(self._fd, fcntl.LOCK_EX)
+        try:
+            if os.fstat(self._fd).st_size < _SIZE:
+                os.ftruncate(self._fd, _SIZE)
+            self._map = mmap.mmap(self._fd, _SIZE)
+            if self._map[: len(_MAGIC)] != _MAGIC:
+                self._map[:_SIZE] = bytes(_SIZE)
+                self._write([_MAGIC, 0.0, 0.0, 0.0, 0, 0, 0, 0.0])
+            header = self._read()
+            if self.configured_rate is not None and header[2] <= 0:
+                # created by a process that only counts requests
+                header[2] = self.configured_rate
+                self._write(header)
+        finally:
+            fcntl.flock(self._fd, fcntl.LOCK_UN)
+
+    def close(self) -> None:
+        with self._lock:
+            if self._pid == os.getpid():
+                self._map.close()
+                os.close(self._fd)
+            self._pid = None
+
+    @contextmanager
+    def _locked(self):
+        with self._lock:
+            if self._pid != os.getpid():
+                # forked: the inherited descriptor shares its lock with the
+                # parent, open our own
+                self._open()
+            fcntl.flock(self._fd, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(self._fd, fcntl.LOCK_UN)
+
+    def _read(self) -> list:
+        return list(_HEADER.unpack_from(self._map, 0))
+
+    def _write(self, header: list) -> None:
+        _HEADER.pack_into(self._map, 0, *header)
+
+    def _processes(self):
+        for index in range(_MAX_PROCESSES):
+            offset = _HEADER.size + index * _PROCESS.size
+            yield offset, *_PROCESS.unpack_from(self._map, offset)
+
+    def rate(self, endpoint: str | None = None) -> float | None:
+        """Current host-wide requests per second, None when not paced."""
+        if self.configured_rate is None:
+            return None
+        with self._locked():
+            return self._read()[2]
+
+    def delay(self, endpoint: str) -> float:
+        with self._locked():
+            header = self._read()
+            header[4] += 1
+            wait = 0.0
+            if self.configured_rate is not None:
+                now = time.monotonic()
+                interval = 1.0 / header[2]
+                slot = header[1] if header[1] - now < _STALE else now
+                slot = max(slot, now)
+                header[1] = slot + interval
+                wait = max(0.0, slot - (self.burst - 1) * interval - now)
+                header[7] += wait
+            self._write(header)
+        return wait
+
+    def acquire(self, endpoint: str) -> None:
+        delay = self.delay(endpoint)
+        if delay:
+            time.sleep(delay)
+
+    async def aacquire(self, endpoint: str) -> None:
+        delay = self.delay(endpoint)
+        if delay:
+            await asyncio.sleep(delay)
+
+    def on_response(
+        self, endpoint: str, status: int, retry_after: str | None = None
+    ) -> None:
+        configured = self.configured_rate
+        with self._locked():
+            header = self._read()
+            if status == 429:
+                header[5] += 1
+            if configured is not None:
+                now = time.monotonic()
+                rate = header[2]
+                if status == 429:
+                    delay = parse_retry_after(retry_after)
+                    if delay:
+                        resume = now + delay + (self.burst - 1) / rate
+                        header[1] = max(header[1], resume)
+                    if now >= header[3]:
+                        header[3] = now + max(delay or 0.0, self.cooldown)
+                        header[2] = max(self.min_rate, rate * self.decrease)
+                elif status < 400 and rate < configured:
+                    header[2] = min(
+                        configured, rate + self.increase * configured / rate
+                    )
+            self._write(header)
+
+    def _try_open_stream(self) -> bool:
+        pid = os.getpid()
+        with self._locked():
+            processes = list(self._processes())
+            active = sum(count for _, _, count in processes)
+            if self.max_streams is not None and active >= self.max_streams:
+                active -= self._reap(processes)
+                if active >= self.max_streams:
+                    return False
+            own = [p for p in processes if p[1] == pid]
+            free = [p for p in processes if p[2] <= 0]
+            if not own and not free:
+                self._reap(processes)
+                return False
+            offset, _, count = (own or free)[0]
+            _PROCESS.pack_into(self._map, offset, pid, max(count, 0) + 1)
+            header = self._read()
+            header[6] += 1
+            self._write(header)
+            return True
+
+    def _reap(self, processes) -> int:
+        # drop the streams of processes that exited without closing them
+        reclaimed = 0
+        for offset, pid, count in processes:
+            if count <= 0 or pid == os.getpid():
+                continue
+            try:
+                os.kill(pid, 0)
+            except ProcessLookupError:
+                _PROCESS.pack_into(self._map, offset, 0, 0)
+                reclaimed += count
+            except PermissionError:
+                pass
+        return reclaimed
+
+    def _release_stream(self) -> None:
+        pid = os.getpid()
+        with self._locked():
+            for offset, owner, count in self._processes():
+                if owner == pid and count > 0:
+                    _PROCESS.pack_into(self._map, offset, pid, count - 1)
+                    break
+
+    def _releaser(self) -> Callable[[], None]:
+        released = False
+
+        def release():
+            nonlocal released
+            if not released:
+                released = True
+                self._release_stream()
+
+        return release
+
+    def open_stream(self, endpoint: str) -> Callable[[], None] | None:
+        """Wait for a stream slot, returning the callable that frees it."""
+        if not endpoint_name(endpoint).endswith("stream"):
+            return None
+        while not self._try_open_stream():
+            time.sleep(self.poll_interval)
+        return self._releaser()
+
+    async def aopen_stream(self, endpoint: str) -> Callable[[], None] | None:
+        if not endpoint_name(endpoint).endswith("stream"):
+            return None
+        while not self._try_open_stream():
+            await asyncio.sleep(self.poll_interval)
+        return self._releaser()
+
+    def usage(self) -> SharedUsage:
+        with self._locked():
+            header = self._read()
+            active = sum(max(count, 0) for _, _, count in self._processes())
+        return SharedUsage(
+            rate=header[2] if self.configured_rate is not None else None,
+            requests=header[4],
+            throttled=header[5],
+            active_streams=active,
+            streams_opened=header[6],
+            waited=header[7],
+        )
@@ -0,0 +1,198 @@
+from collections.abc import AsyncGenerator, Callable, Generator
+
+from .ratelimit import endpoint_name
+
+# OpenTelemetry is imported by the first Tracing() only, so clients without
+# tracing never pay for it, installed or not
+_otel = None
+
+
+def _load_otel():
+    global _otel
+    if _otel is None:
+        try:
+            from opentelemetry import propagate, trace
+            from opentelemetry.trace import SpanKind, Status, StatusCode
+        except ImportError:
+            _otel = False
+        else:
+            _otel = (trace, propagate, SpanKind, Status, StatusCode)
+    return _otel or None
+
+
+class _Attempt:
+    """Ends the span of an HTTP attempt with its status or exception."""
+
+    __slots__ = ("tracing", "span", "status")
+
+    def __init__(self, tracing: "Tracing", span):
+        self.tracing = tracing
+        self.span = span
+        self.status = None
+
+    def inject(self, headers: dict) -> dict:
+        """``headers`` plus the trace context of the attempt."""
+        if not self.tracing.propagate:
+            return headers
+        headers = dict(headers)
+        _otel[1].inject(headers, context=_otel[0].set_span_in_context(self.span))
+        return headers
+
+    def __enter__(self) -> "_Attempt":
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb) -> None:
+        span = self.span
+        if self.status is not None:
+            span.set_attribute("http.response.status_code", self.status)
+        if exc_val is not None:
+            self.tracing._fail(span, exc_val)
+        elif self.status is not None and self.status >= 400:
+            span.set_status(_otel[3](_otel[4].ERROR))
+        span.end()
+
+
+class Tracing:
+    """OpenTelemetry spans for a ``Djelia`` or ``DjeliaAsync`` client.
+
+    Pass it as ``tracing=Tracing()``. Service calls (``translate``,
+    ``transcribe``, ``text_to_speech`` and their streaming variants) get a
+    span; each HTTP attempt is a client span below it, so retries show up
+    as siblings, and a streamed body gets a ``djelia.stream.consume`` span until it
+    is closed. Outgoing requests carry the trace context headers of the
+    configured propagator (W3C ``traceparent`` by default). Without the
+    ``opentelemetry-api`` package the client runs untraced.
+    """
+
+    def __init__(self, tracer_provider=None, propagate: bool = True):
+        otel = _load_otel()
+        self.enabled = otel is not None
+        self.propagate = propagate
+        if self.enabled:
+            trace = otel[0]
+            self._tracer = trace.get_tracer("djelia", tracer_provider=tracer_provider)
+
+    def _use(self, span):
+        # failures are recorded once, by the caller
+        return _otel[0].use_span(
+            span,
+            end_on_exit=False,
+            record_exception=False,
+            set_status_on_exception=False,
+        )
+
+    def _fail(self, span, error: BaseException) -> None:
+        span.record_exception(error)
+        span.set_status(_otel[3](_otel[4].ERROR, type(error).__name__))
+
+    # ================================================
+    #                 service calls
+    # ================================================
+
+    def call(self, name: str, func, args, kwargs):
+        span = self._tracer.start_span(name)
+        try:
+            with self._use(span):
+                result = func(*args, **kwargs)
+        except BaseException as e:
+            self._fail(span, e)
+            span.end()
+            raise
+        if isinstance(result, Generator):
+            span.update_name(f"{name}.stream")
+            return self._generator(span, result)
+        span.end()
+        return result
+
+    async def acall(self, name: str, func, args, kwargs):
+        span = self._tracer.start_span(name)
+        try:
+            with self._use(span):
+                result = await func(*args, **kwargs)
+        except BaseException as e:
+            self._fail(span, e)
+            span.end()
+            raise
+        if isinstance(result, AsyncGenerator):
+            span.update_name(f"{name}.stream")
+            return self._agenerator(span, result)
+        span.end()
+        return result
+
+    def _generator(self, span, generator: Generator) -> Generator:
+        # the span is current while the generator runs, not while the
+        # caller handles what it yields
+        try:
+            while True:
+                with self._use(span):
+                    try:
+                        item = next(generator)
+                    except StopIteration:
+                        return
+                yield item
+        except GeneratorExit:
+            raise
+        except BaseException as e:
+            self._fail(span, e)
+            raise
+        finally:
+            with self._use(span):
+                generator.close()
+            span.end()
+
+    async def _agenerator(self, span, generator: AsyncGenerator) -> AsyncGenerator:
+        try:
+            while True:
+                with self._use(span):
+                    try:
+                        item = await generator.__anext__()
+                    except StopAsyncIteration:
+                        return
+                yield item
+        except GeneratorExit:
+            raise
+        except BaseException as e:
+            self._fail(span, e)
+            raise
+        finally:
+            with self._use(span):
+                await generator.aclose()
+            span.end()
+
+    # ================================================
+    #                 HTTP attempts
+    # ================================================
+
+    def attempt(self, method: str, endpoint: str, url: str, number: int):
+        """Client span of one HTTP attempt, as a context manager."""
+        name = endpoint_name(endpoint)
+        span = self._tracer.start_span(
+            f"{method} {name}",
+            kind=_otel[2].CLIENT,
+            attributes={
+                "http.request.method": method,
+                "url.full": url,
+                "djelia.endpoint": name,
+            },
+        )
+        if number > 1:
+            span.set_attribute("http.request.resend_count", number - 1)
+        return _Attempt(self, span)
+
+    def start_stream(self, endpoint: str) -> Callable[[], None]:
+        """Span over the caller reading a streamed body; call the returned
+        function once it is closed.
+        """
+        span = self._tracer.start_span(
+            "djelia.stream.consume",
+            attributes={"djelia.endpoint": endpoint_name(endpoint)},
+        )
+        ended = False
+
+        def end() -> None:
+            nonlocal ended
+            if not ended:
+                ended = True
+                span.end()
+
+        return end
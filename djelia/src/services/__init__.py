@@ -1,3 +1,5 @@
+from .pipeline import (AsyncPipeline, PipelineTimings, SpeechChunk,
+                       SpeechToSpeech, StageTiming)
 from .transcription import AsyncTranscription, Transcription
 from .translation import AsyncTranslation, Translation
 from .tts import TTS, AsyncTTS
@@ -9,4 +11,9 @@ __all__ = [
     "AsyncTranslation",
     "TTS",
     "AsyncTTS",
+    "AsyncPipeline",
+    "SpeechToSpeech",
+    "SpeechChunk",
+    "PipelineTimings",
+    "StageTiming",
 ]
@@ -0,0 +1,272 @@
+import asyncio
+import time
+from collections.abc import AsyncGenerator, AsyncIterator
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, BinaryIO
+
+from djelia.models import (Language, TranscriptionSegment, TranslationRequest,
+                           TTSRequestV2, Versions)
+from djelia.src.audio import AudioPreprocessor, split_text
+
+from .tts import _validate_request
+
+if TYPE_CHECKING:
+    from djelia.src.client.retry import RetryPolicy
+
+# marks the end of a stage's output
+_DONE = object()
+
+
+@dataclass
+class StageTiming:
+    """Where one pipeline stage spent its time, in seconds."""
+
+    items: int = 0
+    # waiting on the API for this stage's own results
+    busy: float = 0.0
+    # waiting for room in the next stage's queue (backpressure)
+    blocked: float = 0.0
+    # since the pipeline started, until the first output / the stage finished
+    first_output: float | None = None
+    finished: float | None = None
+
+
+@dataclass
+class PipelineTimings:
+    transcription: StageTiming = field(default_factory=StageTiming)
+    translation: StageTiming = field(default_factory=StageTiming)
+    synthesis: StageTiming = field(default_factory=StageTiming)
+
+    @property
+    def first_audio(self) -> float | None:
+        """Seconds from the start until the first synthesized audio."""
+        return self.synthesis.first_output
+
+    @property
+    def total(self) -> float | None:
+        return self.synthesis.finished
+
+
+@dataclass
+class SpeechChunk:
+    """A piece of synthesized audio and the speech it was produced from.
+
+    Each segment is synthesized as its own WAV stream, or several when its
+    translation is longer than ``max_chars``: the chunk with ``first`` set
+    starts a stream with its header.
+    """
+
+    index: int
+    segment: TranscriptionSegment
+    translation: str
+    audio: bytes
+    first: bool
+
+
+class _Failed:
+    def __init__(self, error: BaseException):
+        self.error = error
+
+
+class SpeechToSpeech:
+    """A running speech-to-speech pipeline, iterate it for :class:`SpeechChunk`.
+
+    Transcription, translation and synthesis run as separate tasks joined by
+    queues of ``queue_size`` items, so each stage works on the next segment
+    while the following one handles the previous, and a slow consumer holds
+    back every stage instead of letting results pile up. ``timings`` is
+    filled in as the pipeline runs.
+    """
+
+    def __init__(
+        self,
+        client,
+        audio_file: str | BinaryIO,
+        description: str,
+        source: Language,
+        target: Language,
+        chunk_size: float | None,
+        queue_size: int,
+        retry_policy: "RetryPolicy | None",
+        preprocessor: AudioPreprocessor | None,
+        max_chars: int,
+    ):
+        self.client = client
+        self.audio_file = audio_file
+        self.description = description
+        self.source = source
+        self.target = target
+        self.chunk_size = chunk_size
+        self.queue_size = queue_size
+        self.retry_policy = retry_policy
+        self.preprocessor = preprocessor
+        self.max_chars = max_chars
+        self.timings = PipelineTimings()
+        self._chunks = self._run()
+
+    def __aiter__(self) -> AsyncIterator[SpeechChunk]:
+        return self._chunks
+
+    async def aclose(self) -> None:
+        await self._chunks.aclose()
+
+    def _elapsed(self) -> float:
+        return time.perf_counter() - self._started
+
+    async def _emit(self, queue: asyncio.Queue, item, timing: StageTiming) -> None:
+        if timing.first_output is None:
+            timing.first_output = self._elapsed()
+        timing.items += 1
+        start = time.perf_counter()
+        await queue.put(item)
+        timing.blocked += time.perf_counter() - start
+
+    async def _stage(
+        self,
+        work,
+        source: asyncio.Queue | None,
+        output: asyncio.Queue,
+        timing: StageTiming,
+    ):
+        # failures travel down the queues so the consumer raises them;
+        # cancellation, KeyboardInterrupt and SystemExit propagate as they are
+        try:
+            await work(source, output, timing)
+            result = _DONE
+        except Exception as e:
+            result = _Failed(e)
+        timing.finished = self._elapsed()
+        await output.put(result)
+
+    async def _transcribe(self, _, output: asyncio.Queue, timing: StageTiming):
+        segments = await self.client.transcription.transcribe(
+            self.audio_file,
+            stream=True,
+            retry_policy=self.retry_policy,
+            preprocessor=self.preprocessor,
+        )
+        try:
+            while True:
+                start = time.perf_counter()
+                try:
+                    segment = await segments.__anext__()
+                except StopAsyncIteration:
+                    break
+                finally:
+                    timing.busy += time.perf_counter() - start
+                if segment.text.strip():
+                    await self._emit(output, segment, timing)
+        finally:
+            await segments.aclose()
+
+    async def _translate(
+        self, source: asyncio.Queue, output: asyncio.Queue, timing: StageTiming
+    ):
+        while (segment := await source.get()) is not _DONE:
+            if isinstance(segment, _Failed):
+                raise segment.error
+            start = time.perf_counter()
+            response = await self.client.translation.translate(
+                TranslationRequest(
+                    text=segment.text, source=self.source, target=self.target
+                ),
+                retry_policy=self.retry_policy,
+            )
+            timing.busy += time.perf_counter() - start
+            await self._emit(output, (segment, response.text), timing)
+
+    async def _synthesize(
+        self, source: asyncio.Queue, output: asyncio.Queue, timing: StageTiming
+    ):
+        index = 0
+        while (item := await source.get()) is not _DONE:
+            if isinstance(item, _Failed):
+                raise item.error
+            segment, text = item
+            # a translation can outgrow the TTS text limit, speak it in parts
+            for part in split_text(text, self.max_chars):
+                first = True
+                start = time.perf_counter()
+                stream = await self.client.tts.text_to_speech(
+                    TTSRequestV2(
+                        text=part,
+                        description=self.description,
+                        chunk_size=self.chunk_size,
+                    ),
+                    stream=True,
+                    version=Versions.v2,
+                    retry_policy=self.retry_policy,
+                )
+                try:
+                    async for audio in stream:
+                        timing.busy += time.perf_counter() - start
+                        chunk = SpeechChunk(index, segment, text, audio, first)
+                        await self._emit(output, chunk, timing)
+                        first = False
+                        start = time.perf_counter()
+                finally:
+                    await stream.aclose()
+                timing.busy += time.perf_counter() - start
+            index += 1
+
+    async def _run(self) -> AsyncGenerator[SpeechChunk, None]:
+        self._started = time.perf_counter()
+        segments = asyncio.Queue(self.queue_size)
+        translations = asyncio.Queue(self.queue_size)
+        chunks = asyncio.Queue(self.queue_size)
+        stages = [
+            (self._transcribe, None, segments, self.timings.transcription),
+            (self._translate, segments, translations, self.timings.translation),
+            (self._synthesize, translations, chunks, self.timings.synthesis),
+        ]
+        tasks = [asyncio.ensure_future(self._stage(*stage)) for stage in stages]
+        try:
+            while (chunk := await chunks.get()) is not _DONE:
+                if isinstance(chunk, _Failed):
+                    raise chunk.error
+                yield chunk
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+
+class AsyncPipeline:
+    def __init__(self, client):
+        self.client = client
+
+    def speech_to_speech(
+        self,
+        audio_file: str | BinaryIO,
+        description: str,
+        source: Language = Language.BAMBARA,
+        target: Language = Language.FRENCH,
+        chunk_size: float | None = 1.0,
+        queue_size: int = 4,
+        retry_policy: "RetryPolicy | None" = None,
+        preprocessor: AudioPreprocessor | None = None,
+        max_chars: int = 1000,
+    ) -> SpeechToSpeech:
+        """Transcribe, translate and synthesize ``audio_file`` as a pipeline.
+
+        Segments are translated as soon as they are transcribed and spoken
+        as soon as they are translated, so the first audio arrives long
+        before the whole recording has been transcribed. ``description``
+        picks the TTS v2 voice. Translations longer than ``max_chars`` are
+        split at sentence ends and spoken one part after the other.
+        """
+        _validate_request(
+            self.client, TTSRequestV2(text="", description=description), Versions.v2
+        )
+        return SpeechToSpeech(
+            self.client,
+            audio_file,
+            description,
+            source,
+            target,
+            chunk_size,
+            queue_size,
+            retry_policy,
+            preprocessor,
+            max_chars,
+        )
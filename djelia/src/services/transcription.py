@@ -1,175 +1,622 @@
+import asyncio
+import io
 import json
-import os
-from collections.abc import AsyncGenerator, Generator
-from typing import BinaryIO
+from collections.abc import AsyncGenerator, Callable, Generator
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from functools import partial
+from typing import TYPE_CHECKING, BinaryIO
 
 import aiohttp
 
 from djelia.models import (DjeliaRequest, ErrorsMessage,
                            FrenchTranscriptionResponse, Params,
                            TranscriptionSegment, Versions)
+from djelia.src.audio import (AudioPayload, AudioPreprocessor, AudioUpload,
+                              MultipartFileStream, PreprocessedAudio,
+                              TranscriptionProgress, WavWindows,
+                              stitch_segments)
+from djelia.utils.tracing import traced
+
+if TYPE_CHECKING:
+    from djelia.src.client.retry import RetryPolicy
+
+
+def _transcription_result(
+    data, translate_to_french: bool
+) -> list[TranscriptionSegment] | FrenchTranscriptionResponse:
+    return (
+        FrenchTranscriptionResponse(**data)
+        if translate_to_french
+        else [TranscriptionSegment(**segment) for segment in data]
+    )
 
 
 class Transcription:
     def __init__(self, client):
         self.client = client
 
+    def _upload_body(self, audio_file: str | BinaryIO) -> tuple[object, dict]:
+        transport = self.client.transport
+        body = MultipartFileStream(
+            AudioUpload(audio_file, transport.upload_chunk_size, transport.upload_mmap)
+        )
+        # re-iterable: every attempt streams the file again from its start
+        return body, {"Content-Type": body.content_type}
+
+    @traced("djelia.transcribe")
     def transcribe(
         self,
         audio_file: str | BinaryIO,
         translate_to_french: bool | None = False,
         stream: bool | None = False,
         version: Versions | None = Versions.v2,
+        retry_policy: "RetryPolicy | None" = None,
+        preprocessor: AudioPreprocessor | None = None,
     ) -> list[TranscriptionSegment] | FrenchTranscriptionResponse | Generator:
         if not stream:
+            cache = self.client.transcription_cache
+            key = self._cache_key(
+                audio_file, translate_to_french, version, False, preprocessor
+            )
+            if key is not None:
+                cached = cache.get(key)
+                if cached is not None:
+                    return cached
+
+            prepared = self._preprocess(audio_file, preprocessor)
             try:
-                params = {Params.translate_to_french: str(translate_to_french).lower()}
-                if isinstance(audio_file, str):
-                    with open(audio_file, "rb") as f:
-                        files = {Params.file: f}
-                        response = self.client._make_request(
-                            method=DjeliaRequest.transcribe.method,
-                            endpoint=DjeliaRequest.transcribe.endpoint.format(
-                                version.value
-                            ),
-                            files=files,
-                            params=params,
+                result = self._transcribe(
+                    prepared.path if prepared else audio_file,
+                    translate_to_french,
+                    version,
+                    retry_policy,
+                )
+                if prepared is not None:
+                    result = prepared.restore_times(result)
+            finally:
+                if prepared is not None:
+                    prepared.cleanup()
+
+            if key is not None:
+                cache.set(key, result)
+            return result
+
+        else:
+            return self._stream_transcribe(
+                audio_file, translate_to_french, version, retry_policy, preprocessor
+            )
+
+    def _cache_key(
+        self,
+        audio_file: str | BinaryIO,
+        translate_to_french: bool,
+        version: Versions,
+        stream: bool,
+        preprocessor: AudioPreprocessor | None,
+    ) -> str | None:
+        cache = self.client.transcription_cache
+        if cache is None:
+            return None
+        try:
+            return cache.key(
+                audio_file,
+                translate_to_french,
+                version,
+                stream,
+                preprocessor.fingerprint if preprocessor else "",
+            )
+        except OSError as e:
+            raise OSError(ErrorsMessage.ioerror_read.format(str(e)))
+
+    @staticmethod
+    def _preprocess(
+        audio_file: str | BinaryIO,
+        preprocessor: AudioPreprocessor | None,
+        format: str | None = None,
+    ) -> PreprocessedAudio | None:
+        if preprocessor is None:
+            return None
+        try:
+            return preprocessor.process(audio_file, format)
+        except OSError as e:
+            raise OSError(ErrorsMessage.ioerror_read.format(str(e)))
+
+    def _transcribe(
+        self,
+        audio_file: str | BinaryIO,
+        translate_to_french: bool = False,
+        version: Versions | None = Versions.v2,
+        retry_policy: "RetryPolicy | None" = None,
+    ) -> list[TranscriptionSegment] | FrenchTranscriptionResponse:
+        try:
+            data, headers = self._upload_body(audio_file)
+        except OSError as e:
+            raise OSError(ErrorsMessage.ioerror_read.format(str(e)))
+
+        params = {Params.translate_to_french: str(translate_to_french).lower()}
+        return self.client._make_request(
+            method=DjeliaRequest.transcribe.method,
+            endpoint=DjeliaRequest.transcribe.endpoint.format(version.value),
+            data=data,
+            headers=headers,
+            params=params,
+            retry_policy=retry_policy,
+            parse=partial(
+                _transcription_result, translate_to_french=translate_to_french
+            ),
+        )
+
+    def transcribe_long(
+        self,
+        audio_file: str | BinaryIO,
+        window_seconds: float = 30.0,
+        overlap_seconds: float = 2.0,
+        concurrency: int = 4,
+        version: Versions | None = Versions.v2,
+        progress: Callable[[TranscriptionProgress], None] | None = None,
+        retry_policy: "RetryPolicy | None" = None,
+        preprocessor: AudioPreprocessor | None = None,
+    ) -> list[TranscriptionSegment]:
+        """Transcribe a long PCM WAV recording as overlapping windows in parallel.
+
+        Windows are cut at the quietest point near their nominal end, sent
+        ``concurrency`` at a time and stitched back into segments timed on
+        the original file. ``progress`` is called as each window finishes.
+        With a ``preprocessor`` any format it can decode is accepted.
+        """
+        prepared = self._preprocess(audio_file, preprocessor, "wav")
+        try:
+            segments = self._transcribe_windows(
+                prepared.path if prepared else audio_file,
+                window_seconds,
+                overlap_seconds,
+                concurrency,
+                version,
+                progress,
+                retry_policy,
+            )
+            return prepared.restore_times(segments) if prepared else segments
+        finally:
+            if prepared is not None:
+                prepared.cleanup()
+
+    def _transcribe_windows(
+        self,
+        audio_file: str | BinaryIO,
+        window_seconds: float,
+        overlap_seconds: float,
+        concurrency: int,
+        version: Versions,
+        progress: Callable[[TranscriptionProgress], None] | None,
+        retry_policy: "RetryPolicy | None",
+    ) -> list[TranscriptionSegment]:
+        try:
+            windows = WavWindows(audio_file, window_seconds, overlap_seconds)
+            total = len(windows)
+        except OSError as e:
+            raise OSError(ErrorsMessage.ioerror_read.format(str(e)))
+
+        results = []
+        inflight = {}
+        executor = ThreadPoolExecutor(max_workers=concurrency)
+        try:
+            for window in windows:
+                while len(inflight) >= concurrency * 2:
+                    done, _ = wait(inflight, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        results.append(
+                            self._window_result(inflight.pop(future), future)
                         )
-                else:
-                    files = {Params.file: audio_file}
-                    response = self.client._make_request(
-                        method=DjeliaRequest.transcribe.method,
-                        endpoint=DjeliaRequest.transcribe.endpoint.format(
-                            version.value
-                        ),
-                        files=files,
-                        params=params,
+                        self._report(progress, results, total)
+                inflight[
+                    executor.submit(
+                        self._transcribe,
+                        io.BytesIO(window.data),
+                        version=version,
+                        retry_policy=retry_policy,
                     )
+                ] = window
+            while inflight:
+                done, _ = wait(inflight, return_when=FIRST_COMPLETED)
+                for future in done:
+                    results.append(self._window_result(inflight.pop(future), future))
+                    self._report(progress, results, total)
+        finally:
+            executor.shutdown(wait=False, cancel_futures=True)
+        return stitch_segments(results)
 
-            except OSError as e:
-                raise OSError(ErrorsMessage.ioerror_read.format(str(e)))
+    @staticmethod
+    def _window_result(window, future):
+        # windows are only useful together, one failure fails the whole file
+        return window, future.result()
 
-            data = response.json()
-            return (
-                FrenchTranscriptionResponse(**data)
-                if translate_to_french
-                else [TranscriptionSegment(**segment) for segment in data]
+    @staticmethod
+    def _report(progress, results: list, total: int) -> None:
+        if progress is not None:
+            window = results[-1][0]
+            progress(
+                TranscriptionProgress(
+                    window=window.index,
+                    windows=total,
+                    completed=len(results),
+                    start=window.start,
+                    end=window.end,
+                )
             )
 
-        else:
-            return self._stream_transcribe(audio_file, translate_to_french, version)
-
     def _stream_transcribe(
         self,
         audio_file: str | BinaryIO,
         translate_to_french: bool = False,
         version: Versions | None = Versions.v2,
+        retry_policy: "RetryPolicy | None" = None,
+        preprocessor: AudioPreprocessor | None = None,
     ) -> Generator[TranscriptionSegment | FrenchTranscriptionResponse, None, None]:
+        cache = self.client.transcription_cache
+        key = self._cache_key(
+            audio_file, translate_to_french, version, True, preprocessor
+        )
+        if key is not None:
+            cached = cache.get(key)
+            if cached is not None:
+                yield from cached
+                return
+
+        segments = []
+        prepared = self._preprocess(audio_file, preprocessor)
         try:
-            params = {Params.translate_to_french: str(translate_to_french).lower()}
-            if isinstance(audio_file, str):
-                with open(audio_file, "rb") as f:
-                    files = {Params.file: f}
-                    response = self.client._make_request(
-                        method=DjeliaRequest.transcribe.method,
-                        endpoint=DjeliaRequest.transcribe.endpoint.format(
-                            version.value
-                        ),
-                        files=files,
-                        params=params,
-                    )
-            else:
-                files = {Params.file: audio_file}
-                response = self.client._make_request(
-                    method=DjeliaRequest.transcribe_stream.method,
-                    endpoint=DjeliaRequest.transcribe.endpoint.format(version.value),
-                    files=files,
-                    params=params,
-                )
+            for segment in self._stream_segments(
+                prepared.path if prepared else audio_file,
+                translate_to_french,
+                version,
+                retry_policy,
+            ):
+                if prepared is not None:
+                    segment = prepared.restore_times(segment)
+                if key is not None:
+                    segments.append(segment)
+                yield segment
+        finally:
+            if prepared is not None:
+                prepared.cleanup()
+
+        # only complete transcripts are cached
+        if key is not None:
+            cache.set(key, segments)
 
+    def _stream_segments(
+        self,
+        audio_file: str | BinaryIO,
+        translate_to_french: bool,
+        version: Versions,
+        retry_policy: "RetryPolicy | None",
+    ) -> Generator[TranscriptionSegment | FrenchTranscriptionResponse, None, None]:
+        try:
+            data, headers = self._upload_body(audio_file)
         except OSError as e:
             raise OSError(ErrorsMessage.ioerror_read.format(str(e)))
 
-        for line in response.iter_lines():
-            if line:
-                try:
-                    data = json.loads(line.decode("utf-8"))
-                    if isinstance(data, list):
-                        for segment in data:
-                            yield (
-                                FrenchTranscriptionResponse(**segment)
-                                if translate_to_french
-                                else TranscriptionSegment(**segment)
-                            )
-                    else:
-                        yield (
-                            FrenchTranscriptionResponse(**data)
-                            if translate_to_french
-                            else TranscriptionSegment(**data)
-                        )
-                except json.JSONDecodeError:
-                    continue
+        params = {Params.translate_to_french: str(translate_to_french).lower()}
+        response = self.client._make_request(
+            method=DjeliaRequest.transcribe_stream.method,
+            endpoint=DjeliaRequest.transcribe_stream.endpoint.format(version.value),
+            data=data,
+            headers=headers,
+            params=params,
+            stream=True,
+            retry_policy=retry_policy,
+        )
+
+        try:
+            # split NDJSON as bytes arrive instead of after the whole body
+            buffer = b""
+            for chunk in self._iter_body(response):
+                buffer += chunk
+                *lines, buffer = buffer.split(b"\n")
+                for line in lines:
+                    yield from self._parse_line(line, translate_to_french)
+            yield from self._parse_line(buffer, translate_to_french)
+        finally:
+            response.close()
+
+    @staticmethod
+    def _iter_body(response, chunk_size: int = 8192) -> Generator[bytes, None, None]:
+        raw = response.raw
+        if not getattr(raw, "chunked", True) and hasattr(raw, "read1"):
+            # read(amt) would block until amt bytes arrive, read1 returns
+            # whatever the socket has
+            while chunk := raw.read1(chunk_size, decode_content=True):
+                yield chunk
+        else:
+            # chunked bodies are yielded chunk by chunk as they arrive
+            yield from response.iter_content(chunk_size=None)
+
+    @staticmethod
+    def _parse_line(
+        line: bytes, translate_to_french: bool
+    ) -> Generator[TranscriptionSegment | FrenchTranscriptionResponse, None, None]:
+        line = line.strip()
+        if not line:
+            return
+        try:
+            data = json.loads(line.decode("utf-8"))
+        except json.JSONDecodeError:
+            return
+        for segment in data if isinstance(data, list) else [data]:
+            yield (
+                FrenchTranscriptionResponse(**segment)
+                if translate_to_french
+                else TranscriptionSegment(**segment)
+            )
 
 
 class AsyncTranscription:
     def __init__(self, client):
         self.client = client
 
+    async def _form_factory(
+        self, audio_file: str | BinaryIO
+    ) -> Callable[[], aiohttp.FormData]:
+        # a FormData can only be sent once, the client rebuilds it per attempt
+        transport = self.client.transport
+        executor = self.client.io_executor
+        # sizing the upload stats or seeks the file, keep that off the loop too
+        upload = await self.client._run_io(
+            AudioUpload, audio_file, transport.upload_chunk_size, transport.upload_mmap
+        )
+
+        def build() -> aiohttp.FormData:
+            data = aiohttp.FormData()
+            data.add_field(
+                Params.file,
+                AudioPayload(upload, executor=executor),
+                filename=upload.filename,
+            )
+            return data
+
+        return build
+
+    @traced("djelia.transcribe")
     async def transcribe(
         self,
         audio_file: str | BinaryIO,
         translate_to_french: bool | None = False,
         stream: bool | None = False,
         version: Versions | None = Versions.v2,
+        retry_policy: "RetryPolicy | None" = None,
+        preprocessor: AudioPreprocessor | None = None,
     ) -> list[TranscriptionSegment] | FrenchTranscriptionResponse | AsyncGenerator:
         if not stream:
-            try:
-                data = aiohttp.FormData()
-                if isinstance(audio_file, str):
-                    with open(audio_file, "rb") as f:
-                        data.add_field(
-                            Params.file, f.read(), filename=os.path.basename(audio_file)
-                        )
-                else:
-                    data.add_field(
-                        Params.file, audio_file.read(), filename=Params.filename
-                    )
+            cache = self.client.transcription_cache
+            key = await self._cache_key(
+                audio_file, translate_to_french, version, False, preprocessor
+            )
+            if key is not None:
+                cached = await self.client._run_io(cache.get, key)
+                if cached is not None:
+                    return cached
 
-                params = {Params.translate_to_french: str(translate_to_french).lower()}
-                response_data = await self.client._make_request(
-                    method=DjeliaRequest.transcribe.method,
-                    endpoint=DjeliaRequest.transcribe.endpoint.format(version.value),
-                    data=data,
-                    params=params,
+            prepared = await self._preprocess(audio_file, preprocessor)
+            try:
+                result = await self._transcribe(
+                    prepared.path if prepared else audio_file,
+                    translate_to_french,
+                    version,
+                    retry_policy,
                 )
+                if prepared is not None:
+                    result = prepared.restore_times(result)
+            finally:
+                if prepared is not None:
+                    await self.client._run_io(prepared.cleanup)
 
-            except OSError as e:
-                raise OSError(ErrorsMessage.ioerror_read.format(str(e)))
+            if key is not None:
+                await self.client._run_io(cache.set, key, result)
+            return result
 
-            return (
-                FrenchTranscriptionResponse(**response_data)
-                if translate_to_french
-                else [TranscriptionSegment(**segment) for segment in response_data]
+        else:
+            return self._stream_transcribe(
+                audio_file, translate_to_french, version, retry_policy, preprocessor
             )
 
-        else:
-            return self._stream_transcribe(audio_file, translate_to_french, version)
+    async def _cache_key(
+        self,
+        audio_file: str | BinaryIO,
+        translate_to_french: bool,
+        version: Versions,
+        stream: bool,
+        preprocessor: AudioPreprocessor | None,
+    ) -> str | None:
+        cache = self.client.transcription_cache
+        if cache is None:
+            return None
+        try:
+            # hashing reads the whole file, keep it off the event loop
+            return await self.client._run_io(
+                cache.key,
+                audio_file,
+                translate_to_french,
+                version,
+                stream,
+                preprocessor.fingerprint if preprocessor else "",
+            )
+        except OSError as e:
+            raise OSError(ErrorsMessage.ioerror_read.format(str(e)))
+
+    async def _preprocess(
+        self,
+        audio_file: str | BinaryIO,
+        preprocessor: AudioPreprocessor | None,
+        format: str | None = None,
+    ) -> PreprocessedAudio | None:
+        if preprocessor is None:
+            return None
+        try:
+            return await preprocessor.aprocess(
+                audio_file, format, io_executor=self.client.io_executor
+            )
+        except OSError as e:
+            raise OSError(ErrorsMessage.ioerror_read.format(str(e)))
+
+    async def _transcribe(
+        self,
+        audio_file: str | BinaryIO,
+        translate_to_french: bool = False,
+        version: Versions | None = Versions.v2,
+        retry_policy: "RetryPolicy | None" = None,
+    ) -> list[TranscriptionSegment] | FrenchTranscriptionResponse:
+        try:
+            data = await self._form_factory(audio_file)
+
+            params = {Params.translate_to_french: str(translate_to_french).lower()}
+            return await self.client._make_request(
+                method=DjeliaRequest.transcribe.method,
+                endpoint=DjeliaRequest.transcribe.endpoint.format(version.value),
+                data=data,
+                params=params,
+                retry_policy=retry_policy,
+                parse=partial(
+                    _transcription_result, translate_to_french=translate_to_french
+                ),
+            )
+
+        except OSError as e:
+            raise OSError(ErrorsMessage.ioerror_read.format(str(e)))
+
+    async def transcribe_long(
+        self,
+        audio_file: str | BinaryIO,
+        window_seconds: float = 30.0,
+        overlap_seconds: float = 2.0,
+        concurrency: int = 4,
+        version: Versions | None = Versions.v2,
+        progress: Callable[[TranscriptionProgress], None] | None = None,
+        retry_policy: "RetryPolicy | None" = None,
+        preprocessor: AudioPreprocessor | None = None,
+    ) -> list[TranscriptionSegment]:
+        """Transcribe a long PCM WAV recording as overlapping windows in parallel.
+
+        Windows are cut at the quietest point near their nominal end, sent
+        ``concurrency`` at a time and stitched back into segments timed on
+        the original file. ``progress`` is called as each window finishes.
+        With a ``preprocessor`` any format it can decode is accepted.
+        """
+        prepared = await self._preprocess(audio_file, preprocessor, "wav")
+        try:
+            segments = await self._transcribe_windows(
+                prepared.path if prepared else audio_file,
+                window_seconds,
+                overlap_seconds,
+                concurrency,
+                version,
+                progress,
+                retry_policy,
+            )
+            return prepared.restore_times(segments) if prepared else segments
+        finally:
+            if prepared is not None:
+                await self.client._run_io(prepared.cleanup)
+
+    async def _transcribe_windows(
+        self,
+        audio_file: str | BinaryIO,
+        window_seconds: float,
+        overlap_seconds: float,
+        concurrency: int,
+        version: Versions,
+        progress: Callable[[TranscriptionProgress], None] | None,
+        retry_policy: "RetryPolicy | None",
+    ) -> list[TranscriptionSegment]:
+        try:
+            windows = await self.client._run_io(
+                WavWindows, audio_file, window_seconds, overlap_seconds
+            )
+            total = await self.client._run_io(len, windows)
+        except OSError as e:
+            raise OSError(ErrorsMessage.ioerror_read.format(str(e)))
+
+        results = []
+        inflight = {}
+        source = iter(windows)
+
+        async def collect() -> None:
+            done, _ = await asyncio.wait(inflight, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                results.append((inflight.pop(task), task.result()))
+                Transcription._report(progress, results, total)
+
+        try:
+            # windows are read on the I/O executor as slots free up
+            while window := await self.client._run_io(next, source, None):
+                while len(inflight) >= concurrency:
+                    await collect()
+                task = asyncio.ensure_future(
+                    self._transcribe(
+                        io.BytesIO(window.data),
+                        version=version,
+                        retry_policy=retry_policy,
+                    )
+                )
+                inflight[task] = window
+            while inflight:
+                await collect()
+        finally:
+            for task in inflight:
+                if task.done() and not task.cancelled():
+                    task.exception()  # mark failures as retrieved
+                task.cancel()
+        return stitch_segments(results)
 
     async def _stream_transcribe(
         self,
         audio_file: str | BinaryIO,
         translate_to_french: bool = False,
         version: Versions | None = Versions.v2,
+        retry_policy: "RetryPolicy | None" = None,
+        preprocessor: AudioPreprocessor | None = None,
     ) -> AsyncGenerator[TranscriptionSegment | FrenchTranscriptionResponse, None]:
+        cache = self.client.transcription_cache
+        key = await self._cache_key(
+            audio_file, translate_to_french, version, True, preprocessor
+        )
+        if key is not None:
+            cached = await self.client._run_io(cache.get, key)
+            if cached is not None:
+                for segment in cached:
+                    yield segment
+                return
+
+        segments = []
+        prepared = await self._preprocess(audio_file, preprocessor)
         try:
-            data = aiohttp.FormData()
-            if isinstance(audio_file, str):
-                with open(audio_file, "rb") as f:
-                    data.add_field(
-                        Params.file, f.read(), filename=os.path.basename(audio_file)
-                    )
-            else:
-                data.add_field(Params.file, audio_file.read(), filename=Params.filename)
+            async for segment in self._stream_segments(
+                prepared.path if prepared else audio_file,
+                translate_to_french,
+                version,
+                retry_policy,
+            ):
+                if prepared is not None:
+                    segment = prepared.restore_times(segment)
+                if key is not None:
+                    segments.append(segment)
+                yield segment
+        finally:
+            if prepared is not None:
+                await self.client._run_io(prepared.cleanup)
+
+        # only complete transcripts are cached
+        if key is not None:
+            await self.client._run_io(cache.set, key, segments)
+
+    async def _stream_segments(
+        self,
+        audio_file: str | BinaryIO,
+        translate_to_french: bool,
+        version: Versions,
+        retry_policy: "RetryPolicy | None",
+    ) -> AsyncGenerator[TranscriptionSegment | FrenchTranscriptionResponse, None]:
+        try:
+            data = await self._form_factory(audio_file)
 
             params = {Params.translate_to_french: str(translate_to_french).lower()}
             response = await self.client._make_streaming_request(
@@ -177,6 +624,7 @@ class AsyncTranscription:
                 endpoint=DjeliaRequest.transcribe_stream.endpoint.format(version.value),
                 data=data,
                 params=params,
+                retry_policy=retry_policy,
             )
         except OSError as e:
             raise OSError(ErrorsMessage.ioerror_read.format(str(e)))
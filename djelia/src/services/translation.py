@@ -1,54 +1,419 @@
-from djelia.models import (DjeliaRequest, SupportedLanguageSchema,
-                           TranslationRequest, TranslationResponse, Versions)
+import asyncio
+from collections import deque
+from collections.abc import AsyncGenerator, AsyncIterable, Generator, Iterable
+from concurrent.futures import ThreadPoolExecutor
+from typing import TYPE_CHECKING
+
+from djelia.models import (DjeliaRequest, Language, SupportedLanguageSchema,
+                           TranscriptionSegment, TranslationRequest,
+                           TranslationResponse, Versions)
+from djelia.utils.tracing import traced
+
+if TYPE_CHECKING:
+    from djelia.src.client.retry import RetryPolicy
+
+# packed segments are sent one per line, translation keeps line breaks so
+# the result splits back onto the segments it came from
+_SEGMENT_SEPARATOR = "\n"
+
+
+def _segment_text(segment: TranscriptionSegment) -> str:
+    return " ".join(segment.text.split())
+
+
+class _SegmentPacker:
+    """Groups consecutive segments into packs of at most ``max_chars``."""
+
+    def __init__(self, max_chars: int):
+        self.max_chars = max_chars
+        self.pack = []
+        self.size = 0
+
+    def add(self, segment: TranscriptionSegment) -> list | None:
+        """Add ``segment``, returning the previous pack once it is full."""
+        length = len(_segment_text(segment)) + len(_SEGMENT_SEPARATOR)
+        full = None
+        if self.pack and self.size + length > self.max_chars:
+            full, self.pack, self.size = self.pack, [], 0
+        self.pack.append(segment)
+        self.size += length
+        return full
+
+    def flush(self) -> list | None:
+        pack, self.pack, self.size = self.pack, [], 0
+        return pack or None
+
+
+def _unpack(
+    pack: list[TranscriptionSegment], translated: list[str]
+) -> list[TranscriptionSegment]:
+    # empty segments were not sent, they stay empty
+    texts = iter(translated)
+    return [
+        TranscriptionSegment(
+            text=next(texts).strip() if _segment_text(segment) else "",
+            start=segment.start,
+            end=segment.end,
+        )
+        for segment in pack
+    ]
+
+
+def _translation_response(data: dict) -> TranslationResponse:
+    return TranslationResponse(**data)
 
 
 class Translation:
     def __init__(self, client):
         self.client = client
 
-    def get_supported_languages(self) -> list[SupportedLanguageSchema]:
+    def get_supported_languages(
+        self, retry_policy: "RetryPolicy | None" = None, refresh: bool = False
+    ) -> list[SupportedLanguageSchema]:
+        catalog = self.client.language_catalog
+        languages = None if refresh else catalog.get()
+        if languages is not None:
+            return languages
+
         response = self.client._make_request(
             method=DjeliaRequest.get_supported_languages.method,
             endpoint=DjeliaRequest.get_supported_languages.endpoint.format(
                 Versions.v1.value
             ),
+            headers=catalog.request_headers(),
+            retry_policy=retry_policy,
+        )
+        return catalog.update(
+            response.status_code,
+            None if response.status_code == 304 else response.json(),
+            response.headers.get("ETag"),
         )
-        return [SupportedLanguageSchema(**lang) for lang in response.json()]
 
+    @traced("djelia.translate")
     def translate(
         self,
         request: TranslationRequest,
-        version: Versions | None = Versions.v1.value,
+        version: Versions | None = Versions.v1,
+        retry_policy: "RetryPolicy | None" = None,
+    ) -> TranslationResponse:
+        self.client.language_catalog.validate(request)
+        cache = self.client.translation_cache
+        if cache is not None:
+            return cache.get_or_fetch(
+                request,
+                version,
+                lambda: self._translate(request, version, retry_policy),
+            )
+        return self._translate(request, version, retry_policy)
+
+    def _translate(
+        self,
+        request: TranslationRequest,
+        version: Versions,
+        retry_policy: "RetryPolicy | None" = None,
     ) -> TranslationResponse:
         data = request.dict()
-        response = self.client._make_request(
+        return self.client._make_request(
             method=DjeliaRequest.translate.method,
             endpoint=DjeliaRequest.translate.endpoint.format(version.value),
             json=data,
+            retry_policy=retry_policy,
+            parse=_translation_response,
         )
-        return TranslationResponse(**response.json())
+
+    def translate_many(
+        self,
+        requests: Iterable[TranslationRequest],
+        version: Versions | None = Versions.v1,
+        concurrency: int = 8,
+        return_exceptions: bool = False,
+    ) -> Generator[TranslationResponse | Exception, None, None]:
+        """Translate ``requests`` on a thread pool, yielding results in input order.
+
+        Each result is yielded as soon as it and every earlier one are done.
+        With ``return_exceptions`` a failed item yields its exception instead
+        of stopping the batch.
+        """
+        # bound in-flight work so huge corpora are not submitted all at once
+        window = concurrency * 4
+        pending = deque()
+        executor = ThreadPoolExecutor(max_workers=concurrency)
+        try:
+            for request in requests:
+                pending.append(executor.submit(self.translate, request, version))
+                if len(pending) >= window:
+                    yield self._batch_result(pending.popleft(), return_exceptions)
+            while pending:
+                yield self._batch_result(pending.popleft(), return_exceptions)
+        finally:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def translate_segments(
+        self,
+        segments: Iterable[TranscriptionSegment],
+        source: Language,
+        target: Language,
+        version: Versions | None = Versions.v1,
+        max_chars: int = 1000,
+        concurrency: int = 8,
+    ) -> Generator[TranscriptionSegment, None, None]:
+        """Translate transcription segments, packing several per request.
+
+        Consecutive segments are joined one per line into requests of at
+        most ``max_chars`` characters, translated ``concurrency`` at a time
+        and split back, yielding a translated copy of each segment (same
+        ``start``/``end``) in order. ``segments`` may be a live stream. A
+        pack whose line breaks do not survive translation is retried one
+        segment per request.
+        """
+        window = concurrency * 4
+        pending = deque()
+        packer = _SegmentPacker(max_chars)
+        executor = ThreadPoolExecutor(max_workers=concurrency)
+
+        def submit(pack):
+            pending.append(
+                executor.submit(self._translate_pack, pack, source, target, version)
+            )
+
+        try:
+            for segment in segments:
+                pack = packer.add(segment)
+                if pack is not None:
+                    submit(pack)
+                    if len(pending) >= window:
+                        yield from pending.popleft().result()
+            pack = packer.flush()
+            if pack is not None:
+                submit(pack)
+            while pending:
+                yield from pending.popleft().result()
+        finally:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def _translate_pack(
+        self,
+        pack: list[TranscriptionSegment],
+        source: Language,
+        target: Language,
+        version: Versions,
+    ) -> list[TranscriptionSegment]:
+        texts = [text for text in map(_segment_text, pack) if text]
+        if not texts:
+            return _unpack(pack, [])
+        response = self.translate(
+            TranslationRequest(
+                text=_SEGMENT_SEPARATOR.join(texts), source=source, target=target
+            ),
+            version,
+        )
+        translated = (
+            response.text.split(_SEGMENT_SEPARATOR)
+            if len(texts) > 1
+            else [response.text]
+        )
+        if len(translated) != len(texts):
+            translated = [
+                self.translate(
+                    TranslationRequest(text=text, source=source, target=target),
+                    version,
+                ).text
+                for text in texts
+            ]
+        return _unpack(pack, translated)
+
+    @staticmethod
+    def _batch_result(future, return_exceptions: bool):
+        try:
+            return future.result()
+        except Exception as e:
+            if not return_exceptions:
+                raise
+            return e
 
 
 class AsyncTranslation:
     def __init__(self, client):
         self.client = client
 
-    async def get_supported_languages(self) -> list[SupportedLanguageSchema]:
-        data = await self.client._make_request(
+    async def get_supported_languages(
+        self, retry_policy: "RetryPolicy | None" = None, refresh: bool = False
+    ) -> list[SupportedLanguageSchema]:
+        catalog = self.client.language_catalog
+        languages = None if refresh else catalog.get()
+        if languages is not None:
+            return languages
+
+        # the response is needed for the status and ETag
+        data, response = await self.client._make_request(
             method=DjeliaRequest.get_supported_languages.method,
             endpoint=DjeliaRequest.get_supported_languages.endpoint.format(
                 Versions.v1.value
             ),
+            headers=catalog.request_headers(),
+            retry_policy=retry_policy,
+            with_response=True,
+        )
+        return catalog.update(
+            response.status,
+            None if response.status == 304 else data,
+            response.headers.get("ETag"),
         )
-        return [SupportedLanguageSchema(**lang) for lang in data]
 
+    @traced("djelia.translate")
     async def translate(
-        self, request: TranslationRequest, version: Versions | None = Versions.v1
+        self,
+        request: TranslationRequest,
+        version: Versions | None = Versions.v1,
+        retry_policy: "RetryPolicy | None" = None,
+    ) -> TranslationResponse:
+        self.client.language_catalog.validate(request)
+        cache = self.client.translation_cache
+        if cache is not None:
+            return await cache.aget_or_fetch(
+                request,
+                version,
+                lambda: self._translate(request, version, retry_policy),
+                executor=self.client.io_executor,
+            )
+        return await self._translate(request, version, retry_policy)
+
+    async def _translate(
+        self,
+        request: TranslationRequest,
+        version: Versions,
+        retry_policy: "RetryPolicy | None" = None,
     ) -> TranslationResponse:
         request_data = request.dict()
-        data = await self.client._make_request(
+        return await self.client._make_request(
             method=DjeliaRequest.translate.method,
             endpoint=DjeliaRequest.translate.endpoint.format(version.value),
             json=request_data,
+            retry_policy=retry_policy,
+            parse=_translation_response,
         )
-        return TranslationResponse(**data)
+
+    async def translate_many(
+        self,
+        requests: Iterable[TranslationRequest],
+        version: Versions | None = Versions.v1,
+        concurrency: int = 8,
+        return_exceptions: bool = False,
+    ) -> AsyncGenerator[TranslationResponse | Exception, None]:
+        """Translate ``requests`` with at most ``concurrency`` calls in flight,
+        yielding results in input order.
+
+        Each result is yielded as soon as it and every earlier one are done.
+        With ``return_exceptions`` a failed item yields its exception instead
+        of stopping the batch.
+        """
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def run(request: TranslationRequest) -> TranslationResponse:
+            async with semaphore:
+                return await self.translate(request, version)
+
+        # bound in-flight tasks so huge corpora are not scheduled all at once
+        window = concurrency * 4
+        pending = deque()
+        try:
+            for request in requests:
+                pending.append(asyncio.ensure_future(run(request)))
+                if len(pending) >= window:
+                    yield await self._batch_result(pending.popleft(), return_exceptions)
+            while pending:
+                yield await self._batch_result(pending.popleft(), return_exceptions)
+        finally:
+            for task in pending:
+                if task.done() and not task.cancelled():
+                    task.exception()  # mark failures as retrieved
+                task.cancel()
+
+    async def translate_segments(
+        self,
+        segments: Iterable[TranscriptionSegment] | AsyncIterable[TranscriptionSegment],
+        source: Language,
+        target: Language,
+        version: Versions | None = Versions.v1,
+        max_chars: int = 1000,
+        concurrency: int = 8,
+    ) -> AsyncGenerator[TranscriptionSegment, None]:
+        """Async variant of :meth:`Translation.translate_segments`, ``segments``
+        may also be an async stream such as a streaming transcription.
+        """
+        # bounds requests, not packs: a pack's one-per-segment fallback takes
+        # a slot per request
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def run(pack) -> list[TranscriptionSegment]:
+            return await self._translate_pack(pack, source, target, version, semaphore)
+
+        window = concurrency * 4
+        pending = deque()
+        packer = _SegmentPacker(max_chars)
+        try:
+            async for segment in self._aiter(segments):
+                pack = packer.add(segment)
+                if pack is not None:
+                    pending.append(asyncio.ensure_future(run(pack)))
+                    if len(pending) >= window:
+                        for translated in await pending.popleft():
+                            yield translated
+            pack = packer.flush()
+            if pack is not None:
+                pending.append(asyncio.ensure_future(run(pack)))
+            while pending:
+                for translated in await pending.popleft():
+                    yield translated
+        finally:
+            for task in pending:
+                if task.done() and not task.cancelled():
+                    task.exception()  # mark failures as retrieved
+                task.cancel()
+
+    @staticmethod
+    async def _aiter(segments):
+        if isinstance(segments, AsyncIterable):
+            async for segment in segments:
+                yield segment
+        else:
+            for segment in segments:
+                yield segment
+
+    async def _translate_pack(
+        self,
+        pack: list[TranscriptionSegment],
+        source: Language,
+        target: Language,
+        version: Versions,
+        semaphore: asyncio.Semaphore,
+    ) -> list[TranscriptionSegment]:
+        async def translate(text: str) -> TranslationResponse:
+            async with semaphore:
+                return await self.translate(
+                    TranslationRequest(text=text, source=source, target=target),
+                    version,
+                )
+
+        texts = [text for text in map(_segment_text, pack) if text]
+        if not texts:
+            return _unpack(pack, [])
+        response = await translate(_SEGMENT_SEPARATOR.join(texts))
+        translated = (
+            response.text.split(_SEGMENT_SEPARATOR)
+            if len(texts) > 1
+            else [response.text]
+        )
+        if len(translated) != len(texts):
+            responses = await asyncio.gather(*(translate(text) for text in texts))
+            translated = [response.text for response in responses]
+        return _unpack(pack, translated)
+
+    @staticmethod
+    async def _batch_result(task: asyncio.Future, return_exceptions: bool):
+        try:
+            return await task
+        except Exception as e:
+            if not return_exceptions:
+                raise
+            return e
@@ -1,179 +1,450 @@
+import asyncio
+from collections import deque
 from collections.abc import AsyncGenerator, Generator
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from typing import TYPE_CHECKING, BinaryIO
 
 # from djelia.config.settings import VALID_SPEAKER_IDS, VALID_TTS_V2_SPEAKERS
 from djelia.models import (DjeliaRequest, ErrorsMessage, TTSRequest,
                            TTSRequestV2, Versions)
+from djelia.src.audio import AudioSink, WavJoiner, as_sink, split_text
 from djelia.utils.exceptions import SpeakerError
+from djelia.utils.tracing import traced
+
+if TYPE_CHECKING:
+    from djelia.src.client.retry import RetryPolicy
+
+
+def _validate_request(client, request: TTSRequest | TTSRequestV2, version: Versions):
+    if version == Versions.v1:
+        if not isinstance(request, TTSRequest):
+            raise ValueError(ErrorsMessage.tts_v1_request_error)
+        speakers = client.speaker_catalog
+        if not speakers.has_speaker_id(request.speaker):
+            raise SpeakerError(
+                ErrorsMessage.speaker_id_error.format(
+                    list(speakers.speaker_ids), request.speaker
+                )
+            )
+    else:
+        if not isinstance(request, TTSRequestV2):
+            raise ValueError(ErrorsMessage.tts_v2_request_error)
+        speakers = client.speaker_catalog
+        if speakers.find_v2_speaker(request.description) is None:
+            raise SpeakerError(
+                ErrorsMessage.speaker_description_error.format(
+                    list(speakers.v2_speakers)
+                )
+            )
+
+
+def _segment_requests(
+    text: str, description: str, chunk_size: float | None, max_chars: int
+) -> list[TTSRequestV2]:
+    segments = split_text(text, max_chars)
+    if not segments:
+        raise ValueError("text must not be empty")
+    return [
+        TTSRequestV2(text=segment, description=description, chunk_size=chunk_size)
+        for segment in segments
+    ]
 
 
 class TTS:
     def __init__(self, client):
         self.client = client
 
+    @traced("djelia.text_to_speech")
     def text_to_speech(
         self,
         request: TTSRequest | TTSRequestV2,
-        output_file: str | None = None,
+        output_file: str | AudioSink | None = None,
         stream: bool | None = False,
         version: Versions | None = Versions.v1,
-    ) -> bytes | str | Generator:
-        if version == Versions.v1:
-            if not isinstance(request, TTSRequest):
-                raise ValueError(ErrorsMessage.tts_v1_request_error)
-            if request.speaker not in self.client.settings.valid_speaker_ids:
-                raise SpeakerError(
-                    ErrorsMessage.speaker_id_error.format(
-                        self.client.settings.valid_speaker_ids, request.speaker
-                    )
+        retry_policy: "RetryPolicy | None" = None,
+        chunk_size: int | None = None,
+    ) -> bytes | str | AudioSink | Generator:
+        _validate_request(self.client, request, version)
+
+        if not stream:
+            cache = self.client.tts_cache
+            key = cache.key(request, version) if cache is not None else None
+            content = cache.get(key) if key is not None else None
+            if content is None:
+                data = request.dict()
+                response = self.client._make_request(
+                    method=DjeliaRequest.tts.method,
+                    endpoint=DjeliaRequest.tts.endpoint.format(version.value),
+                    json=data,
+                    retry_policy=retry_policy,
                 )
+                content = response.content
+                if key is not None:
+                    cache.set(key, content)
+
+            return self._save(content, output_file)
         else:
-            if not isinstance(request, TTSRequestV2):
-                raise ValueError(ErrorsMessage.tts_v2_request_error)
-            speaker_found = any(
-                speaker.lower() in request.description.lower()
-                for speaker in self.client.settings.valid_tts_v2_speakers
+            if version == Versions.v1:
+                raise ValueError(ErrorsMessage.tts_streaming_compatibility)
+            return self._stream_text_to_speech(
+                request, output_file, version, retry_policy, chunk_size
             )
-            if not speaker_found:
-                raise SpeakerError(
-                    ErrorsMessage.speaker_description_error.format(
-                        self.client.settings.valid_tts_v2_speakers
+
+    @staticmethod
+    def _save(content: bytes, output_file: str | AudioSink | None):
+        if output_file is None:
+            return content
+        try:
+            sink = as_sink(output_file)
+            sink.write(content)
+            sink.close()
+            return output_file
+        except OSError as e:
+            raise OSError(ErrorsMessage.ioerror_save.format(str(e)))
+
+    def text_to_speech_long(
+        self,
+        text: str,
+        description: str,
+        chunk_size: float | None = 1.0,
+        output_file: str | AudioSink | None = None,
+        stream: bool | None = False,
+        version: Versions | None = Versions.v2,
+        concurrency: int = 4,
+        max_chars: int = 1000,
+        retry_policy: "RetryPolicy | None" = None,
+    ) -> bytes | str | AudioSink | Generator:
+        """Synthesize text longer than a single request accepts.
+
+        ``text`` is split at sentence and clause boundaries into segments of
+        at most ``max_chars`` characters, synthesized ``concurrency`` at a
+        time and joined into a single WAV file. With ``stream=True`` the
+        audio is yielded in order as soon as the next segment is ready, so
+        playback can start after the first one.
+        """
+        requests = _segment_requests(text, description, chunk_size, max_chars)
+        _validate_request(self.client, requests[0], version)
+        segments = self._synthesize_segments(
+            requests, version, concurrency, retry_policy
+        )
+        if stream:
+            return self._stream_segments(segments, output_file)
+        try:
+            content = WavJoiner.join(list(segments))
+        finally:
+            segments.close()
+        return self._save(content, output_file)
+
+    def _synthesize_segments(
+        self,
+        requests: list[TTSRequestV2],
+        version: Versions,
+        concurrency: int,
+        retry_policy: "RetryPolicy | None",
+    ) -> Generator[bytes, None, None]:
+        # futures are consumed in order, so at most ``concurrency`` segments
+        # are being synthesized or waiting to be consumed at any time
+        pending = deque()
+        executor = ThreadPoolExecutor(max_workers=concurrency)
+        try:
+            for request in requests:
+                if len(pending) >= concurrency:
+                    yield pending.popleft().result()
+                pending.append(
+                    executor.submit(
+                        self.text_to_speech,
+                        request,
+                        version=version,
+                        retry_policy=retry_policy,
                     )
                 )
+            while pending:
+                yield pending.popleft().result()
+        finally:
+            executor.shutdown(wait=False, cancel_futures=True)
 
-        if not stream:
-            data = request.dict()
-            response = self.client._make_request(
-                method=DjeliaRequest.tts.method,
-                endpoint=DjeliaRequest.tts.endpoint.format(version.value),
-                json=data,
-            )
-
-            if output_file:
-                try:
-                    with open(output_file, "wb") as f:
-                        f.write(response.content)
-                    return output_file
-                except OSError as e:
-                    raise OSError(ErrorsMessage.ioerror_save.format(str(e)))
-            else:
-                return response.content
-        else:
-            if version == Versions.v1:
-                raise ValueError(ErrorsMessage.tts_streaming_conpatibility)
-            return self._stream_text_to_speech(request, output_file, version)
+    def _stream_segments(
+        self,
+        segments: Generator[bytes, None, None],
+        output_file: str | AudioSink | None,
+    ) -> Generator[bytes, None, None]:
+        joiner = WavJoiner()
+        sink = as_sink(output_file)
+        completed = False
+        try:
+            for audio in segments:
+                chunk = joiner.add(audio)
+                if sink is not None:
+                    sink.write(chunk)
+                yield chunk
+            completed = True
+        except OSError as e:
+            raise OSError(ErrorsMessage.ioerror_save.format(str(e)))
+        finally:
+            segments.close()
+            if sink is not None:
+                if completed:
+                    sink.close()
+                else:
+                    sink.abort()
 
     def _stream_text_to_speech(
         self,
         request: TTSRequestV2,
-        output_file: str | None = None,
+        output_file: str | AudioSink | None = None,
         version: Versions | None = Versions.v2,
+        retry_policy: "RetryPolicy | None" = None,
+        chunk_size: int | None = None,
     ) -> Generator[bytes, None, None]:
-        data = request.dict()
-        response = self.client._make_request(
-            method=DjeliaRequest.tts_stream.method,
-            endpoint=DjeliaRequest.tts_stream.endpoint.format(version.value),
-            json=data,
-            stream=True,
-        )
-
-        audio_chunks = []
-        for chunk in response.iter_content(chunk_size=8192):
-            if chunk:
-                audio_chunks.append(chunk)
-                yield chunk
+        chunk_size = chunk_size or self.client.transport.stream_chunk_size
+        cache = self.client.tts_cache
+        key = cache.key(request, version, stream=True) if cache is not None else None
+        cached = cache.open(key) if key is not None else None
+        entry = None
+        if cached is not None:
+            # replayed from disk at the chunk size the network would use
+            chunks = iter(partial(cached.read, chunk_size), b"")
+            close = cached.close
+        else:
+            data = request.dict()
+            response = self.client._make_request(
+                method=DjeliaRequest.tts_stream.method,
+                endpoint=DjeliaRequest.tts_stream.endpoint.format(version.value),
+                json=data,
+                stream=True,
+                retry_policy=retry_policy,
+            )
+            chunks = response.iter_content(chunk_size=chunk_size)
+            close = response.close
+            if key is not None:
+                entry = cache.begin(key)
 
-        if output_file:
-            try:
-                with open(output_file, "wb") as f:
-                    for chunk in audio_chunks:
-                        f.write(chunk)
-            except OSError as e:
-                raise OSError(ErrorsMessage.ioerror_save.format(str(e)))
+        # chunks are written through as they arrive; a stream that stops
+        # early (break, close, error) aborts the sink so it can finalize
+        sink = as_sink(output_file)
+        completed = False
+        try:
+            for chunk in chunks:
+                if chunk:
+                    if sink is not None:
+                        sink.write(chunk)
+                    if entry is not None:
+                        entry.write(chunk)
+                    yield chunk
+            completed = True
+        except OSError as e:
+            raise OSError(ErrorsMessage.ioerror_save.format(str(e)))
+        finally:
+            close()
+            if entry is not None:
+                # only complete audio is cached
+                if completed:
+                    entry.commit()
+                else:
+                    entry.discard()
+            if sink is not None:
+                if completed:
+                    sink.close()
+                else:
+                    sink.abort()
 
 
 class AsyncTTS:
     def __init__(self, client):
         self.client = client
 
+    @traced("djelia.text_to_speech")
     async def text_to_speech(
         self,
         request: TTSRequest | TTSRequestV2,
-        output_file: str | None = None,
+        output_file: str | AudioSink | None = None,
         stream: bool | None = False,
         version: Versions | None = Versions.v1,
-    ) -> bytes | str | AsyncGenerator:
-        if version == Versions.v1:
-            if not isinstance(request, TTSRequest):
-                raise ValueError(ErrorsMessage.tts_v1_request_error)
-            if request.speaker not in self.client.settings.valid_speaker_ids:
-                raise SpeakerError(
-                    ErrorsMessage.speaker_id_error.format(
-                        self.client.settings.valid_speaker_ids, request.speaker
-                    )
+        retry_policy: "RetryPolicy | None" = None,
+        chunk_size: int | None = None,
+    ) -> bytes | str | AudioSink | AsyncGenerator:
+        _validate_request(self.client, request, version)
+
+        if not stream:
+            cache = self.client.tts_cache
+            key = cache.key(request, version) if cache is not None else None
+            content = None
+            if key is not None:
+                content = await self.client._run_io(cache.get, key)
+            if content is None:
+                request_data = request.dict()
+                content = await self.client._make_request(
+                    method=DjeliaRequest.tts.method,
+                    endpoint=DjeliaRequest.tts.endpoint.format(version.value),
+                    json=request_data,
+                    retry_policy=retry_policy,
                 )
+                if key is not None:
+                    await self.client._run_io(cache.set, key, content)
+
+            return await self._save(content, output_file)
         else:
-            if not isinstance(request, TTSRequestV2):
-                raise ValueError(ErrorsMessage.tts_v2_request_error)
-            speaker_found = any(
-                speaker.lower() in request.description.lower()
-                for speaker in self.client.settings.valid_tts_v2_speakers
+            if version == Versions.v1:
+                raise ValueError(ErrorsMessage.tts_streaming_compatibility)
+            # FIXED: Remove 'await' here - async generators should not be awaited when returned
+            return self._stream_text_to_speech(
+                request, output_file, version, retry_policy, chunk_size
             )
-            if not speaker_found:
-                raise SpeakerError(
-                    ErrorsMessage.speaker_description_error.format(
-                        self.client.settings.valid_tts_v2_speakers
+
+    async def _save(self, content: bytes, output_file: str | AudioSink | None):
+        if output_file is None:
+            return content
+        try:
+            sink = as_sink(output_file)
+            await self.client._run_io(sink.write, content)
+            await self.client._run_io(sink.close)
+            return output_file
+        except OSError as e:
+            raise OSError(ErrorsMessage.ioerror_save.format(str(e)))
+
+    async def text_to_speech_long(
+        self,
+        text: str,
+        description: str,
+        chunk_size: float | None = 1.0,
+        output_file: str | AudioSink | None = None,
+        stream: bool | None = False,
+        version: Versions | None = Versions.v2,
+        concurrency: int = 4,
+        max_chars: int = 1000,
+        retry_policy: "RetryPolicy | None" = None,
+    ) -> bytes | str | AudioSink | AsyncGenerator:
+        """Async variant of :meth:`TTS.text_to_speech_long`."""
+        requests = _segment_requests(text, description, chunk_size, max_chars)
+        _validate_request(self.client, requests[0], version)
+        segments = self._synthesize_segments(
+            requests, version, concurrency, retry_policy
+        )
+        if stream:
+            return self._stream_segments(segments, output_file)
+        try:
+            content = WavJoiner.join([audio async for audio in segments])
+        finally:
+            await segments.aclose()
+        return await self._save(content, output_file)
+
+    async def _synthesize_segments(
+        self,
+        requests: list[TTSRequestV2],
+        version: Versions,
+        concurrency: int,
+        retry_policy: "RetryPolicy | None",
+    ) -> AsyncGenerator[bytes, None]:
+        pending = deque()
+        try:
+            for request in requests:
+                if len(pending) >= concurrency:
+                    yield await pending.popleft()
+                pending.append(
+                    asyncio.ensure_future(
+                        self.text_to_speech(
+                            request, version=version, retry_policy=retry_policy
+                        )
                     )
                 )
+            while pending:
+                yield await pending.popleft()
+        finally:
+            for task in pending:
+                task.cancel()
 
-        if not stream:
-            request_data = request.dict()
-            content = await self.client._make_request(
-                method=DjeliaRequest.tts.method,
-                endpoint=DjeliaRequest.tts.endpoint.format(version.value),
-                json=request_data,
-            )
+    async def _stream_segments(
+        self,
+        segments: AsyncGenerator[bytes, None],
+        output_file: str | AudioSink | None,
+    ) -> AsyncGenerator[bytes, None]:
+        joiner = WavJoiner()
+        sink = as_sink(output_file)
+        completed = False
+        try:
+            async for audio in segments:
+                chunk = joiner.add(audio)
+                if sink is not None:
+                    await self.client._run_io(sink.write, chunk)
+                yield chunk
+            completed = True
+        except OSError as e:
+            raise OSError(ErrorsMessage.ioerror_save.format(str(e)))
+        finally:
+            await segments.aclose()
+            if sink is not None:
+                if completed:
+                    await self.client._run_io(sink.close)
+                else:
+                    sink.abort()
 
-            if output_file:
-                try:
-                    with open(output_file, "wb") as f:
-                        f.write(content)
-                    return output_file
-                except OSError as e:
-                    raise OSError(ErrorsMessage.ioerror_save.format(str(e)))
-            else:
-                return content
-        else:
-            if version == Versions.v1:
-                raise ValueError(ErrorsMessage.tts_streaming_conpatibility)
-            # FIXED: Remove 'await' here - async generators should not be awaited when returned
-            return self._stream_text_to_speech(request, output_file, version)
+    async def _replay(
+        self, cached: BinaryIO, chunk_size: int
+    ) -> AsyncGenerator[bytes, None]:
+        while chunk := await self.client._run_io(cached.read, chunk_size):
+            yield chunk
 
     async def _stream_text_to_speech(
         self,
         request: TTSRequestV2,
-        output_file: str | None = None,
+        output_file: str | AudioSink | None = None,
         version: Versions | None = Versions.v2,
+        retry_policy: "RetryPolicy | None" = None,
+        chunk_size: int | None = None,
     ) -> AsyncGenerator[bytes, None]:
-        request_data = request.dict()
-        response = await self.client._make_streaming_request(
-            method=DjeliaRequest.tts_stream.method,
-            endpoint=DjeliaRequest.tts_stream.endpoint.format(version.value),
-            json=request_data,
-        )
+        chunk_size = chunk_size or self.client.transport.stream_chunk_size
+        cache = self.client.tts_cache
+        key = cache.key(request, version, stream=True) if cache is not None else None
+        cached = None
+        if key is not None:
+            cached = await self.client._run_io(cache.open, key)
+        entry = None
+        if cached is not None:
+            chunks = self._replay(cached, chunk_size)
+            close = cached.close
+        else:
+            request_data = request.dict()
+            response = await self.client._make_streaming_request(
+                method=DjeliaRequest.tts_stream.method,
+                endpoint=DjeliaRequest.tts_stream.endpoint.format(version.value),
+                json=request_data,
+                retry_policy=retry_policy,
+            )
+            chunks = response.content.iter_chunked(chunk_size)
+            close = response.close
+            if key is not None:
+                entry = await self.client._run_io(cache.begin, key)
+
+        sink = as_sink(output_file)
+        # one executor hop per chunk for both the sink and the cache entry
+        writers = [w.write for w in (sink, entry) if w is not None]
+
+        def write(chunk: bytes) -> None:
+            for writer in writers:
+                writer(chunk)
 
-        audio_chunks = []
+        completed = False
         try:
-            async for chunk in response.content.iter_chunked(8192):
+            async for chunk in chunks:
                 if chunk:
-                    audio_chunks.append(chunk)
+                    if writers:
+                        await self.client._run_io(write, chunk)
                     yield chunk
+            completed = True
+        except OSError as e:
+            raise OSError(ErrorsMessage.ioerror_save.format(str(e)))
         finally:
-            await response.close()
-
-        if output_file:
-            try:
-                with open(output_file, "wb") as f:
-                    for chunk in audio_chunks:
-                        f.write(chunk)
-            except OSError as e:
-                raise OSError(ErrorsMessage.ioerror_save.format(str(e)))
+            close()
+            if entry is not None:
+                if completed:
+                    await self.client._run_io(entry.commit)
+                else:
+                    entry.discard()
+            if sink is not None:
+                if completed:
+                    await self.client._run_io(sink.close)
+                else:
+                    # cancelled or abandoned: awaiting here could be cancelled
+                    # again, finalize synchronously, it is a short truncate
+                    sink.abort()
@@ -10,6 +10,8 @@ class ExceptionMessage:
         403: "Forbidden: You do not have permission to access this resource",
         404: "Resource not found",
         422: "Validation error",
+        429: "Rate limit exceeded, retry later",
+        503: "Service temporarily unavailable",
     }
     default: str = "API error {}"
     failed: str = "Request failed: {}"
@@ -26,9 +28,13 @@ class CodeStatusExceptions:
 
 
 def api_exception(code: int, error: Exception) -> Exception:
-    return CodeStatusExceptions.exceptions.get(code, APIError)(
-        ExceptionMessage.messages.get(code, ExceptionMessage.default.format(str(error)))
+    exception = CodeStatusExceptions.exceptions.get(code, APIError)
+    message = ExceptionMessage.messages.get(
+        code, ExceptionMessage.default.format(str(error))
     )
+    if issubclass(exception, APIError):
+        return exception(code, message)
+    return exception(message)
 
 
 def general_exception(error: Exception) -> Exception:
@@ -0,0 +1,31 @@
+import logging
+
+logger = logging.getLogger("djelia")
+
+
+def log_request(event) -> None:
+    """Request hook that logs one line per request at DEBUG level.
+
+    Usage: ``Djelia(hooks=[log_request])`` with ``logging.getLogger("djelia")``
+    set to DEBUG.
+    """
+    if not logger.isEnabledFor(logging.DEBUG):
+        return
+    timings = event.timings
+    logger.debug(
+        "%s %s -> %s in %.1f ms (serialize %.1f, connect %.1f, first byte %.1f, "
+        "download %.1f, parse %.1f), %d B sent, %d B received, %d retries%s",
+        event.method,
+        event.endpoint,
+        event.status,
+        timings.total * 1000,
+        timings.serialize * 1000,
+        timings.connect * 1000,
+        timings.first_byte * 1000,
+        timings.download * 1000,
+        timings.parse * 1000,
+        event.bytes_sent,
+        event.bytes_received,
+        event.retries,
+        f", failed: {event.error!r}" if event.error is not None else "",
+    )
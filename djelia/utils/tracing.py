@@ -0,0 +1,31 @@
+import functools
+import inspect
+
+
+def traced(name: str):
+    """Run a service method in a ``name`` span when its client has
+    ``tracing``, see ``djelia.src.client.tracing``; a plain call otherwise.
+    """
+
+    def decorate(func):
+        if inspect.iscoroutinefunction(func):
+
+            @functools.wraps(func)
+            async def async_wrapper(self, *args, **kwargs):
+                tracing = self.client.tracing
+                if tracing is None:
+                    return await func(self, *args, **kwargs)
+                return await tracing.acall(name, func, (self, *args), kwargs)
+
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(self, *args, **kwargs):
+            tracing = self.client.tracing
+            if tracing is None:
+                return func(self, *args, **kwargs)
+            return tracing.call(name, func, (self, *args), kwargs)
+
+        return wrapper
+
+    return decorate
@@ -45,9 +45,15 @@ setup(
         "aiohttp>=3.8.0",
         "pydantic-settings>=2.10.1",
         "pydantic>=2.7.0",
-        "tenacity>=9.1.2",
     ],
     extras_require={
+        "audio": [
+            "numpy>=1.22",
+            "soundfile>=0.12",
+        ],
+        "tracing": [
+            "opentelemetry-api>=1.20",
+        ],
         "dev": [
             "pytest>=6.0",
             "pytest-asyncio>=0.18.0",
@@ -0,0 +1,47 @@
+import pytest
+
+from benchmarks.stub_server import StubConfig, StubServer
+from benchmarks.utils import API_KEY
+from djelia import Djelia, DjeliaAsync, RetryPolicy
+
+# retries without the production backoff, the stub fails on purpose
+FAST_RETRIES = RetryPolicy(backoff_factor=0.01)
+
+
+@pytest.fixture
+def stub():
+    """Starts a local API stub with the given ``StubConfig`` fields."""
+    servers = []
+
+    def start(**config) -> StubServer:
+        server = StubServer(StubConfig(**config)).start()
+        servers.append(server)
+        return server
+
+    yield start
+    for server in servers:
+        server.stop()
+
+
+@pytest.fixture
+def make_client():
+    """Builds a ``Djelia`` client for a stub server."""
+
+    def make(server: StubServer, **kwargs) -> Djelia:
+        kwargs.setdefault("retry_policy", FAST_RETRIES)
+        return Djelia(api_key=API_KEY, base_url=server.base_url, **kwargs)
+
+    return make
+
+
+@pytest.fixture
+def make_async_client():
+    """Builds a ``DjeliaAsync`` client for a stub server; use it as an async
+    context manager inside the test's event loop.
+    """
+
+    def make(server: StubServer, **kwargs) -> DjeliaAsync:
+        kwargs.setdefault("retry_policy", FAST_RETRIES)
+        return DjeliaAsync(api_key=API_KEY, base_url=server.base_url, **kwargs)
+
+    return make
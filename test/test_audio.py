@@ -0,0 +1,169 @@
+import asyncio
+import wave
+
+import pytest
+
+from djelia.models import TranscriptionSegment
+from djelia.src.audio import AudioPreprocessor, SilenceTrimmer, TimeMap
+from djelia.src.audio.vad import _TrimStream
+
+np = pytest.importorskip("numpy")
+
+
+def write_tone(path, seconds: float, rate: int, channels: int) -> None:
+    # a 440 Hz tone, the same on every channel
+    t = np.arange(int(seconds * rate)) / rate
+    tone = 0.5 * np.sin(2 * np.pi * 440 * t)
+    pcm = (np.repeat(tone[:, None], channels, axis=1) * 32767).astype("<i2")
+    with wave.open(str(path), "wb") as w:
+        w.setnchannels(channels)
+        w.setsampwidth(2)
+        w.setframerate(rate)
+        w.writeframes(pcm.tobytes())
+
+
+def read_wav(path) -> tuple[int, "np.ndarray"]:
+    with wave.open(path, "rb") as w:
+        pcm = np.frombuffer(w.readframes(w.getnframes()), "<i2")
+        return w.getframerate(), pcm.reshape(-1, w.getnchannels()) / 32767
+
+
+# ================================================
+#                 pre-processing
+# ================================================
+
+
+def test_preprocessor_resamples_and_downmixes(tmp_path):
+    source = tmp_path / "stereo.wav"
+    write_tone(source, 1.0, 48000, 2)
+    with AudioPreprocessor(sample_rate=16000) as preprocessor:
+        audio = preprocessor.process(str(source))
+    try:
+        rate, samples = read_wav(audio.path)
+    finally:
+        audio.cleanup()
+    assert rate == audio.sample_rate == 16000
+    assert samples.shape[1] == 1
+    assert abs(len(samples) - 16000) <= 2
+    assert audio.duration == pytest.approx(1.0, abs=1e-3)
+    assert audio.output_bytes < audio.input_bytes / 5
+    # the tone survives the low-pass filter
+    middle = samples[1000:-1000, 0]
+    assert np.abs(middle).max() == pytest.approx(0.5, abs=0.02)
+
+
+def test_preprocessor_keeps_channels_in_a_process_pool(tmp_path):
+    source = tmp_path / "stereo.wav"
+    write_tone(source, 0.5, 44100, 2)
+    with AudioPreprocessor(sample_rate=8000, mono=False, max_workers=1) as pool:
+        audio = asyncio.run(pool.aprocess(str(source)))
+    try:
+        rate, samples = read_wav(audio.path)
+    finally:
+        audio.cleanup()
+    assert rate == 8000
+    assert samples.shape[1] == 2
+    assert abs(len(samples) - 4000) <= 2
+
+
+# ================================================
+#                silence trimming
+# ================================================
+
+RATE = 1000
+# 10 ms frames; silences over 0.6 s keep 0.1 s on each side
+TRIMMER = SilenceTrimmer(frame_ms=10, min_silence=0.6, keep_silence=0.2)
+
+
+def voice(seconds: float) -> "np.ndarray":
+    t = np.arange(int(seconds * RATE)) / RATE
+    return (0.5 * np.sin(2 * np.pi * 100 * t)).astype(np.float32)[:, None]
+
+
+def silence(seconds: float) -> "np.ndarray":
+    return np.zeros((int(seconds * RATE), 1), np.float32)
+
+
+def trim(samples: "np.ndarray", block: int) -> tuple["np.ndarray", TimeMap]:
+    stream = _TrimStream(TRIMMER, RATE, 1)
+    out = [
+        stream.process(samples[i : i + block]) for i in range(0, len(samples), block)
+    ]
+    out.append(stream.flush())
+    return np.concatenate(out), stream.time_map
+
+
+def test_trim_stream_maps_times_across_several_cuts():
+    parts = [
+        silence(1.0),  # leading, its first and last 0.1 s are kept
+        voice(1.0),
+        silence(2.0),
+        voice(0.5),
+        silence(0.3),  # a short pause, kept whole
+        voice(0.5),
+        silence(1.5),  # trailing, only its start is kept
+    ]
+    samples = np.concatenate(parts)
+    out, time_map = trim(samples, block=137)
+
+    # the result does not depend on how the audio was split into blocks
+    whole, whole_map = trim(samples, block=len(samples))
+    assert np.array_equal(out, whole)
+    assert whole_map == time_map
+
+    assert len(out) == 2.8 * RATE
+    assert time_map.trimmed == pytest.approx([0.0, 0.1, 1.3, 2.8])
+    assert time_map.original == pytest.approx([0.0, 0.9, 3.9, 6.8])
+    assert time_map.removed == pytest.approx(4.0)
+    # voiced audio is passed through untouched
+    assert np.array_equal(out[200:1200], parts[1])
+    assert np.array_equal(out[1400:2700], np.concatenate(parts[3:6]))
+
+    # leading edge, then one point in every kept span
+    assert time_map.to_original(0.0) == 0.0
+    assert time_map.to_original(0.05) == pytest.approx(0.05)
+    assert time_map.to_original(0.2) == pytest.approx(1.0)
+    assert time_map.to_original(1.5) == pytest.approx(4.1)
+    assert time_map.to_original(2.3) == pytest.approx(4.9)
+    # an end on a cut stays in the span before it
+    assert time_map.to_original(1.3) == pytest.approx(3.9)
+    assert time_map.to_original(1.3, end=True) == pytest.approx(2.1)
+    # the trailing edge ends where the kept silence ends
+    assert time_map.to_original(2.8, end=True) == pytest.approx(5.4)
+
+    segment = time_map.segment(TranscriptionSegment(text="a", start=1.4, end=2.7))
+    assert (segment.start, segment.end) == pytest.approx((4.0, 5.3))
+
+
+def test_trim_stream_leaves_short_pauses_alone():
+    samples = np.concatenate([voice(0.5), silence(0.5), voice(0.5)])
+    out, time_map = trim(samples, block=64)
+    assert np.array_equal(out, samples)
+    assert time_map == TimeMap()
+    assert time_map.to_original(1.2) == pytest.approx(1.2)
+
+
+def test_trim_stream_of_silence_keeps_one_edge():
+    out, time_map = trim(silence(2.0), block=300)
+    assert len(out) == 0.1 * RATE
+    assert time_map.removed == pytest.approx(1.9)
+
+
+def test_preprocessor_restores_trimmed_times(tmp_path):
+    source = tmp_path / "pauses.wav"
+    samples = np.concatenate([voice(1.0), silence(3.0), voice(1.0)])[:, 0]
+    with wave.open(str(source), "wb") as w:
+        w.setnchannels(1)
+        w.setsampwidth(2)
+        w.setframerate(RATE)
+        w.writeframes((samples * 32767).astype("<i2").tobytes())
+
+    with AudioPreprocessor(sample_rate=RATE, trim_silence=TRIMMER) as preprocessor:
+        audio = preprocessor.process(str(source))
+    audio.cleanup()
+    assert audio.duration == pytest.approx(2.2)
+    assert audio.time_map.removed == pytest.approx(2.8)
+    segments = audio.restore_times(
+        [TranscriptionSegment(text="second", start=1.2, end=2.2)]
+    )
+    assert (segments[0].start, segments[0].end) == pytest.approx((4.0, 5.0))
@@ -0,0 +1,322 @@
+import asyncio
+import io
+import shutil
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from benchmarks.stub_server import make_wav
+from djelia.models import Language, TranslationRequest, TTSRequestV2, Versions
+from djelia.src.audio import RingBufferSink
+from djelia.src.cache import (MemoryCache, SQLiteCache, TranscriptionCache,
+                              TranslationCache, TTSCache)
+
+REQUEST = TranslationRequest(
+    text="i ni ce", source=Language.BAMBARA, target=Language.FRENCH
+)
+AUDIO = make_wav(0.5)
+SPEECH = TTSRequestV2(text="i ni ce", description="Moussa speaks clearly")
+
+
+# ================================================
+#                    backends
+# ================================================
+
+
+def test_memory_cache_evicts_the_least_recently_used():
+    cache = MemoryCache(max_entries=2)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    assert cache.get("a") == 1
+    cache.set("c", 3)
+    assert cache.get("b") is None
+    assert (cache.get("a"), cache.get("c")) == (1, 3)
+    assert cache.evictions == 1
+    assert len(cache) == 2
+
+
+def test_memory_cache_expires_entries():
+    cache = MemoryCache(ttl=0.05)
+    cache.set("a", 1)
+    assert cache.get("a") == 1
+    time.sleep(0.1)
+    assert cache.get("a") is None
+    assert len(cache) == 0
+
+
+def test_sqlite_cache_persists_across_instances(tmp_path):
+    path = str(tmp_path / "cache.sqlite")
+    cache = SQLiteCache(path)
+    cache.set("a", "ec in i")
+    cache.close()
+
+    reopened = SQLiteCache(path)
+    try:
+        assert reopened.get("a") == "ec in i"
+        assert len(reopened) == 1
+    finally:
+        reopened.close()
+
+
+def test_sqlite_cache_expires_and_trims_entries(tmp_path):
+    expiring = SQLiteCache(str(tmp_path / "ttl.sqlite"), ttl=0.05)
+    expiring.set("a", "1")
+    time.sleep(0.1)
+    assert expiring.get("a") is None
+    expiring.close()
+
+    bounded = SQLiteCache(str(tmp_path / "lru.sqlite"), max_entries=2, trim_interval=1)
+    try:
+        for key in "abc":
+            bounded.set(key, key)
+            time.sleep(0.01)
+        assert len(bounded) == 2
+        assert bounded.get("a") is None
+    finally:
+        bounded.close()
+
+
+# ================================================
+#                TranslationCache
+# ================================================
+
+
+def test_translation_cache_serves_repeated_requests(stub, make_client):
+    server = stub()
+    cache = TranslationCache()
+    with make_client(server, translation_cache=cache) as client:
+        first = client.translation.translate(REQUEST)
+        second = client.translation.translate(REQUEST)
+        client.translation.translate(REQUEST.model_copy(update={"text": "a ka di"}))
+    assert first == second
+    assert server.requests == 2
+    assert (cache.stats.hits, cache.stats.misses) == (1, 2)
+
+
+def test_translation_cache_entries_expire(stub, make_client):
+    server = stub()
+    with make_client(server, translation_cache=TranslationCache(ttl=0.05)) as client:
+        client.translation.translate(REQUEST)
+        client.translation.translate(REQUEST)
+        time.sleep(0.1)
+        client.translation.translate(REQUEST)
+    assert server.requests == 2
+
+
+def test_translation_cache_persists_across_clients(tmp_path, stub, make_client):
+    path = str(tmp_path / "translations.sqlite")
+    cache = TranslationCache(path=path)
+    with make_client(stub(), translation_cache=cache) as client:
+        client.translation.translate(REQUEST)
+    cache.close()
+
+    server = stub()
+    cache = TranslationCache(path=path)
+    try:
+        with make_client(server, translation_cache=cache) as client:
+            assert client.translation.translate(REQUEST).text == "ec in i"
+    finally:
+        cache.close()
+    assert server.requests == 0
+
+
+def test_translation_cache_coalesces_concurrent_requests(stub, make_client):
+    server = stub(latency=0.2)
+    cache = TranslationCache()
+    with make_client(server, translation_cache=cache) as client:
+        with ThreadPoolExecutor(max_workers=5) as executor:
+            responses = list(
+                executor.map(lambda _: client.translation.translate(REQUEST), range(5))
+            )
+    assert {response.text for response in responses} == {"ec in i"}
+    assert server.requests == 1
+    assert cache.stats.coalesced == 4
+
+
+def test_async_translation_cache_coalesces_concurrent_requests(stub, make_async_client):
+    server = stub(latency=0.1)
+    cache = TranslationCache()
+
+    async def main():
+        async with make_async_client(server, translation_cache=cache) as client:
+            return await asyncio.gather(
+                *(client.translation.translate(REQUEST) for _ in range(5))
+            )
+
+    assert {response.text for response in asyncio.run(main())} == {"ec in i"}
+    assert server.requests == 1
+    assert cache.stats.coalesced == 4
+
+
+# ================================================
+#               TranscriptionCache
+# ================================================
+
+
+def test_transcription_cache_key_depends_on_content_only(tmp_path):
+    cache = TranscriptionCache(str(tmp_path / "cache"))
+    path = tmp_path / "audio.wav"
+    path.write_bytes(AUDIO)
+    shutil.copy(path, tmp_path / "renamed.wav")
+
+    key = cache.key(str(path), False, Versions.v2)
+    assert cache.key(str(tmp_path / "renamed.wav"), False, Versions.v2) == key
+    assert cache.key(io.BytesIO(AUDIO), False, Versions.v2) == key
+    with open(path, "rb") as f:
+        assert cache.key(f, False, Versions.v2) == key
+    # streams are hashed from their position and rewound to it
+    stream = io.BytesIO(b"head" + AUDIO)
+    stream.seek(4)
+    assert cache.key(stream, False, Versions.v2) == key
+    assert stream.tell() == 4
+
+    assert cache.key(io.BytesIO(AUDIO[:-2]), False, Versions.v2) != key
+    assert cache.key(str(path), True, Versions.v2) != key
+    assert cache.key(str(path), False, Versions.v1) != key
+    assert cache.key(str(path), False, Versions.v2, variant="16k") != key
+    cache.close()
+
+
+def test_transcription_cache_hit_sends_no_upload(tmp_path, stub, make_client):
+    path = tmp_path / "audio.wav"
+    path.write_bytes(AUDIO)
+    server = stub()
+    cache = TranscriptionCache(str(tmp_path / "cache"))
+    with make_client(server, transcription_cache=cache) as client:
+        first = client.transcription.transcribe(str(path))
+        received = server.bytes_received
+        assert client.transcription.transcribe(io.BytesIO(AUDIO)) == first
+        assert server.requests == 1
+        assert server.bytes_received == received
+
+        # other options or another model miss the cache
+        client.transcription.transcribe(str(path), translate_to_french=True)
+        client.transcription.transcribe(str(path), version=Versions.v1)
+        assert server.requests == 3
+    assert (cache.stats.hits, cache.stats.misses) == (1, 3)
+    cache.close()
+
+
+def test_transcription_cache_replays_streams(tmp_path, stub, make_client):
+    server = stub(segments=3)
+    cache = TranscriptionCache(str(tmp_path / "cache"))
+    with make_client(server, transcription_cache=cache) as client:
+        first = list(client.transcription.transcribe(io.BytesIO(AUDIO), stream=True))
+        again = list(client.transcription.transcribe(io.BytesIO(AUDIO), stream=True))
+    assert again == first
+    assert len(first) == 3
+    assert server.requests == 1
+    cache.close()
+
+
+def test_async_transcription_cache_hit_sends_no_upload(
+    tmp_path, stub, make_async_client
+):
+    server = stub()
+    cache = TranscriptionCache(str(tmp_path / "cache"))
+
+    async def main():
+        async with make_async_client(server, transcription_cache=cache) as client:
+            first = await client.transcription.transcribe(io.BytesIO(AUDIO))
+            return first, await client.transcription.transcribe(io.BytesIO(AUDIO))
+
+    first, again = asyncio.run(main())
+    assert again == first
+    assert server.requests == 1
+    cache.close()
+
+
+# ================================================
+#                    TTSCache
+# ================================================
+
+
+def test_tts_cache_key_normalizes_the_text():
+    key = TTSCache.key(SPEECH, Versions.v2)
+    spaced = SPEECH.model_copy(update={"text": "  i ni\n ce "})
+    assert TTSCache.key(spaced, Versions.v2) == key
+    # "é" composed and decomposed
+    assert TTSCache.key(
+        SPEECH.model_copy(update={"text": "caf\u00e9"}), Versions.v2
+    ) == TTSCache.key(SPEECH.model_copy(update={"text": "cafe\u0301"}), Versions.v2)
+
+    assert TTSCache.key(SPEECH, Versions.v2, stream=True) != key
+    assert TTSCache.key(SPEECH, Versions.v1) != key
+    assert (
+        TTSCache.key(SPEECH.model_copy(update={"chunk_size": 2.0}), Versions.v2) != key
+    )
+    other = SPEECH.model_copy(update={"description": "Seydou speaks slowly"})
+    assert TTSCache.key(other, Versions.v2) != key
+
+
+def test_tts_cache_hit_and_miss(tmp_path, stub, make_client):
+    server = stub(audio_seconds=0.1)
+    cache = TTSCache(str(tmp_path / "tts"))
+    with make_client(server, tts_cache=cache) as client:
+        first = client.tts.text_to_speech(SPEECH, version=Versions.v2)
+        again = client.tts.text_to_speech(SPEECH, version=Versions.v2)
+        other = SPEECH.model_copy(update={"text": "a ka di"})
+        client.tts.text_to_speech(other, version=Versions.v2)
+    assert first == again == make_wav(0.1)
+    assert server.requests == 2
+    assert (cache.stats.hits, cache.stats.misses) == (1, 2)
+    cache.close()
+
+
+def test_tts_cache_replays_a_stream_into_a_sink(tmp_path, stub, make_client):
+    server = stub(audio_seconds=0.5)
+    cache = TTSCache(str(tmp_path / "tts"))
+    path = tmp_path / "first.wav"
+    with make_client(server, tts_cache=cache) as client:
+        chunks = list(
+            client.tts.text_to_speech(
+                SPEECH, output_file=str(path), stream=True, version=Versions.v2
+            )
+        )
+        sink = RingBufferSink(64 * 1024)
+        replayed = list(
+            client.tts.text_to_speech(
+                SPEECH, output_file=sink, stream=True, version=Versions.v2
+            )
+        )
+    assert server.requests == 1
+    assert b"".join(replayed) == b"".join(chunks) == make_wav(0.5)
+    assert len(replayed) == len(chunks)
+    assert sink.read() == path.read_bytes() == make_wav(0.5)
+    cache.close()
+
+
+def test_tts_cache_skips_streams_stopped_early(tmp_path, stub, make_client):
+    server = stub(audio_seconds=0.5)
+    cache = TTSCache(str(tmp_path / "tts"))
+    with make_client(server, tts_cache=cache) as client:
+        stream = client.tts.text_to_speech(SPEECH, stream=True, version=Versions.v2)
+        next(stream)
+        stream.close()
+        list(client.tts.text_to_speech(SPEECH, stream=True, version=Versions.v2))
+    assert server.requests == 2
+    assert len(cache.store) == 1
+    cache.close()
+
+
+def test_async_tts_cache_replays_a_stream_into_a_sink(
+    tmp_path, stub, make_async_client
+):
+    server = stub(audio_seconds=0.5)
+    cache = TTSCache(str(tmp_path / "tts"))
+
+    async def synthesize(client, sink=None):
+        stream = await client.tts.text_to_speech(
+            SPEECH, output_file=sink, stream=True, version=Versions.v2
+        )
+        return b"".join([chunk async for chunk in stream])
+
+    async def main():
+        async with make_async_client(server, tts_cache=cache) as client:
+            sink = RingBufferSink(64 * 1024)
+            first = await synthesize(client)
+            return first, await synthesize(client, sink), sink
+
+    first, replayed, sink = asyncio.run(main())
+    assert server.requests == 1
+    assert first == replayed == sink.read() == make_wav(0.5)
+    cache.close()
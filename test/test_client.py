@@ -0,0 +1,511 @@
+import asyncio
+import socket
+import sys
+import threading
+import time
+
+import pytest
+import requests
+
+from benchmarks.utils import API_KEY
+from djelia import (ConcurrencyLimiter, Djelia, Metrics, RateLimiter,
+                    RetryBudget, RetryPolicy, SharedRateLimiter, Tracing)
+from djelia.models import (DjeliaRequest, Language, TranslationRequest,
+                           TTSRequestV2, Versions)
+from djelia.src.client import tracing as tracing_module
+from djelia.utils.exceptions import DjeliaError
+
+REQUEST = TranslationRequest(
+    text="i ni ce", source=Language.BAMBARA, target=Language.FRENCH
+)
+
+
+TRANSLATE = DjeliaRequest.translate.endpoint.format(Versions.v1.value)
+TRANSCRIBE = DjeliaRequest.transcribe.endpoint.format(Versions.v2.value)
+
+
+TTS_STREAM = DjeliaRequest.tts_stream.endpoint.format(Versions.v2.value)
+
+
+# ================================================
+#                     retries
+# ================================================
+
+
+def test_retries_server_errors(stub, make_client):
+    server = stub(fail_first=1, error_status=503)
+    with make_client(server) as client:
+        assert client.translation.translate(REQUEST).text == "ec in i"
+
+
+def test_gives_up_after_max_attempts(stub, make_client):
+    server = stub(fail_first=2, error_status=503)
+    policy = RetryPolicy(max_attempts=2, backoff_factor=0.01)
+    with make_client(server, retry_policy=policy) as client:
+        with pytest.raises(DjeliaError):
+            client.translation.translate(REQUEST)
+        # the stub's failures are used up
+        assert client.translation.translate(REQUEST).text == "ec in i"
+
+
+def test_does_not_retry_client_errors(stub, make_client):
+    # a second attempt would succeed
+    server = stub(fail_first=1, error_status=400)
+    with make_client(server) as client:
+        with pytest.raises(DjeliaError):
+            client.translation.translate(REQUEST)
+
+
+def test_async_retries_server_errors(stub, make_async_client):
+    server = stub(fail_first=2, error_status=503)
+
+    async def main():
+        async with make_async_client(server) as client:
+            return await client.translation.translate(REQUEST)
+
+    assert asyncio.run(main()).text == "ec in i"
+
+
+def test_retry_policy_delays():
+    policy = RetryPolicy(max_attempts=3, max_retry_after=60)
+    assert policy.get_delay("POST", 1, status=429, retry_after="2") == 2.0
+    # longer than we are willing to block
+    assert policy.get_delay("POST", 1, status=429, retry_after="120") is None
+    assert policy.get_delay("POST", 1, status=400) is None
+    assert policy.get_delay("POST", 3, status=503) is None
+    assert 0 <= policy.get_delay("GET", 1, error=ConnectionError()) <= 0.5
+
+
+def test_retry_policy_replays_post_only_when_unprocessed():
+    policy = RetryPolicy()
+    assert policy.get_delay("POST", 1, status=503) is not None
+    assert policy.get_delay("POST", 1, status=500) is None
+    assert policy.get_delay("GET", 1, status=500) is not None
+    # the body may have been sent before the connection broke
+    assert policy.get_delay("POST", 1, error=ConnectionResetError()) is None
+    assert policy.get_delay("POST", 1, error=requests.ConnectTimeout()) is not None
+
+    replay = RetryPolicy(retry_post=True)
+    assert replay.get_delay("POST", 1, status=500) is not None
+    assert replay.get_delay("POST", 1, error=ConnectionResetError()) is not None
+
+
+def test_post_is_not_retried_after_a_server_error(stub, make_client):
+    server = stub(fail_first=1, error_status=500)
+    with make_client(server) as client:
+        with pytest.raises(DjeliaError):
+            client.translation.translate(REQUEST)
+    assert server.requests == 1
+
+    server = stub(fail_first=1, error_status=500)
+    policy = RetryPolicy(backoff_factor=0.01, retry_post=True)
+    with make_client(server, retry_policy=policy) as client:
+        assert client.translation.translate(REQUEST).text == "ec in i"
+    assert server.requests == 2
+
+
+def test_post_is_retried_when_the_connection_fails():
+    # nothing listens on a port that was just released
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+    events = []
+    client = Djelia(
+        api_key=API_KEY,
+        base_url=f"http://127.0.0.1:{port}",
+        retry_policy=RetryPolicy(backoff_factor=0.01),
+        hooks=[events.append],
+    )
+    with client:
+        with pytest.raises(DjeliaError):
+            client.translation.translate(REQUEST)
+    assert [event.retries for event in events] == [2]
+
+
+def test_retry_budget():
+    budget = RetryBudget(ratio=0.5, min_retries=1)
+    assert budget.acquire()
+    assert not budget.acquire()
+    budget.record_request()
+    budget.record_request()
+    assert budget.acquire()
+    assert not budget.acquire()
+
+
+# ================================================
+#                  rate limiting
+# ================================================
+
+
+def test_rate_limiter_paces_requests(stub, make_client):
+    server = stub()
+    limiter = RateLimiter({"translate": 20})
+    with make_client(server, rate_limiter=limiter) as client:
+        start = time.perf_counter()
+        for _ in range(5):
+            client.translation.translate(REQUEST)
+        elapsed = time.perf_counter() - start
+    # the first request is free, the next four wait 1/20 s each
+    assert elapsed >= 0.18
+
+
+def test_rate_limiter_backs_off_on_429():
+    limiter = RateLimiter({"translate": 10}, increase=0.1, cooldown=60)
+    limiter.on_response(TRANSLATE, 429)
+    assert limiter.rate(TRANSLATE) == 5.0
+    # more 429s from the same burst do not cut again
+    limiter.on_response(TRANSLATE, 429)
+    assert limiter.rate(TRANSLATE) == 5.0
+    limiter.on_response(TRANSLATE, 200)
+    assert limiter.rate(TRANSLATE) == pytest.approx(5.2)
+    # other endpoints keep their own bucket
+    assert limiter.rate(TRANSCRIBE) is None
+
+
+def test_rate_limiter_recovers_from_throttling(stub, make_client):
+    # the sixth request of the stub's one second window is throttled, the
+    # limiter waits out Retry-After and halves its rate
+    server = stub(max_rate=5, retry_after=1.0)
+    limiter = RateLimiter({"translate": 20})
+    with make_client(server, rate_limiter=limiter) as client:
+        for _ in range(6):
+            client.translation.translate(REQUEST)
+    assert server.throttled == 1
+    assert limiter.rate(TRANSLATE) < 20
+
+
+def test_shared_rate_limiter_shares_state(tmp_path, stub, make_client):
+    path = str(tmp_path / "limiter")
+    first = SharedRateLimiter(path, rate=10, max_streams=2)
+    second = SharedRateLimiter(path, rate=10, max_streams=2)
+    try:
+        first.on_response(TRANSLATE, 429)
+        assert second.rate() == 5.0
+
+        release = first.open_stream(TTS_STREAM)
+        assert second.usage().active_streams == 1
+        release()
+        release()
+        assert second.usage().active_streams == 0
+        assert first.open_stream(TRANSLATE) is None
+
+        server = stub()
+        with make_client(server, rate_limiter=first) as client:
+            client.translation.translate(REQUEST)
+        usage = second.usage()
+        assert usage.requests == 1
+        assert usage.throttled == 1
+        assert usage.streams_opened == 1
+    finally:
+        first.close()
+        second.close()
+
+
+# ================================================
+#               adaptive concurrency
+# ================================================
+
+
+def test_concurrency_limiter_queues_over_the_limit():
+    async def main():
+        limiter = ConcurrencyLimiter(initial_limit=2)
+        first = await limiter.acquire()
+        await limiter.acquire()
+        waiter = asyncio.ensure_future(limiter.acquire())
+        await asyncio.sleep(0)
+        assert not waiter.done()
+        assert limiter.waiting == 1
+        first()
+        first()
+        await waiter
+        assert limiter.in_flight == 2
+        assert limiter.waiting == 0
+
+    asyncio.run(main())
+
+
+def test_concurrency_limiter_cuts_once_per_burst():
+    limiter = ConcurrencyLimiter(initial_limit=8)
+    started = time.monotonic()
+    limiter.on_response(TRANSLATE, started, 503)
+    limiter.on_response(TRANSLATE, started, 503)
+    limiter.on_response(TRANSLATE, started, None)
+    assert limiter.limit == 4
+    assert limiter.decreases == 1
+    assert limiter.dropped == 3
+
+
+def test_concurrency_limiter_with_client(stub, make_async_client):
+    server = stub(latency=0.01)
+    limiter = ConcurrencyLimiter(initial_limit=2)
+
+    async def main():
+        async with make_async_client(server, concurrency_limiter=limiter) as client:
+            return await asyncio.gather(
+                *(client.translation.translate(REQUEST) for _ in range(10))
+            )
+
+    assert len(asyncio.run(main())) == 10
+    assert limiter.in_flight == 0
+    assert limiter.waiting == 0
+
+
+def test_concurrency_limiter_keeps_a_baseline_per_endpoint():
+    limiter = ConcurrencyLimiter(initial_limit=8, tolerance=1.5)
+    now = time.monotonic()
+    limiter.on_response(TRANSLATE, now - 0.01, 200)
+    # a transcription is slower than a translation, not a sign of queueing
+    limiter.on_response(TRANSCRIBE, now - 1.0, 200)
+    assert limiter.decreases == 0
+    assert limiter.baseline(TRANSLATE) < 0.1 < limiter.baseline(TRANSCRIBE)
+
+    limiter.on_response(TRANSLATE, time.monotonic() - 0.5, 200)
+    assert limiter.decreases == 1
+    assert limiter.limit == 7
+
+
+# ================================================
+#                hooks and metrics
+# ================================================
+
+
+def test_hook_receives_request_events(stub, make_client):
+    server = stub(latency=0.02)
+    events = []
+    with make_client(server, hooks=[events.append]) as client:
+        client.translation.translate(REQUEST)
+    (event,) = events
+    assert event.method == "POST"
+    assert event.endpoint.endswith("translate")
+    assert event.status == 200
+    assert event.error is None
+    assert event.bytes_sent > 0
+    assert event.bytes_received > 0
+    assert event.timings.first_byte >= 0.02
+
+
+def test_hook_counts_retries(stub, make_client):
+    server = stub(fail_first=1, error_status=503)
+    events = []
+    with make_client(server, hooks=[events.append]) as client:
+        client.translation.translate(REQUEST)
+    assert [event.retries for event in events] == [1]
+
+
+def test_hook_receives_failures(stub, make_client):
+    server = stub(fail_first=1, error_status=400)
+    events = []
+    with make_client(server, hooks=[events.append]) as client:
+        with pytest.raises(DjeliaError):
+            client.translation.translate(REQUEST)
+    (event,) = events
+    assert event.status == 400
+    assert event.error is not None
+
+
+def test_async_hook_receives_request_events(stub, make_async_client):
+    server = stub(latency=0.02)
+    events = []
+
+    async def main():
+        async with make_async_client(server, hooks=[events.append]) as client:
+            await client.translation.translate(REQUEST)
+
+    asyncio.run(main())
+    (event,) = events
+    assert event.status == 200
+    assert event.bytes_sent > 0
+    assert event.timings.first_byte >= 0.02
+
+
+def test_async_sessions_are_traced_only_with_hooks(stub, make_async_client):
+    server = stub(latency=0.02)
+    events = []
+
+    async def main():
+        async with make_async_client(server) as client:
+            await client.translation.translate(REQUEST)
+            untraced = client.session
+            assert not untraced.trace_configs
+
+            client.add_hook(events.append)
+            await client.translation.translate(REQUEST)
+            assert client.session is not untraced
+            assert client.session.trace_configs
+        return untraced
+
+    assert asyncio.run(main()).closed
+    (event,) = events
+    assert event.timings.first_byte >= 0.02
+
+
+def test_broken_hook_does_not_break_requests(stub, make_client):
+    server = stub()
+    with make_client(server, hooks=[lambda event: 1 / 0]) as client:
+        assert client.translation.translate(REQUEST).text == "ec in i"
+
+
+def test_metrics_count_requests(stub, make_client):
+    server = stub(fail_first=1, error_status=503)
+    metrics = Metrics()
+    with make_client(server, hooks=[metrics]) as client:
+        client.translation.translate(REQUEST)
+        client.translation.translate(REQUEST)
+        request = TTSRequestV2(text="i ni ce", description="Moussa speaks clearly")
+        for _ in client.tts.text_to_speech(request, stream=True, version=Versions.v2):
+            pass
+
+    samples = metrics.snapshot()
+    translate = (("endpoint", "translate"),)
+    ok = translate + (("method", "POST"), ("status", "200"))
+    assert samples["djelia_requests_total"][ok] == 2
+    assert samples["djelia_retries_total"][translate] == 1
+    assert samples["djelia_request_duration_seconds_count"][translate] == 2
+    assert samples["djelia_streams_in_flight"][(("endpoint", "tts/stream"),)] == 0
+
+    text = metrics.render()
+    assert "# TYPE djelia_requests_total counter" in text
+    assert (
+        'djelia_requests_total{endpoint="translate",method="POST",status="200"} 2'
+        in text
+    )
+
+
+def test_metrics_gauges():
+    metrics = Metrics()
+    limiter = ConcurrencyLimiter(initial_limit=3)
+    metrics.add_gauge(
+        "djelia_concurrency_limit", "Current limit", lambda: limiter.limit
+    )
+    assert "djelia_concurrency_limit 3" in metrics.render()
+
+
+# ================================================
+#                   event loops
+# ================================================
+
+
+def test_async_client_keeps_a_session_per_loop(stub, make_async_client):
+    server = stub()
+    client = make_async_client(server)
+
+    async def translate():
+        await client.translation.translate(REQUEST)
+        return client.session
+
+    first = asyncio.run(translate())
+    assert list(client._sessions.values()) == [first]
+
+    async def second_loop():
+        session = await translate()
+        # the session of the finished loop is dropped, not reused
+        assert list(client._sessions.values()) == [session]
+        await client.close()
+        return session
+
+    second = asyncio.run(second_loop())
+    assert second is not first
+    assert second.closed
+    assert not client._sessions
+    assert server.requests == 2
+
+
+def test_async_client_close_releases_sessions_of_running_loops(stub, make_async_client):
+    server = stub()
+    client = make_async_client(server)
+    loops = [asyncio.new_event_loop() for _ in range(2)]
+    threads = [threading.Thread(target=loop.run_forever) for loop in loops]
+    for thread in threads:
+        thread.start()
+
+    async def translate():
+        await client.translation.translate(REQUEST)
+        return client.session
+
+    try:
+        sessions = [
+            asyncio.run_coroutine_threadsafe(translate(), loop).result(5)
+            for loop in loops
+        ]
+        assert sessions[0] is not sessions[1]
+        assert len(client._sessions) == 2
+
+        # each session is closed on the loop that owns it
+        asyncio.run(client.close())
+        assert all(session.closed for session in sessions)
+        assert not client._sessions
+    finally:
+        for loop, thread in zip(loops, threads):
+            loop.call_soon_threadsafe(loop.stop)
+            thread.join()
+            loop.close()
+    assert server.requests == 2
+
+
+# ================================================
+#                     tracing
+# ================================================
+
+
+def in_memory_tracing():
+    sdk = pytest.importorskip("opentelemetry.sdk.trace")
+    export = pytest.importorskip("opentelemetry.sdk.trace.export")
+    memory = pytest.importorskip(
+        "opentelemetry.sdk.trace.export.in_memory_span_exporter"
+    )
+    exporter = memory.InMemorySpanExporter()
+    provider = sdk.TracerProvider()
+    provider.add_span_processor(export.SimpleSpanProcessor(exporter))
+    return Tracing(tracer_provider=provider), exporter
+
+
+def assert_call_spans(spans, attempts: list[int]) -> None:
+    calls = [span for span in spans if span.name == "djelia.translate"]
+    assert len(calls) == len(attempts)
+    for call, count in zip(calls, attempts):
+        children = [
+            span
+            for span in spans
+            if span.parent is not None and span.parent.span_id == call.context.span_id
+        ]
+        assert [span.name for span in children] == ["POST translate"] * count
+        assert all(span.context.trace_id == call.context.trace_id for span in children)
+        statuses = [span.attributes["http.response.status_code"] for span in children]
+        assert statuses == [503] * (count - 1) + [200]
+
+
+def test_tracing_spans_a_call_and_each_attempt(stub, make_client):
+    tracing, exporter = in_memory_tracing()
+    server = stub(fail_first=1, error_status=503)
+    with make_client(server, tracing=tracing) as client:
+        client.translation.translate(REQUEST)
+        client.translation.translate(REQUEST)
+    # the retried call has a span per attempt
+    assert_call_spans(exporter.get_finished_spans(), [2, 1])
+    assert server.requests == 3
+
+
+def test_async_tracing_spans_a_call_and_each_attempt(stub, make_async_client):
+    tracing, exporter = in_memory_tracing()
+    server = stub(fail_first=1, error_status=503)
+
+    async def main():
+        async with make_async_client(server, tracing=tracing) as client:
+            await client.translation.translate(REQUEST)
+            await client.translation.translate(REQUEST)
+
+    asyncio.run(main())
+    assert_call_spans(exporter.get_finished_spans(), [2, 1])
+
+
+def test_tracing_is_a_no_op_without_opentelemetry(stub, make_client, monkeypatch):
+    monkeypatch.setattr(tracing_module, "_otel", None)
+    # a None entry makes ``import opentelemetry`` raise ImportError
+    monkeypatch.setitem(sys.modules, "opentelemetry", None)
+    tracing = Tracing()
+    assert not tracing.enabled
+
+    server = stub()
+    with make_client(server, tracing=tracing) as client:
+        assert client.tracing is None
+        assert client.translation.translate(REQUEST).text == "ec in i"
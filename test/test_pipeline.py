@@ -0,0 +1,117 @@
+import asyncio
+import io
+
+import pytest
+
+from benchmarks.stub_server import make_wav
+from djelia import RetryPolicy
+from djelia.models import TranslationResponse, Versions
+
+DESCRIPTION = "Moussa speaks clearly"
+AUDIO = make_wav(0.5)
+
+
+def run_pipeline(client, **kwargs):
+    async def main():
+        pipeline = client.pipeline.speech_to_speech(
+            io.BytesIO(AUDIO), DESCRIPTION, **kwargs
+        )
+        return [chunk async for chunk in pipeline], pipeline.timings
+
+    return main()
+
+
+# ================================================
+#                 speech_to_speech
+# ================================================
+
+
+def test_speech_to_speech_keeps_segment_order(stub, make_async_client):
+    server = stub(segments=3, audio_seconds=0.5, chunk_size=4096)
+
+    async def main():
+        async with make_async_client(server) as client:
+            return await run_pipeline(client, queue_size=1)
+
+    chunks, timings = asyncio.run(main())
+    assert [chunk.index for chunk in chunks] == sorted(chunk.index for chunk in chunks)
+    assert {chunk.index for chunk in chunks} == {0, 1, 2}
+    for index in range(3):
+        mine = [chunk for chunk in chunks if chunk.index == index]
+        assert mine[0].segment.text == f"segment {index}"
+        # the stub translates by reversing the text
+        assert mine[0].translation == f"segment {index}"[::-1]
+        assert [chunk.first for chunk in mine] == [True] + [False] * (len(mine) - 1)
+        assert b"".join(chunk.audio for chunk in mine) == make_wav(0.5)
+
+    assert timings.transcription.items == 3
+    assert timings.translation.items == 3
+    assert timings.synthesis.items == len(chunks)
+    for timing in (timings.transcription, timings.translation, timings.synthesis):
+        assert 0 <= timing.first_output <= timing.finished
+        assert timing.busy > 0
+    assert timings.first_audio == timings.synthesis.first_output
+    assert timings.total == timings.synthesis.finished
+    assert timings.transcription.finished <= timings.total
+
+
+def test_speech_to_speech_raises_stage_failures(stub, make_async_client):
+    server = stub(segments=3)
+    calls = 0
+
+    async def main():
+        async with make_async_client(server) as client:
+            translate = client.translation.translate
+
+            async def failing(request, version=Versions.v1, retry_policy=None):
+                nonlocal calls
+                calls += 1
+                if calls == 2:
+                    raise RuntimeError("translation failed")
+                return await translate(request, version, retry_policy=retry_policy)
+
+            client.translation.translate = failing
+            pipeline = client.pipeline.speech_to_speech(
+                io.BytesIO(AUDIO), DESCRIPTION, retry_policy=RetryPolicy.disabled()
+            )
+            received = []
+            with pytest.raises(RuntimeError, match="translation failed"):
+                async for chunk in pipeline:
+                    received.append(chunk)
+            return received, pipeline.timings
+
+    received, timings = asyncio.run(main())
+    # the segment translated before the failure is still spoken
+    assert {chunk.index for chunk in received} == {0}
+    assert timings.translation.items == 1
+    assert timings.translation.finished is not None
+    assert timings.synthesis.finished is not None
+
+
+def test_speech_to_speech_splits_long_translations(stub, make_async_client):
+    server = stub(segments=2, audio_seconds=0.1)
+    long_text = "I ni ce. " * 250
+    spoken = []
+
+    async def main():
+        async with make_async_client(server) as client:
+
+            async def translate(request, version=Versions.v1, retry_policy=None):
+                return TranslationResponse(text=long_text)
+
+            text_to_speech = client.tts.text_to_speech
+
+            async def recording(request, *args, **kwargs):
+                spoken.append(request.text)
+                return await text_to_speech(request, *args, **kwargs)
+
+            client.translation.translate = translate
+            client.tts.text_to_speech = recording
+            return await run_pipeline(client, max_chars=1000)
+
+    chunks, _ = asyncio.run(main())
+    assert len(spoken) == 6
+    assert all(len(text) <= 1000 for text in spoken)
+    assert " ".join(spoken[:3]) == long_text.strip()
+    # every part is a WAV stream of its own
+    assert [chunk.index for chunk in chunks if chunk.first] == [0, 0, 0, 1, 1, 1]
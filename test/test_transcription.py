@@ -0,0 +1,194 @@
+import asyncio
+import io
+
+from benchmarks.stub_server import make_wav
+from djelia.models import TranscriptionSegment
+from djelia.src.audio import (AudioUpload, AudioWindow, MultipartFileStream,
+                              WavWindows, stitch_segments)
+
+AUDIO = make_wav(0.5)
+
+
+class Pipe(io.RawIOBase):
+    """Reads ``data`` once and cannot seek, like a pipe or a socket."""
+
+    def __init__(self, data: bytes):
+        self._data = io.BytesIO(data)
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, buffer) -> int:
+        return self._data.readinto(buffer)
+
+
+# ================================================
+#                     uploads
+# ================================================
+
+
+def test_upload_reads_from_the_current_position():
+    f = io.BytesIO(b"head" + AUDIO)
+    f.seek(4)
+    upload = AudioUpload(f, chunk_size=1024)
+    assert b"".join(upload.iter_chunks()) == AUDIO
+    # every pass starts over
+    assert b"".join(upload.iter_chunks()) == AUDIO
+
+
+def test_multipart_stream_length_matches_body():
+    stream = MultipartFileStream(AudioUpload(io.BytesIO(AUDIO), chunk_size=1024))
+    body = b"".join(bytes(part) for part in stream)
+    assert len(body) == len(stream)
+    assert AUDIO in body
+
+
+def test_retry_replays_file_upload(tmp_path, stub, make_client):
+    path = tmp_path / "audio.wav"
+    path.write_bytes(AUDIO)
+    server = stub(fail_first=1, error_status=503)
+    with make_client(server) as client:
+        segments = client.transcription.transcribe(str(path))
+    assert len(segments) == 5
+    first, second = server.request_sizes
+    assert first == second > len(AUDIO)
+
+
+def test_non_seekable_upload_is_spooled():
+    upload = AudioUpload(Pipe(AUDIO), chunk_size=1024)
+    assert b"".join(upload.iter_chunks()) == AUDIO
+    assert b"".join(upload.iter_chunks()) == AUDIO
+
+
+def test_retry_replays_non_seekable_upload(stub, make_client):
+    server = stub(fail_first=1, error_status=503)
+    with make_client(server) as client:
+        segments = client.transcription.transcribe(Pipe(AUDIO))
+    assert len(segments) == 5
+    first, second = server.request_sizes
+    assert first == second > len(AUDIO)
+
+
+def test_async_retry_replays_non_seekable_upload(stub, make_async_client):
+    server = stub(fail_first=1, error_status=503)
+
+    async def main():
+        async with make_async_client(server) as client:
+            return await client.transcription.transcribe(Pipe(AUDIO))
+
+    assert len(asyncio.run(main())) == 5
+    first, second = server.request_sizes
+    assert first == second > len(AUDIO)
+
+
+# ================================================
+#                    streaming
+# ================================================
+
+
+def test_stream_yields_segments_as_they_arrive(stub, make_client):
+    server = stub(segments=3)
+    with make_client(server) as client:
+        stream = client.transcription.transcribe(io.BytesIO(AUDIO), stream=True)
+        segments = list(stream)
+    assert [segment.text for segment in segments] == [
+        "segment 0",
+        "segment 1",
+        "segment 2",
+    ]
+    assert [segment.start for segment in segments] == [0.0, 1.0, 2.0]
+
+
+# ================================================
+#                 long recordings
+# ================================================
+
+
+def as_tuples(segments) -> list[tuple[str, float, float]]:
+    return [(segment.text, segment.start, segment.end) for segment in segments]
+
+
+def expected_segments(
+    audio: bytes, segments: int
+) -> tuple[WavWindows, list[TranscriptionSegment]]:
+    # what the stub returns for every window, stitched without the client
+    stub_segments = [
+        TranscriptionSegment(text=f"segment {i}", start=float(i), end=i + 1.0)
+        for i in range(segments)
+    ]
+    windows = WavWindows(io.BytesIO(audio), window_seconds=6, overlap_seconds=1)
+    return windows, stitch_segments([(window, stub_segments) for window in windows])
+
+
+def test_stitch_segments_offsets_times_and_drops_repeated_words():
+    first = AudioWindow(index=0, start=0.0, end=30.0, data=b"")
+    second = AudioWindow(index=1, start=28.0, end=58.0, data=b"")
+    results = [
+        # windows may finish in any order
+        (
+            second,
+            [
+                # centred before the middle of the overlap (29 s): dropped
+                TranscriptionSegment(text="f", start=0.0, end=1.5),
+                TranscriptionSegment(text="g h i j", start=0.5, end=3.0),
+                TranscriptionSegment(text="k", start=5.0, end=6.0),
+            ],
+        ),
+        (
+            first,
+            [
+                TranscriptionSegment(text="a b c", start=0.0, end=10.0),
+                TranscriptionSegment(text="d e", start=20.0, end=27.0),
+                TranscriptionSegment(text="f g", start=27.5, end=29.8),
+                # centred after the middle of the overlap: dropped
+                TranscriptionSegment(text="h", start=29.5, end=30.0),
+            ],
+        ),
+    ]
+    assert as_tuples(stitch_segments(results)) == [
+        ("a b c", 0.0, 10.0),
+        ("d e", 20.0, 27.0),
+        ("f g", 27.5, 29.8),
+        # "g" was already heard at the end of the first window
+        ("h i j", 28.5, 31.0),
+        ("k", 33.0, 34.0),
+    ]
+
+
+def test_transcribe_long_stitches_concurrent_windows(stub, make_client):
+    audio = make_wav(20)
+    windows, expected = expected_segments(audio, segments=4)
+    assert len(windows) > 3
+    # jitter lets windows finish out of order
+    server = stub(segments=4, jitter=0.05, seed=1)
+    progress = []
+    with make_client(server) as client:
+        segments = client.transcription.transcribe_long(
+            io.BytesIO(audio),
+            window_seconds=6,
+            overlap_seconds=1,
+            concurrency=3,
+            progress=progress.append,
+        )
+    assert as_tuples(segments) == as_tuples(expected)
+    starts = [segment.start for segment in segments]
+    assert starts == sorted(starts)
+    assert starts[-1] > windows.duration - 6
+    assert server.requests == len(windows)
+    assert [p.completed for p in progress] == list(range(1, len(windows) + 1))
+    assert sorted(p.window for p in progress) == list(range(len(windows)))
+
+
+def test_async_transcribe_long_stitches_concurrent_windows(stub, make_async_client):
+    audio = make_wav(20)
+    windows, expected = expected_segments(audio, segments=4)
+    server = stub(segments=4, jitter=0.05, seed=2)
+
+    async def main():
+        async with make_async_client(server) as client:
+            return await client.transcription.transcribe_long(
+                io.BytesIO(audio), window_seconds=6, overlap_seconds=1, concurrency=3
+            )
+
+    assert as_tuples(asyncio.run(main())) == as_tuples(expected)
+    assert server.requests == len(windows)
@@ -0,0 +1,343 @@
+import asyncio
+
+import pytest
+
+from djelia.models import (Language, TranscriptionSegment, TranslationRequest,
+                           TranslationResponse, Versions)
+from djelia.src.services.translation import _SegmentPacker, _unpack
+from djelia.utils.exceptions import LanguageError
+
+TEXTS = ["i ni ce", "", "a ka di", "n b'a fo", "i ka kene wa"]
+
+
+def make_segments(texts=TEXTS) -> list[TranscriptionSegment]:
+    return [
+        TranscriptionSegment(text=text, start=float(i), end=i + 0.5)
+        for i, text in enumerate(texts)
+    ]
+
+
+def drop_line_breaks(translate):
+    # a model that joins the lines of a pack defeats the split
+    def wrapper(request, version=Versions.v1):
+        response = translate(request, version)
+        return TranslationResponse(text=response.text.replace("\n", " "))
+
+    return wrapper
+
+
+def assert_translated(translated: list[TranscriptionSegment]) -> None:
+    # the stub reverses every line
+    assert [segment.text for segment in translated] == [text[::-1] for text in TEXTS]
+    assert [(s.start, s.end) for s in translated] == [
+        (s.start, s.end) for s in make_segments()
+    ]
+
+
+def drop_line_breaks_async(translate):
+    async def wrapper(request, version=Versions.v1):
+        response = await translate(request, version)
+        return TranslationResponse(text=response.text.replace("\n", " "))
+
+    return wrapper
+
+
+# ================================================
+#                 packing segments
+# ================================================
+
+
+def test_packer_fills_packs_up_to_max_chars():
+    packer = _SegmentPacker(max_chars=17)
+    packs = [packer.add(segment) for segment in make_segments()]
+    packs.append(packer.flush())
+    packs = [[segment.text for segment in pack] for pack in packs if pack]
+    # every segment counts its separator: 8 + 1 + 8 characters
+    assert packs == [["i ni ce", "", "a ka di"], ["n b'a fo"], ["i ka kene wa"]]
+    assert packer.flush() is None
+
+
+def test_packer_keeps_oversized_segments_whole():
+    packer = _SegmentPacker(max_chars=4)
+    assert packer.add(make_segments()[0]) is None
+    pack = packer.add(make_segments()[2])
+    assert [segment.text for segment in pack] == ["i ni ce"]
+
+
+def test_unpack_keeps_times_and_empty_segments():
+    pack = make_segments()
+    unpacked = _unpack(pack, [" ec in i ", "id ak a", "of a'b n", "aw enek ak i"])
+    assert [segment.text for segment in unpacked] == [
+        "ec in i",
+        "",
+        "id ak a",
+        "of a'b n",
+        "aw enek ak i",
+    ]
+    assert [segment.start for segment in unpacked] == [0.0, 1.0, 2.0, 3.0, 4.0]
+
+
+# ================================================
+#                translate_segments
+# ================================================
+
+
+def test_translate_segments(stub, make_client):
+    server = stub()
+    with make_client(server) as client:
+        translated = list(
+            client.translation.translate_segments(
+                make_segments(), Language.BAMBARA, Language.FRENCH, max_chars=17
+            )
+        )
+    assert_translated(translated)
+    assert server.requests == 3
+
+
+def test_translate_segments_falls_back_per_segment(stub, make_client, monkeypatch):
+    server = stub()
+    with make_client(server) as client:
+        translation = client.translation
+        monkeypatch.setattr(
+            translation, "translate", drop_line_breaks(translation.translate)
+        )
+        translated = list(
+            translation.translate_segments(
+                make_segments(), Language.BAMBARA, Language.FRENCH
+            )
+        )
+    assert_translated(translated)
+    # one pack, then one request per non-empty segment
+    assert server.requests == 5
+
+
+def test_async_translate_segments_from_a_stream(stub, make_async_client):
+    server = stub()
+
+    async def segments():
+        for segment in make_segments():
+            yield segment
+
+    async def main():
+        async with make_async_client(server) as client:
+            stream = client.translation.translate_segments(
+                segments(), Language.BAMBARA, Language.FRENCH, max_chars=17
+            )
+            return [segment async for segment in stream]
+
+    assert_translated(asyncio.run(main()))
+    assert server.requests == 3
+
+
+def test_async_fallback_is_bounded_by_concurrency(stub, make_async_client, monkeypatch):
+    server = stub(latency=0.01)
+    in_flight = peak = 0
+
+    async def main():
+        async with make_async_client(server) as client:
+            translation = client.translation
+            translate = drop_line_breaks_async(translation.translate)
+
+            async def counting(request, version=Versions.v1):
+                nonlocal in_flight, peak
+                in_flight += 1
+                peak = max(peak, in_flight)
+                try:
+                    return await translate(request, version)
+                finally:
+                    in_flight -= 1
+
+            monkeypatch.setattr(translation, "translate", counting)
+            stream = translation.translate_segments(
+                make_segments() * 4,
+                Language.BAMBARA,
+                Language.FRENCH,
+                max_chars=17,
+                concurrency=2,
+            )
+            return [segment async for segment in stream]
+
+    assert len(asyncio.run(main())) == 20
+    assert peak <= 2
+
+
+# ================================================
+#               supported languages
+# ================================================
+
+
+def record_statuses(client, monkeypatch) -> list[int]:
+    statuses = []
+    make_request = client._make_request
+
+    def recording(*args, **kwargs):
+        response = make_request(*args, **kwargs)
+        statuses.append(response.status_code)
+        return response
+
+    monkeypatch.setattr(client, "_make_request", recording)
+    return statuses
+
+
+def test_supported_languages_revalidate_with_etag(stub, make_client, monkeypatch):
+    server = stub()
+    with make_client(server) as client:
+        statuses = record_statuses(client, monkeypatch)
+        languages = client.translation.get_supported_languages()
+        assert client.translation.get_supported_languages() == languages
+        assert server.requests == 1
+
+        # a stale catalogue costs a 304 and keeps the cached list
+        client.language_catalog.invalidate()
+        assert client.translation.get_supported_languages() == languages
+        assert client.translation.get_supported_languages(refresh=True) == languages
+    assert statuses == [200, 304, 304]
+    assert {language.code for language in languages} == {
+        language.value for language in Language
+    }
+
+
+def test_unsupported_language_fails_before_sending(stub, make_client):
+    server = stub()
+    request = TranslationRequest(
+        text="i ni ce", source=Language.BAMBARA, target=Language.FRENCH
+    )
+    with make_client(server) as client:
+        # nothing is known yet, so the server decides
+        client.translation.translate(request)
+        client.language_catalog.update(
+            200, [{"code": "fra_Latn", "name": "French"}], '"french-only"'
+        )
+        with pytest.raises(LanguageError, match="bam_Latn"):
+            client.translation.translate(request)
+    assert server.requests == 1
+
+
+def test_async_supported_languages_revalidate_with_etag(stub, make_async_client):
+    server = stub()
+    request = TranslationRequest(
+        text="i ni ce", source=Language.ENGLISH, target=Language.BAMBARA
+    )
+
+    async def main():
+        async with make_async_client(server) as client:
+            languages = await client.translation.get_supported_languages()
+            client.language_catalog.invalidate()
+            again = await client.translation.get_supported_languages()
+            client.language_catalog.update(
+                200, [{"code": "bam_Latn", "name": "Bambara"}], '"bambara-only"'
+            )
+            with pytest.raises(LanguageError):
+                await client.translation.translate(request)
+            return languages, again
+
+    languages, again = asyncio.run(main())
+    assert again == languages
+    assert server.requests == 2
+
+
+# ================================================
+#                 translate_many
+# ================================================
+
+WORDS = [f"kuma {i}" for i in range(20)]
+
+
+def make_requests(texts=WORDS) -> list[TranslationRequest]:
+    return [
+        TranslationRequest(text=text, source=Language.BAMBARA, target=Language.FRENCH)
+        for text in texts
+    ]
+
+
+def fail_on(translate, text: str):
+    def wrapper(request, version=Versions.v1, retry_policy=None):
+        if request.text == text:
+            raise RuntimeError(f"cannot translate {text}")
+        return translate(request, version, retry_policy=retry_policy)
+
+    return wrapper
+
+
+def fail_on_async(translate, text: str):
+    async def wrapper(request, version=Versions.v1, retry_policy=None):
+        if request.text == text:
+            raise RuntimeError(f"cannot translate {text}")
+        return await translate(request, version, retry_policy=retry_policy)
+
+    return wrapper
+
+
+def test_translate_many_keeps_input_order(stub, make_client):
+    # jitter makes later requests finish first
+    server = stub(latency=0.01, jitter=0.05, seed=7)
+    with make_client(server) as client:
+        responses = list(
+            client.translation.translate_many(make_requests(), concurrency=6)
+        )
+    assert [response.text for response in responses] == [w[::-1] for w in WORDS]
+    assert server.requests == len(WORDS)
+
+
+def test_translate_many_return_exceptions(stub, make_client):
+    server = stub(jitter=0.02)
+    with make_client(server) as client:
+        translation = client.translation
+        translation.translate = fail_on(translation.translate, "kuma 3")
+        results = list(
+            translation.translate_many(
+                make_requests(WORDS[:6]), concurrency=3, return_exceptions=True
+            )
+        )
+        assert isinstance(results[3], RuntimeError)
+        assert [r.text for i, r in enumerate(results) if i != 3] == [
+            w[::-1] for i, w in enumerate(WORDS[:6]) if i != 3
+        ]
+
+        # without it the batch stops at the failed item
+        received = []
+        with pytest.raises(RuntimeError, match="kuma 3"):
+            for response in translation.translate_many(
+                make_requests(WORDS[:6]), concurrency=3
+            ):
+                received.append(response.text)
+        assert received == [w[::-1] for w in WORDS[:3]]
+
+
+def test_async_translate_many_keeps_input_order(stub, make_async_client):
+    server = stub(latency=0.01, jitter=0.05, seed=7)
+
+    async def main():
+        async with make_async_client(server) as client:
+            stream = client.translation.translate_many(make_requests(), concurrency=6)
+            return [response.text async for response in stream]
+
+    assert asyncio.run(main()) == [w[::-1] for w in WORDS]
+    assert server.requests == len(WORDS)
+
+
+def test_async_translate_many_return_exceptions(stub, make_async_client):
+    server = stub(jitter=0.02)
+
+    async def main():
+        async with make_async_client(server) as client:
+            translation = client.translation
+            translation.translate = fail_on_async(translation.translate, "kuma 3")
+            results = [
+                result
+                async for result in translation.translate_many(
+                    make_requests(WORDS[:6]), concurrency=3, return_exceptions=True
+                )
+            ]
+            received = []
+            with pytest.raises(RuntimeError, match="kuma 3"):
+                async for response in translation.translate_many(
+                    make_requests(WORDS[:6]), concurrency=3
+                ):
+                    received.append(response.text)
+            return results, received
+
+    results, received = asyncio.run(main())
+    assert isinstance(results[3], RuntimeError)
+    assert results[4].text == WORDS[4][::-1]
+    assert received == [w[::-1] for w in WORDS[:3]]
@@ -0,0 +1,291 @@
+import asyncio
+import io
+import struct
+import wave
+
+import pytest
+
+from benchmarks.stub_server import make_wav
+from djelia.models import TTSRequestV2, Versions
+from djelia.src.audio import (AudioSink, FileSink, RingBufferSink, StreamSink,
+                              WavJoiner, finalize_wav, split_text)
+
+REQUEST = TTSRequestV2(text="i ni ce", description="Moussa speaks clearly")
+
+
+def read_frames(path) -> int:
+    with wave.open(str(path), "rb") as w:
+        return w.getnframes()
+
+
+def with_list_chunk(audio: bytes) -> bytes:
+    # a complete WAV with metadata after its ``data`` chunk
+    info = b"INFOISFT" + struct.pack("<I", 6) + b"djelia"
+    trailer = b"LIST" + struct.pack("<I", len(info)) + info
+    audio += trailer
+    return audio[:4] + struct.pack("<I", len(audio) - 8) + audio[8:]
+
+
+# ================================================
+#                   finalize_wav
+# ================================================
+
+
+def test_finalize_wav_fills_placeholder_sizes():
+    audio = bytearray(make_wav(0.1))
+    audio[4:8] = b"\xff\xff\xff\xff"
+    audio[40:44] = b"\xff\xff\xff\xff"
+    f = io.BytesIO(bytes(audio))
+    finalize_wav(f)
+    assert f.getvalue() == make_wav(0.1)
+
+
+def test_finalize_wav_fixes_a_truncated_stream():
+    f = io.BytesIO(make_wav(0.1)[:1000])
+    finalize_wav(f)
+    f.seek(0)
+    with wave.open(f, "rb") as w:
+        assert w.getnframes() == (1000 - 44) // 2
+
+
+def test_finalize_wav_ignores_other_formats():
+    f = io.BytesIO(b"ID3 not a wav")
+    finalize_wav(f)
+    assert f.getvalue() == b"ID3 not a wav"
+
+
+def test_finalize_wav_keeps_complete_files():
+    audio = with_list_chunk(make_wav(0.1))
+    f = io.BytesIO(audio)
+    finalize_wav(f)
+    assert f.getvalue() == audio
+
+
+# ================================================
+#                      sinks
+# ================================================
+
+
+def test_file_sink_abort(tmp_path):
+    audio = make_wav(0.1)
+    kept = FileSink(str(tmp_path / "kept.wav"))
+    kept.write(audio[:1000])
+    kept.abort()
+    assert read_frames(tmp_path / "kept.wav") == (1000 - 44) // 2
+
+    dropped = FileSink(str(tmp_path / "dropped.wav"), keep_partial=False)
+    dropped.write(audio[:1000])
+    dropped.abort()
+    assert not (tmp_path / "dropped.wav").exists()
+
+
+def test_stream_sink():
+    stream = io.BytesIO()
+    sink = StreamSink(stream)
+    sink.write(b"abc")
+    sink.close()
+    assert not stream.closed
+    assert stream.getvalue() == b"abc"
+
+
+def test_ring_buffer_sink_keeps_the_latest_audio():
+    sink = RingBufferSink(4)
+    sink.write(b"abc")
+    assert sink.read(2) == b"ab"
+    sink.write(b"def")
+    assert len(sink) == 4
+    assert sink.read() == b"cdef"
+    sink.write(b"0123456789")
+    assert sink.read() == b"6789"
+    assert sink.dropped == 6
+    with pytest.raises(ValueError):
+        RingBufferSink(0)
+
+
+def test_audio_sink_requires_write():
+    with pytest.raises(TypeError):
+        AudioSink()
+
+
+def test_file_sink_close_keeps_complete_files(tmp_path):
+    audio = with_list_chunk(make_wav(0.1))
+    sink = FileSink(str(tmp_path / "out.wav"))
+    sink.write(audio[:100])
+    sink.write(audio[100:])
+    sink.close()
+    assert (tmp_path / "out.wav").read_bytes() == audio
+
+
+# ================================================
+#                  text_to_speech
+# ================================================
+
+
+def test_stream_writes_through_file_sink(tmp_path, stub, make_client):
+    server = stub(audio_seconds=0.5)
+    path = tmp_path / "out.wav"
+    with make_client(server) as client:
+        chunks = list(
+            client.tts.text_to_speech(
+                REQUEST, output_file=str(path), stream=True, version=Versions.v2
+            )
+        )
+    assert len(chunks) > 1
+    assert path.read_bytes() == b"".join(chunks)
+    assert read_frames(path) == 8000
+
+
+def test_stream_stopped_early_aborts_the_sink(tmp_path, stub, make_client):
+    server = stub(audio_seconds=0.5)
+    path = tmp_path / "out.wav"
+    sink = FileSink(str(path), keep_partial=False)
+    with make_client(server) as client:
+        stream = client.tts.text_to_speech(
+            REQUEST, output_file=sink, stream=True, version=Versions.v2
+        )
+        next(stream)
+        stream.close()
+    assert not path.exists()
+
+
+def test_async_stream_writes_through_file_sink(tmp_path, stub, make_async_client):
+    server = stub(audio_seconds=0.5)
+    path = tmp_path / "out.wav"
+
+    async def main():
+        async with make_async_client(server) as client:
+            stream = await client.tts.text_to_speech(
+                REQUEST, output_file=str(path), stream=True, version=Versions.v2
+            )
+            return [chunk async for chunk in stream]
+
+    chunks = asyncio.run(main())
+    assert path.read_bytes() == b"".join(chunks)
+    assert read_frames(path) == 8000
+
+
+def test_empty_sink_receives_audio(stub, make_client):
+    server = stub(audio_seconds=0.1)
+    sink = RingBufferSink(64 * 1024)
+    with make_client(server) as client:
+        result = client.tts.text_to_speech(
+            REQUEST, output_file=sink, version=Versions.v2
+        )
+    assert result is sink
+    assert sink.closed
+    assert sink.read() == make_wav(0.1)
+
+
+def test_async_empty_sink_receives_audio(stub, make_async_client):
+    server = stub(audio_seconds=0.1)
+    sink = RingBufferSink(64 * 1024)
+
+    async def main():
+        async with make_async_client(server) as client:
+            return await client.tts.text_to_speech(
+                REQUEST, output_file=sink, version=Versions.v2
+            )
+
+    assert asyncio.run(main()) is sink
+    assert sink.read() == make_wav(0.1)
+
+
+# ================================================
+#                   long text
+# ================================================
+
+TEXT = (
+    "I ni ce. I ka kene wa? N ka kene, i ni ce. "
+    "A ka di kosebe, an bee ka taa sugu la, ka na ni jege ye; "
+    "o kofe an na dumuni ke."
+)
+
+
+def wav_sizes(audio: bytes) -> tuple[int, int]:
+    """The RIFF and ``data`` sizes written in a header."""
+    riff_size = struct.unpack_from("<I", audio, 4)[0]
+    data_size = struct.unpack_from("<I", audio, audio.index(b"data") + 4)[0]
+    return riff_size, data_size
+
+
+def test_split_text_packs_sentences_up_to_the_limit():
+    segments = split_text(TEXT, max_chars=50)
+    assert segments == [
+        "I ni ce. I ka kene wa? N ka kene, i ni ce.",
+        # too long for one segment, so it is cut after a clause
+        "A ka di kosebe, an bee ka taa sugu la,",
+        "ka na ni jege ye; o kofe an na dumuni ke.",
+    ]
+    assert all(len(segment) <= 50 for segment in segments)
+    assert " ".join(segments).split() == TEXT.split()
+    assert split_text(TEXT) == [TEXT.strip()]
+
+
+def test_split_text_falls_back_to_clauses_words_and_cuts():
+    assert split_text("a, b; c: d", max_chars=5) == ["a, b;", "c: d"]
+    assert split_text("aaaa bbbb cccc", max_chars=9) == ["aaaa bbbb", "cccc"]
+    assert split_text("a" * 12, max_chars=5) == ["aaaaa", "aaaaa", "aa"]
+
+
+def test_wav_joiner_writes_exact_sizes():
+    parts = [make_wav(0.1), make_wav(0.25), make_wav(0.05)]
+    joined = WavJoiner.join(parts)
+    riff_size, data_size = wav_sizes(joined)
+    assert data_size == sum(len(part) - 44 for part in parts)
+    assert riff_size == len(joined) - 8
+    with wave.open(io.BytesIO(joined), "rb") as w:
+        assert w.getnframes() == 0.4 * 16000
+
+    joiner = WavJoiner()
+    streamed = joiner.add(parts[0])
+    # the total is not known while streaming
+    assert wav_sizes(streamed) == (0xFFFFFFFF, 0xFFFFFFFF)
+    assert joiner.add(parts[1]) == parts[1][44:]
+    with pytest.raises(ValueError):
+        joiner.add(make_wav(0.1, sample_rate=8000))
+
+
+def test_text_to_speech_long_joins_the_segments(stub, make_client):
+    server = stub(audio_seconds=0.1, jitter=0.02)
+    with make_client(server) as client:
+        audio = client.tts.text_to_speech_long(
+            TEXT, "Moussa speaks clearly", max_chars=50, concurrency=3
+        )
+    assert server.requests == 3
+    riff_size, data_size = wav_sizes(audio)
+    assert data_size == 3 * (len(make_wav(0.1)) - 44)
+    assert riff_size == len(audio) - 8
+
+
+def test_text_to_speech_long_stream_fixes_the_sizes(tmp_path, stub, make_client):
+    server = stub(audio_seconds=0.1)
+    path = tmp_path / "long.wav"
+    with make_client(server) as client:
+        chunks = list(
+            client.tts.text_to_speech_long(
+                TEXT,
+                "Moussa speaks clearly",
+                output_file=str(path),
+                stream=True,
+                max_chars=50,
+            )
+        )
+    # the stream starts with placeholder sizes, the file gets the real ones
+    assert wav_sizes(chunks[0]) == (0xFFFFFFFF, 0xFFFFFFFF)
+    audio = path.read_bytes()
+    assert wav_sizes(audio) == (len(audio) - 8, len(audio) - 44)
+    assert read_frames(path) == 3 * 1600
+
+
+def test_async_text_to_speech_long_joins_the_segments(stub, make_async_client):
+    server = stub(audio_seconds=0.1, jitter=0.02)
+
+    async def main():
+        async with make_async_client(server) as client:
+            return await client.tts.text_to_speech_long(
+                TEXT, "Moussa speaks clearly", max_chars=50
+            )
+
+    audio = asyncio.run(main())
+    assert wav_sizes(audio) == (len(audio) - 8, len(audio) - 44)
+    assert server.requests == 3